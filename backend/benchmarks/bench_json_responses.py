@@ -0,0 +1,145 @@
+"""
+Benchmark for JSON encoding of the large endpoints.
+
+Seeds a throwaway SQLite database and, for /api/portfolio, /api/watchlist,
+/api/investments and /api/schemes/{code}/history, compares the old path
+(ORM rows / dicts through jsonable_encoder and Starlette's JSONResponse)
+against the current one (slim dicts encoded with orjson), reporting the
+median build + encode time and the payload size.
+
+Usage (from backend/):
+    python benchmarks/bench_json_responses.py [--transactions 20000] [--schemes 200] [--history-days 3650]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# database.py uses a cwd-relative SQLite file; keep the benchmark DB out of the repo
+os.chdir(tempfile.mkdtemp(prefix="navio-bench-"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+from database import Base, engine, SessionLocal  # noqa: E402
+from models import Investment, NAVHistory, Scheme, Watchlist  # noqa: E402
+from services import history, portfolio, scheme_master, serialization  # noqa: E402
+
+
+def seed(n_transactions, n_schemes, history_days, n_accounts=4):
+    random.seed(42)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    today = date.today()
+
+    schemes, navs = [], []
+    for i in range(n_schemes):
+        code = str(100000 + i)
+        nav = random.uniform(10, 200)
+        for d in range(history_days, -1, -1):
+            nav *= 1 + random.gauss(0.0004, 0.01)
+            navs.append({"scheme_code": code, "date": today - timedelta(days=d), "net_asset_value": nav})
+        schemes.append({
+            "scheme_code": code,
+            "scheme_name": f"Bench Fund {i} - Direct Plan - Growth",
+            "category": "Equity Scheme - Flexi Cap Fund",
+            "fund_house": f"AMC {i % 20}",
+            "net_asset_value": nav,
+            "date": today
+        })
+    db.bulk_insert_mappings(Scheme, schemes)
+    db.bulk_insert_mappings(NAVHistory, navs)
+
+    txns = []
+    for n in range(n_transactions):
+        nav = random.uniform(10, 200)
+        amount = random.choice([1000, 2500, 5000])
+        txns.append({
+            "scheme_code": str(100000 + n % n_schemes),
+            "type": "SIP" if n % 3 else "LUMPSUM",
+            "amount": amount,
+            "units": amount / nav,
+            "purchase_nav": nav,
+            "purchase_date": today - timedelta(days=random.randint(1, 3650)),
+            "account_name": f"Account {n % n_accounts}"
+        })
+    db.bulk_insert_mappings(Investment, txns)
+    db.bulk_insert_mappings(Watchlist, [{
+        "scheme_code": str(100000 + i),
+        "added_on": today - timedelta(days=random.randint(30, 700)),
+        "added_nav": random.uniform(10, 200),
+        "account_name": "Default"
+    } for i in range(n_schemes)])
+    db.commit()
+    db.close()
+
+
+def old_encode(content):
+    """Previous path: jsonable_encoder walk, then Starlette's json.dumps."""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, len(body) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--schemes", type=int, default=200)
+    parser.add_argument("--history-days", type=int, default=3650)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.transactions} transactions, {args.schemes} schemes, {args.history_days} days of NAVs...")
+    seed(args.transactions, args.schemes, args.history_days)
+
+    import main as app_main  # after seeding, so startup migrations see the data
+    db = SessionLocal()
+    scheme_master.rebuild(db)
+    summary = portfolio.get_portfolio_summary(db)
+    watchlist = portfolio.get_watchlist(db)
+    code = "100000"
+
+    def investments_old():
+        rows = db.query(Investment).options(joinedload(Investment.scheme)).order_by(Investment.purchase_date.desc()).all()
+        return old_encode(rows)
+
+    def investments_new():
+        rows = db.query(*[getattr(Investment, f) for f in app_main.INVESTMENT_FIELDS]).order_by(Investment.purchase_date.desc()).all()
+        return serialization.dumps(app_main._investment_dicts(db, rows))
+
+    def history_old():
+        rows = db.query(NAVHistory).filter(NAVHistory.scheme_code == code).order_by(NAVHistory.date.desc()).all()
+        return old_encode(rows)
+
+    def history_new():
+        return serialization.dumps(history.get_scheme_history(db, code))
+
+    print(f"{'endpoint':<34}{'old ms':>10}{'new ms':>10}{'old KiB':>10}{'new KiB':>10}")
+    for name, old, new in [
+        ("/api/portfolio (encode)", lambda: old_encode(summary), lambda: serialization.dumps(summary)),
+        ("/api/watchlist (encode)", lambda: old_encode(watchlist), lambda: serialization.dumps(watchlist)),
+        ("/api/investments (query+encode)", investments_old, investments_new),
+        ("/api/schemes/{code}/history", history_old, history_new),
+    ]:
+        old_ms, old_kib = measure(old, args.runs)
+        new_ms, new_kib = measure(new, args.runs)
+        print(f"{name:<34}{old_ms:>10.1f}{new_ms:>10.1f}{old_kib:>10.1f}{new_kib:>10.1f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
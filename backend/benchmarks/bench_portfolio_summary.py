@@ -0,0 +1,162 @@
+"""
+Benchmark for the portfolio summary hot path.
+
+Seeds a throwaway SQLite database with 50k+ transactions and compares
+loading them as hydrated ORM objects (old path) against column-projected
+row tuples (current path), then times the full and incremental summary.
+
+Usage (from backend/):
+    python benchmarks/bench_portfolio_summary.py [--transactions 52000] [--schemes 100]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# database.py uses a cwd-relative SQLite file; keep the benchmark DB out of the repo
+os.chdir(tempfile.mkdtemp(prefix="navio-bench-"))
+
+from database import Base, engine, SessionLocal  # noqa: E402
+from models import Investment, Scheme, SIPMandate, NAVHistory  # noqa: E402
+from services import portfolio, cache  # noqa: E402
+
+
+def seed(n_transactions, n_schemes, n_accounts=4, history_days=400):
+    random.seed(42)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    today = date.today()
+
+    schemes, history = [], []
+    for i in range(n_schemes):
+        code = str(100000 + i)
+        nav = random.uniform(10, 200)
+        for d in range(history_days, -1, -1):
+            nav *= 1 + random.gauss(0.0004, 0.01)
+            history.append({"scheme_code": code, "date": today - timedelta(days=d), "net_asset_value": nav})
+        schemes.append({
+            "scheme_code": code,
+            "scheme_name": f"Bench Fund {i} - Direct Plan - Growth",
+            "category": "Equity Scheme - Flexi Cap Fund",
+            "fund_house": f"AMC {i % 20}",
+            "net_asset_value": nav,
+            "date": today
+        })
+    db.bulk_insert_mappings(Scheme, schemes)
+    db.bulk_insert_mappings(NAVHistory, history)
+
+    txns, mandates = [], []
+    for n in range(n_transactions):
+        code = str(100000 + n % n_schemes)
+        account = f"Account {n % n_accounts}"
+        nav = random.uniform(10, 200)
+        amount = random.choice([1000, 2500, 5000])
+        txns.append({
+            "scheme_code": code,
+            "type": "SIP" if n % 3 else "LUMPSUM",
+            "amount": amount,
+            "units": amount / nav,
+            "purchase_nav": nav,
+            "purchase_date": today - timedelta(days=random.randint(1, 3650)),
+            "account_name": account
+        })
+    for i in range(n_schemes):
+        mandates.append({
+            "scheme_code": str(100000 + i),
+            "account_name": f"Account {i % n_accounts}",
+            "sip_amount": 5000,
+            "start_date": today - timedelta(days=3650),
+            "duration_years": 10,
+            "status": "ACTIVE"
+        })
+    db.bulk_insert_mappings(Investment, txns)
+    db.bulk_insert_mappings(SIPMandate, mandates)
+    db.commit()
+    db.close()
+
+
+def load_orm():
+    """Old path: full ORM hydration of every Investment and SIPMandate row."""
+    db = SessionLocal()
+    investments = db.query(Investment).all()
+    mandates = db.query(SIPMandate).all()
+    db.close()
+    return investments, mandates
+
+
+def load_projected():
+    """Current path: only the columns the summary needs, as row tuples."""
+    db = SessionLocal()
+    investments = db.query(
+        Investment.id, Investment.scheme_code, Investment.type, Investment.amount,
+        Investment.units, Investment.purchase_date, Investment.holding_period,
+        Investment.account_name
+    ).all()
+    mandates = db.query(
+        SIPMandate.scheme_code, SIPMandate.account_name,
+        SIPMandate.start_date, SIPMandate.duration_years
+    ).all()
+    db.close()
+    return investments, mandates
+
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(timings) * 1000, peak / (1024 * 1024)
+
+
+def full_summary():
+    cache.bump_data_version(all_holdings=True)
+    db = SessionLocal()
+    portfolio.get_portfolio_summary(db)
+    db.close()
+
+
+def incremental_summary():
+    db = SessionLocal()
+    portfolio.add_investment(db, "100000", "SIP", 1000, 50.0, date.today(), account_name="Account 0")
+    portfolio.get_portfolio_summary(db)
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transactions", type=int, default=52000)
+    parser.add_argument("--schemes", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Seeding {args.transactions} transactions across {args.schemes} schemes...")
+    seed(args.transactions, args.schemes)
+
+    print(f"{'path':<28}{'median ms':>12}{'peak MiB':>12}")
+    for name, fn in [
+        ("load: ORM hydration", load_orm),
+        ("load: column projection", load_projected),
+        ("summary: full rebuild", full_summary),
+        ("summary: after 1 write", incremental_summary),
+    ]:
+        ms, mib = measure(fn, args.runs)
+        print(f"{name:<28}{ms:>12.1f}{mib:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from database import engine, Base, get_db
 import models
 from services.nav import fetch_nav_data, parse_and_sync_nav_data
+from services import cache, serialization
+from services.serialization import FastJSONResponse
+from services.cache import bump_data_version
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -63,6 +66,67 @@ try:
                     pass
             print("Migration complete.")
             
+    # Auto-migration for drop_alert_pct column in watchlist
+    if 'watchlist' in inspector.get_table_names():
+        columns = [c['name'] for c in inspector.get_columns('watchlist')]
+        if 'drop_alert_pct' not in columns:
+            print("Migrating DB: Adding drop_alert_pct column to watchlist...")
+            with engine.connect() as connection:
+                connection.execute(text("ALTER TABLE watchlist ADD COLUMN drop_alert_pct FLOAT"))
+                try:
+                    connection.commit()
+                except:
+                    pass
+            print("Migration complete.")
+
+    # Auto-migration for amc_id / category_id dimension keys in schemes
+    if 'schemes' in inspector.get_table_names():
+        columns = [c['name'] for c in inspector.get_columns('schemes')]
+        if 'amc_id' not in columns or 'category_id' not in columns:
+            print("Migrating DB: Adding amc_id and category_id columns to schemes...")
+            with engine.connect() as connection:
+                if 'amc_id' not in columns:
+                    connection.execute(text("ALTER TABLE schemes ADD COLUMN amc_id INTEGER REFERENCES amcs(id)"))
+                if 'category_id' not in columns:
+                    connection.execute(text("ALTER TABLE schemes ADD COLUMN category_id INTEGER REFERENCES scheme_categories(id)"))
+                connection.execute(text("CREATE INDEX IF NOT EXISTS ix_schemes_amc_id ON schemes (amc_id)"))
+                connection.execute(text("CREATE INDEX IF NOT EXISTS ix_schemes_category_id ON schemes (category_id)"))
+                try:
+                    connection.commit()
+                except:
+                    pass
+            print("Migration complete.")
+
+        # Backfill an empty category table from existing AMFI category headers (databases from
+        # before it existed). Text without the header's parentheses came from MFAPI and is left
+        # for the next sync. AMCs are not backfilled: fund_house was only set on held schemes
+        # (from MFAPI), so /api/schemes/amc keeps guessing from names until a sync fills amcs.
+        from sqlalchemy import func, insert, select, update
+        with engine.begin() as connection:
+            if not connection.execute(select(func.count()).select_from(models.SchemeCategory)).scalar():
+                is_header = models.Scheme.category.like("%(%)%")
+                names = connection.execute(select(models.Scheme.category).where(is_header).distinct()).scalars().all()
+                if names:
+                    print("Migrating DB: Populating scheme_categories from schemes...")
+                    connection.execute(insert(models.SchemeCategory), [{"name": name} for name in names])
+                    connection.execute(
+                        update(models.Scheme)
+                        .where(is_header)
+                        .values(category_id=select(models.SchemeCategory.id).where(models.SchemeCategory.name == models.Scheme.category).scalar_subquery())
+                    )
+                    print("Migration complete.")
+
+    # Auto-migration: keyset pagination indexes on investments (create_all skips existing tables)
+    if 'investments' in inspector.get_table_names():
+        with engine.connect() as connection:
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_investments_purchase_date_id ON investments (purchase_date, id)"))
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_investments_account_purchase_date_id ON investments (account_name, purchase_date, id)"))
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_investments_scheme_purchase_date_id ON investments (scheme_code, purchase_date, id)"))
+            try:
+                connection.commit()
+            except:
+                pass
+
     # Auto-migration: Populate accounts table from existing data
     if 'accounts' in inspector.get_table_names():
         with Session(engine) as session:
@@ -93,11 +157,28 @@ try:
             except Exception as e:
                 print(f"Account population failed: {e}")
                 session.rollback()
+
+    # Auto-migration: rebuild Portfolio rows that drifted from the transactions (redemptions
+    # used to reduce another account's row of the same scheme)
+    if 'portfolio' in inspector.get_table_names() and 'investments' in inspector.get_table_names():
+        from services.portfolio import repair_portfolio_aggregates
+        with Session(engine) as session:
+            repaired = repair_portfolio_aggregates(session)
+            if repaired:
+                print(f"Migrating DB: Rebuilt {repaired} portfolio rows from transactions.")
             
 except Exception as e:
     print(f"Migration check failed: {e}")
 
-app = FastAPI(title="Mutual Fund Tracker")
+# Full-text scheme search (FTS5 on SQLite, LIKE otherwise) and the in-memory fuzzy index
+from services import search, fuzzy, scheme_master
+from database import SessionLocal
+search.ensure_search_index(engine)
+fuzzy.warm_index(SessionLocal)
+# Read-only snapshot of the scheme master for code lookups, search results and the AMC list
+scheme_master.warm(SessionLocal)
+
+app = FastAPI(title="Mutual Fund Tracker", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -105,8 +186,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+def cached_response(request: Request, namespace: str, key, compute):
+    """
+    Serves a computed payload from the data-versioned cache.
+    Returns 304 Not Modified when the client's ETag matches the current data version.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    etag = cache.make_etag(cache.get_version_token(), namespace, key)
+    if cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # The encoded body is cached, so a hit is served without encoding anything
+    token, body = cache.get_or_compute(namespace, key, lambda: serialization.dumps(compute()))
+    etag = cache.make_etag(token, namespace, key)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @app.get("/")
 def read_root():
     return {"message": "Mutual Fund Tracker API is running"}
@@ -123,8 +220,10 @@ def sync_nav(db: Session = Depends(get_db)):
 
 from pydantic import BaseModel
 from datetime import date
-from typing import Optional
-from services import portfolio
+from typing import Optional, List
+from services import portfolio, timeseries, tax, planner, insights, alerts, sip, nav_index, history, returns, risk
+from services.importer import TransactionImporter
+from starlette.concurrency import run_in_threadpool
 
 class InvestmentBase(BaseModel):
     scheme_code: str
@@ -155,6 +254,7 @@ def create_sip_mandate(mandate: SIPMandateBase, db: Session = Depends(get_db)):
     )
     db.add(db_mandate)
     db.commit()
+    bump_data_version(holdings=[(mandate.scheme_code, mandate.account_name)])
     db.refresh(db_mandate)
     return db_mandate
 
@@ -172,6 +272,7 @@ def update_sip_mandate(mandate_id: int, mandate: SIPMandateBase, db: Session = D
     if not db_mandate:
         raise HTTPException(status_code=404, detail="Mandate not found")
     
+    old_holding_key = (db_mandate.scheme_code, db_mandate.account_name)
     db_mandate.scheme_code = mandate.scheme_code
     db_mandate.account_name = mandate.account_name
     db_mandate.sip_amount = mandate.sip_amount
@@ -180,6 +281,7 @@ def update_sip_mandate(mandate_id: int, mandate: SIPMandateBase, db: Session = D
     db_mandate.status = mandate.status
     
     db.commit()
+    bump_data_version(holdings=[old_holding_key, (mandate.scheme_code, mandate.account_name)])
     db.refresh(db_mandate)
     return db_mandate
 
@@ -190,20 +292,22 @@ def delete_sip_mandate(mandate_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Mandate not found")
         
     # Hard Delete: Remove all historical SIP investments for this strategy
-    # to clean up the portfolio stats
-    related_investments = db.query(models.Investment).filter(
-        models.Investment.scheme_code == db_mandate.scheme_code,
-        models.Investment.account_name == db_mandate.account_name,
-        models.Investment.type == 'SIP'
-    ).all()
-    
-    count = 0
-    for inv in related_investments:
-        portfolio.delete_investment(db, inv.id)
-        count += 1
-        
-    db.delete(db_mandate)
-    db.commit()
+    # to clean up the portfolio stats (one statement, aggregates recomputed once)
+    holding_key = (db_mandate.scheme_code, db_mandate.account_name)
+    try:
+        count = db.query(models.Investment).filter(
+            models.Investment.scheme_code == db_mandate.scheme_code,
+            models.Investment.account_name == db_mandate.account_name,
+            models.Investment.type == 'SIP'
+        ).delete(synchronize_session=False)
+
+        portfolio.rebuild_portfolio_aggregates(db, [holding_key])
+        db.delete(db_mandate)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    bump_data_version(holdings=[holding_key])
     return {"message": f"Mandate and {count} historical transactions deleted"}
 
 class ConvertSipRequest(BaseModel):
@@ -237,12 +341,28 @@ def convert_sip_to_lumpsum(mandate_id: int, request: ConvertSipRequest, db: Sess
         models.Investment.purchase_date: request.start_date
     }, synchronize_session=False)
 
-    db.commit()
+    # 3. Purchase dates moved, so recompute the holding's aggregate in the same transaction
+    holding_key = (db_mandate.scheme_code, db_mandate.account_name)
+    try:
+        portfolio.rebuild_portfolio_aggregates(db, [holding_key])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    bump_data_version(holdings=[holding_key])
     return {
         "message": f"SIP converted to Lumpsum. Strategy stopped and {updated_count} transactions updated.",
         "updated_transactions": updated_count
     }
 
+@app.post("/api/sips/materialize")
+def materialize_sip_installments(until: Optional[date] = None, dry_run: bool = False, db: Session = Depends(get_db)):
+    """
+    Creates the due monthly SIP transactions of all ACTIVE mandates up to `until` (default today),
+    priced from NAV history. Safe to rerun: months that already have a SIP entry are skipped.
+    """
+    return sip.materialize_sip_installments(db, until=until, dry_run=dry_run)
+
 class RedeemRequest(BaseModel):
     scheme_code: str
     units: float
@@ -255,6 +375,7 @@ class WatchlistBase(BaseModel):
     scheme_code: str
     group_id: Optional[int] = None
     target_nav: Optional[float] = None
+    drop_alert_pct: Optional[float] = None
     units: Optional[float] = 0.0
     invested_amount: Optional[float] = 0.0
 
@@ -271,6 +392,7 @@ def add_to_watchlist(item: WatchlistBase, db: Session = Depends(get_db)):
         item.scheme_code, 
         group_id=item.group_id,
         target_nav=item.target_nav,
+        drop_alert_pct=item.drop_alert_pct,
         units=item.units,
         invested_amount=item.invested_amount
     )
@@ -312,8 +434,42 @@ def update_watchlist_item_date(item_id: int, request: UpdateDateRequest, db: Ses
     return result
 
 @app.get("/api/watchlist")
-def get_watchlist(db: Session = Depends(get_db)):
-    return portfolio.get_watchlist(db)
+def get_watchlist(request: Request, db: Session = Depends(get_db)):
+    return cached_response(request, "watchlist", None, lambda: portfolio.get_watchlist(db))
+
+class NavLookupItem(BaseModel):
+    scheme_code: str
+    date: date
+
+class NavLookupRequest(BaseModel):
+    items: List[NavLookupItem]
+
+# Upper bound on pairs priced in one request
+MAX_NAV_LOOKUP_ITEMS = 20000
+
+@app.post("/api/nav/lookup")
+def lookup_navs(request: NavLookupRequest, db: Session = Depends(get_db)):
+    """Get the NAV on or before each (scheme_code, date) pair, with the date actually used"""
+    if len(request.items) > MAX_NAV_LOOKUP_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_NAV_LOOKUP_ITEMS} items per request")
+    return nav_index.lookup_navs(db, [(item.scheme_code, item.date) for item in request.items])
+
+@app.get("/api/alerts")
+def get_alerts(unread_only: bool = False, limit: int = 50, db: Session = Depends(get_db)):
+    """Get the alert feed (newest first) with the unread count"""
+    return {
+        "unread_count": alerts.get_unread_count(db),
+        "alerts": alerts.get_alerts(db, unread_only=unread_only, limit=limit)
+    }
+
+class MarkAlertsReadRequest(BaseModel):
+    alert_ids: Optional[List[int]] = None
+
+@app.post("/api/alerts/read")
+def mark_alerts_read(request: MarkAlertsReadRequest, db: Session = Depends(get_db)):
+    """Mark alerts as read (all unread alerts if alert_ids is omitted)"""
+    count = alerts.mark_alerts_read(db, request.alert_ids)
+    return {"message": f"Marked {count} alerts as read"}
 
 @app.get("/api/watchlist/groups")
 def get_watchlist_groups(db: Session = Depends(get_db)):
@@ -338,26 +494,122 @@ def delete_watchlist_group(group_id: int, db: Session = Depends(get_db)):
     return {"message": "Group deleted successfully"}
 
 @app.get("/api/portfolio")
-def get_portfolio(type: Optional[str] = None, db: Session = Depends(get_db)):
+def get_portfolio(request: Request, type: Optional[str] = None, db: Session = Depends(get_db)):
     """Get portfolio summary with current valuation"""
-    return portfolio.get_portfolio_summary(db, filter_type=type)
+    filter_key = type if type and type.lower() != 'all' else None
+    return cached_response(request, "portfolio", filter_key, lambda: portfolio.get_portfolio_summary(db, filter_type=type))
+
+@app.get("/api/portfolio/insights")
+def get_portfolio_insights(request: Request, type: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get AMC / asset / category allocation and Portfolio IQ insights"""
+    filter_key = type if type and type.lower() != 'all' else None
+    return cached_response(request, "insights", filter_key, lambda: insights.get_portfolio_insights(db, filter_type=type))
+
+@app.get("/api/portfolio/timeseries")
+def get_portfolio_timeseries(
+    request: Request,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    interval: str = "daily",
+    account: Optional[str] = None,
+    scheme_code: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get invested amount, market value and unrealized P&L over time (daily or weekly)"""
+    if interval not in ("daily", "weekly"):
+        raise HTTPException(status_code=400, detail="interval must be 'daily' or 'weekly'")
+    key = (from_date, to_date, interval, account, scheme_code)
+    return cached_response(request, "timeseries", key, lambda: timeseries.get_portfolio_timeseries(
+        db, start_date=from_date, end_date=to_date, interval=interval, account_name=account, scheme_code=scheme_code
+    ))
+
+@app.get("/api/portfolio/aggregate")
+def get_portfolio_aggregates(request: Request, by: str = "account", db: Session = Depends(get_db)):
+    """Get invested amount, value, gain and counts grouped by account, fund_house, category or group"""
+    if by not in ("account", "fund_house", "category", "group"):
+        raise HTTPException(status_code=400, detail="by must be one of: account, fund_house, category, group")
+    return cached_response(request, "aggregate", by, lambda: portfolio.get_portfolio_aggregates(db, by))
+
+@app.get("/api/portfolio/risk")
+def get_portfolio_risk(
+    request: Request,
+    account: Optional[str] = None,
+    years: int = 3,
+    benchmark: Optional[str] = None,
+    risk_free: float = risk.DEFAULT_RISK_FREE_RATE,
+    db: Session = Depends(get_db)
+):
+    """Get volatility, max drawdown, Sharpe, Sortino and downside capture per holding and for the whole portfolio"""
+    if years < 1 or years > 10:
+        raise HTTPException(status_code=400, detail="years must be between 1 and 10")
+    key = (account, years, benchmark, risk_free)
+    return cached_response(request, "portfolio_risk", key, lambda: risk.get_portfolio_risk(
+        db, account_name=account, years=years, risk_free=risk_free, benchmark=benchmark
+    ))
+
+@app.get("/api/tax/lots")
+def get_tax_lots(scheme_code: Optional[str] = None, account: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get open and realized FIFO tax lots per scheme and account"""
+    return tax.get_tax_lots(db, scheme_code=scheme_code, account_name=account)
+
+@app.get("/api/tax/capital-gains")
+def get_capital_gains(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    account: Optional[str] = None,
+    scheme_code: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get realized capital gains per FIFO lot, classified as STCG or LTCG"""
+    return tax.get_capital_gains(db, start_date=from_date, end_date=to_date, account_name=account, scheme_code=scheme_code)
+
+class RedemptionPlanRequest(BaseModel):
+    target_amount: float
+    account_name: Optional[str] = None
+    scheme_codes: Optional[List[str]] = None
+
+@app.get("/api/reports/realized")
+def get_realized_report(
+    request: Request,
+    fy: Optional[List[str]] = Query(None),
+    account: Optional[str] = None,
+    scheme_code: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get realized P&L by financial year, account and scheme (STCG/LTCG split)"""
+    key = (tuple(fy or ()), account, scheme_code)
+    return cached_response(request, "realized_report", key, lambda: tax.get_realized_report(db, fy, account, scheme_code))
+
+@app.post("/api/tax/redemption-plan")
+def get_redemption_plan(request: RedemptionPlanRequest, db: Session = Depends(get_db)):
+    """Plan which FIFO lots to redeem to raise an amount with the least short-term gain"""
+    if request.target_amount <= 0:
+        raise HTTPException(status_code=400, detail="target_amount must be positive")
+    return planner.plan_redemption(db, request.target_amount, account_name=request.account_name, scheme_codes=request.scheme_codes)
+
+@app.get("/api/tax/harvest")
+def get_harvest_opportunities(account: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get unused equity LTCG exemption per account and the long-term units that could use it"""
+    return planner.get_harvest_opportunities(db, account_name=account)
 
 @app.get("/api/accounts")
 def get_accounts(db: Session = Depends(get_db)):
     """Get list of defined accounts with item counts."""
+    from sqlalchemy import func
     accounts = db.query(models.Account).order_by(models.Account.name).all()
+
+    # Count investments (active tracking entries) and portfolio items (history/aggregated)
+    # with one grouped query each instead of two counts per account
+    inv_counts = dict(db.query(models.Investment.account_name, func.count(models.Investment.id)).group_by(models.Investment.account_name).all())
+    port_counts = dict(db.query(models.Portfolio.account_name, func.count(models.Portfolio.id)).group_by(models.Portfolio.account_name).all())
+
     result = []
     for acc in accounts:
-        # Count investments (active tracking entries)
-        inv_count = db.query(models.Investment).filter(models.Investment.account_name == acc.name).count()
-        # Count portfolio items (history/aggregated)
-        port_count = db.query(models.Portfolio).filter(models.Portfolio.account_name == acc.name).count()
-        
         result.append({
             "id": acc.id, 
             "name": acc.name, 
-            "item_count": inv_count, # Only block on Active Investments
-            "history_count": port_count
+            "item_count": inv_counts.get(acc.name, 0), # Only block on Active Investments
+            "history_count": port_counts.get(acc.name, 0)
         })
     return result
 
@@ -371,6 +623,7 @@ def create_account(account: AccountBase, db: Session = Depends(get_db)):
     new_account = models.Account(name=account.name)
     db.add(new_account)
     db.commit()
+    bump_data_version()
     db.refresh(new_account)
     return {"id": new_account.id, "name": new_account.name, "item_count": 0, "history_count": 0}
 
@@ -399,6 +652,7 @@ def update_account(account_id: int, account: AccountBase, db: Session = Depends(
         db.query(models.Portfolio).filter(models.Portfolio.account_name == old_name).update({models.Portfolio.account_name: new_name})
         
     db.commit()
+    bump_data_version(all_holdings=True)
     db.refresh(db_account)
     
     # helper count
@@ -426,6 +680,7 @@ def delete_account(account_id: int, db: Session = Depends(get_db)):
     
     db.delete(db_account)
     db.commit()
+    bump_data_version()
     return {"message": "Account deleted successfully"}
 
 @app.delete("/api/portfolio/scheme/{scheme_code}")
@@ -450,6 +705,17 @@ def add_investment(investment: InvestmentBase, db: Session = Depends(get_db)):
         account_name=investment.account_name
     )
 
+@app.post("/api/investments/import")
+async def import_investments(request: Request, account_name: str = "Default", dry_run: bool = False, db: Session = Depends(get_db)):
+    """
+    Bulk import transactions from a CSV body (our columns or a CAMS/KFintech statement export).
+    The body is parsed as it streams in; valid rows are inserted in one transaction.
+    """
+    importer = TransactionImporter(db, account_name)
+    async for chunk in request.stream():
+        importer.feed(chunk)
+    return await run_in_threadpool(importer.finish, dry_run)
+
 @app.post("/api/redeem")
 def redeem_investment(redemption: RedeemRequest, db: Session = Depends(get_db)):
     """Redeem (sell) mutual fund units"""
@@ -463,10 +729,28 @@ def redeem_investment(redemption: RedeemRequest, db: Session = Depends(get_db)):
         account_name=redemption.account_name
     )
 
+# Largest page served by GET /api/investments?limit=
+MAX_INVESTMENTS_PAGE = 500
+
 @app.get("/api/investments")
-def get_investments(type: Optional[str] = None, active_only: bool = False, db: Session = Depends(get_db)):
-    from sqlalchemy.orm import joinedload
-    query = db.query(models.Investment).options(joinedload(models.Investment.scheme))
+def get_investments(
+    type: Optional[str] = None,
+    active_only: bool = False,
+    account: Optional[str] = None,
+    scheme_code: Optional[str] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    List transactions, newest first.
+    Without `limit` returns the full list; with `limit` returns one page
+    ({"items", "next_cursor"}) using keyset pagination on (purchase_date, id).
+    """
+    from sqlalchemy import tuple_
+    query = db.query(*[getattr(models.Investment, field) for field in INVESTMENT_FIELDS])
     
     if active_only:
         # Join with Portfolio to check if scheme is active (units > 0)
@@ -478,7 +762,50 @@ def get_investments(type: Optional[str] = None, active_only: bool = False, db: S
 
     if type:
         query = query.filter(models.Investment.type == type)
-    return query.order_by(models.Investment.purchase_date.desc()).all()
+    if account:
+        query = query.filter(models.Investment.account_name == account)
+    if scheme_code:
+        query = query.filter(models.Investment.scheme_code == scheme_code)
+    if from_date:
+        query = query.filter(models.Investment.purchase_date >= from_date)
+    if to_date:
+        query = query.filter(models.Investment.purchase_date <= to_date)
+
+    if limit is None:
+        rows = query.order_by(models.Investment.purchase_date.desc()).all()
+        return FastJSONResponse(_investment_dicts(db, rows))
+
+    if limit < 1 or limit > MAX_INVESTMENTS_PAGE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_INVESTMENTS_PAGE}")
+    if cursor:
+        try:
+            cursor_date, cursor_id = cursor.split("_")
+            key = (date.fromisoformat(cursor_date), int(cursor_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(tuple_(models.Investment.purchase_date, models.Investment.id) < key)
+
+    # Walks ix_investments_purchase_date_id (or the account / scheme variant) backwards;
+    # one extra row tells if there is a next page
+    rows = query.order_by(models.Investment.purchase_date.desc(), models.Investment.id.desc()).limit(limit + 1).all()
+    items = rows[:limit]
+    next_cursor = f"{items[-1].purchase_date.isoformat()}_{items[-1].id}" if len(rows) > limit else None
+    return FastJSONResponse({"items": _investment_dicts(db, items), "next_cursor": next_cursor})
+
+INVESTMENT_FIELDS = ("id", "scheme_code", "type", "amount", "units", "purchase_nav", "purchase_date", "holding_period", "account_name")
+
+def _investment_dicts(db: Session, rows):
+    """
+    Investment rows as plain dicts with the nested `scheme`, built from column
+    tuples and the scheme master instead of hydrating and introspecting ORM objects.
+    """
+    schemes = scheme_master.get_schemes(db, {r.scheme_code for r in rows})
+    items = []
+    for r in rows:
+        item = dict(zip(INVESTMENT_FIELDS, r))
+        item["scheme"] = schemes.get(r.scheme_code)
+        items.append(item)
+    return items
 
 @app.delete("/api/investments/{investment_id}")
 def delete_investment(investment_id: int, db: Session = Depends(get_db)):
@@ -526,15 +853,31 @@ def redeem_investment(request: RedeemRequest, db: Session = Depends(get_db)):
 
 @app.get("/api/schemes/search")
 def search_schemes(query: str = "", limit: int = 50, db: Session = Depends(get_db)):
-    """Search schemes by name"""
-    schemes = db.query(models.Scheme).filter(
-        models.Scheme.scheme_name.like(f"%{query}%")
-    ).limit(limit).all()
-    return schemes
+    """Search schemes by name (prefix match per word, best matches first)"""
+    return search.search_schemes(db, query, limit)
+
+@app.get("/api/schemes/fuzzy")
+def fuzzy_search_schemes(query: str = "", limit: int = 20, direct_growth: bool = False, db: Session = Depends(get_db)):
+    """Typo-tolerant scheme search over name, fund house and category (in-memory trigram index)"""
+    return fuzzy.search(db, query, limit=limit, direct_growth_only=direct_growth)
 
 @app.get("/api/schemes/amc")
 def get_amcs(db: Session = Depends(get_db)):
-    """Get list of unique AMC names"""
+    """Get list of AMC names (exact fund houses from the AMFI NAV file)"""
+    amcs = scheme_master.get_amc_names()
+    if amcs:
+        return amcs
+    from sqlalchemy import exists
+    # One ix_schemes_amc_id probe per AMC instead of scanning scheme names
+    amcs = db.query(models.AMC.name).filter(
+        exists().where(models.Scheme.amc_id == models.AMC.id)
+    ).order_by(models.AMC.name).all()
+    if amcs:
+        return [name for (name,) in amcs]
+    return _guess_amcs_from_names(db)
+
+def _guess_amcs_from_names(db: Session):
+    """AMC names guessed from scheme names; used until the first sync fills the AMC table."""
     schemes = db.query(models.Scheme.scheme_name).distinct().all()
     amcs = set()
     
@@ -569,12 +912,34 @@ def get_amcs(db: Session = Depends(get_db)):
     
     return sorted(list(amcs))
 
+@app.get("/api/schemes/categories")
+def get_scheme_categories(db: Session = Depends(get_db)):
+    """Get list of scheme categories (AMFI category headers)"""
+    categories = scheme_master.get_category_names()
+    if categories is not None:
+        return categories
+    from sqlalchemy import exists
+    categories = db.query(models.SchemeCategory.name).filter(
+        exists().where(models.Scheme.category_id == models.SchemeCategory.id)
+    ).order_by(models.SchemeCategory.name).all()
+    return [name for (name,) in categories]
+
 @app.get("/api/schemes")
-def get_schemes_by_amc(amc: Optional[str] = None, db: Session = Depends(get_db)):
-    """Get schemes filtered by AMC"""
+def get_schemes_by_amc(amc: Optional[str] = None, category: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get schemes filtered by AMC and/or category"""
     query = db.query(models.Scheme)
     if amc:
-        query = query.filter(models.Scheme.scheme_name.like(f"{amc}%"))
+        amc_id = db.query(models.AMC.id).filter(models.AMC.name == amc).scalar()
+        if amc_id is not None:
+            query = query.filter(models.Scheme.amc_id == amc_id)
+        else:
+            # Names guessed by _guess_amcs_from_names (AMC table not filled yet)
+            query = query.filter(models.Scheme.scheme_name.like(f"{amc}%"))
+    if category:
+        category_id = db.query(models.SchemeCategory.id).filter(models.SchemeCategory.name == category).scalar()
+        if category_id is None:
+            return []
+        query = query.filter(models.Scheme.category_id == category_id)
     return query.limit(100).all()
 
 @app.get("/api/sync-status")
@@ -593,20 +958,104 @@ def get_sync_status(db: Session = Depends(get_db)):
 @app.get("/api/schemes/code/{scheme_code}")
 def get_scheme_by_code(scheme_code: str, db: Session = Depends(get_db)):
     """Get scheme by exact code"""
-    scheme = db.query(models.Scheme).filter(
-        models.Scheme.scheme_code == scheme_code
-    ).first()
+    scheme = scheme_master.get_scheme(db, scheme_code)
     if not scheme:
         raise HTTPException(status_code=404, detail="Scheme not found")
     return scheme
 
+class SchemeBatchRequest(BaseModel):
+    codes: List[str]
+    fields: Optional[List[str]] = None
+
+# Upper bound on schemes per batch lookup
+MAX_SCHEME_BATCH = 5000
+
+@app.post("/api/schemes/batch")
+def get_schemes_by_codes(request: SchemeBatchRequest, db: Session = Depends(get_db)):
+    """Get many schemes by exact code in one call, optionally only some fields"""
+    codes = list(dict.fromkeys(request.codes))
+    if len(codes) > MAX_SCHEME_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCHEME_BATCH} codes per request")
+    fields = scheme_master.COLUMNS
+    if request.fields:
+        unknown = [f for f in request.fields if f not in scheme_master.COLUMNS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        fields = ("scheme_code",) + tuple(f for f in dict.fromkeys(request.fields) if f != "scheme_code")
+    schemes = scheme_master.get_schemes(db, codes, fields=fields)
+    return {
+        "schemes": [schemes[code] for code in codes if code in schemes],
+        "not_found": [code for code in codes if code not in schemes]
+    }
+
 @app.get("/api/schemes/{scheme_code}/history")
-def get_scheme_history(scheme_code: str, db: Session = Depends(get_db)):
-    """Get historical NAV data for a scheme"""
-    history = db.query(models.NAVHistory).filter(
-        models.NAVHistory.scheme_code == scheme_code
-    ).order_by(models.NAVHistory.date.desc()).all()
-    return history
+def get_scheme_history(
+    request: Request,
+    scheme_code: str,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    max_points: int = history.DEFAULT_MAX_POINTS,
+    db: Session = Depends(get_db)
+):
+    """Get historical NAV data for a scheme (date range, downsampled to max_points, columnar)"""
+    if max_points < 0 or 0 < max_points < 3:
+        raise HTTPException(status_code=400, detail="max_points must be 0 (all points) or at least 3")
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    key = (scheme_code, from_date, to_date, max_points)
+    return cached_response(request, "scheme_history", key, lambda: history.get_scheme_history(
+        db, scheme_code, start_date=from_date, end_date=to_date, max_points=max_points
+    ))
+
+# Upper bound on schemes per batch statistics request
+MAX_RETURN_STATS_SCHEMES = 500
+
+@app.get("/api/schemes/returns")
+def get_scheme_returns(request: Request, codes: List[str] = Query(...), db: Session = Depends(get_db)):
+    """Get 1M-5Y returns, CAGR and 52-week high/low for many schemes in one call"""
+    # Accepts ?codes=1&codes=2 as well as ?codes=1,2
+    scheme_codes = list(dict.fromkeys(c.strip() for value in codes for c in value.split(",") if c.strip()))
+    if not scheme_codes:
+        raise HTTPException(status_code=400, detail="codes is required")
+    if len(scheme_codes) > MAX_RETURN_STATS_SCHEMES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RETURN_STATS_SCHEMES} schemes per request")
+    key = tuple(sorted(scheme_codes))
+    return cached_response(request, "scheme_returns", key, lambda: _return_stats_payload(db, scheme_codes))
+
+def _return_stats_payload(db: Session, scheme_codes):
+    stats = returns.get_return_stats(db, scheme_codes)
+    return {
+        "schemes": [stats[code] for code in scheme_codes if code in stats],
+        "not_found": [code for code in scheme_codes if code not in stats]
+    }
+
+@app.get("/api/schemes/risk")
+def get_scheme_risk(
+    request: Request,
+    codes: List[str] = Query(...),
+    years: int = 3,
+    benchmark: Optional[str] = None,
+    risk_free: float = risk.DEFAULT_RISK_FREE_RATE,
+    db: Session = Depends(get_db)
+):
+    """Get volatility, max drawdown, Sharpe, Sortino and downside capture for many schemes"""
+    scheme_codes = list(dict.fromkeys(c.strip() for value in codes for c in value.split(",") if c.strip()))
+    if not scheme_codes:
+        raise HTTPException(status_code=400, detail="codes is required")
+    if len(scheme_codes) > MAX_RETURN_STATS_SCHEMES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RETURN_STATS_SCHEMES} schemes per request")
+    if years < 1 or years > 10:
+        raise HTTPException(status_code=400, detail="years must be between 1 and 10")
+    key = (tuple(sorted(scheme_codes)), years, benchmark, risk_free)
+    return cached_response(request, "scheme_risk", key, lambda: _scheme_risk_payload(db, scheme_codes, years, risk_free, benchmark))
+
+def _scheme_risk_payload(db: Session, scheme_codes, years, risk_free, benchmark):
+    metrics = risk.get_scheme_risk(db, scheme_codes, years=years, risk_free=risk_free, benchmark=benchmark)
+    return {
+        "benchmark": benchmark or risk.DEFAULT_BENCHMARK,
+        "schemes": [dict(scheme_code=code, **metrics[code]) for code in scheme_codes if code in metrics],
+        "not_found": [code for code in scheme_codes if code not in metrics]
+    }
 
 @app.get("/api/schemes/{scheme_code}/stats")
 def get_scheme_stats(scheme_code: str, db: Session = Depends(get_db)):
@@ -624,25 +1073,26 @@ def get_scheme_stats(scheme_code: str, db: Session = Depends(get_db)):
     
     if not history:
         # Fallback to current scheme NAV if no history
-        scheme = db.query(models.Scheme).filter(models.Scheme.scheme_code == scheme_code).first()
+        scheme = scheme_master.get_scheme(db, scheme_code)
         if scheme:
+            nav = scheme["net_asset_value"]
             return {
-                "high_52w": scheme.net_asset_value,
-                "low_52w": scheme.net_asset_value,
-                "current_nav": scheme.net_asset_value
+                "high_52w": nav,
+                "low_52w": nav,
+                "current_nav": nav
             }
         return {"high_52w": 0, "low_52w": 0, "current_nav": 0}
         
     navs = [h.net_asset_value for h in history]
     # Add current NAV from scheme master to ensure latest is included
-    scheme = db.query(models.Scheme).filter(models.Scheme.scheme_code == scheme_code).first()
+    scheme = scheme_master.get_scheme(db, scheme_code)
     if scheme:
-        navs.append(scheme.net_asset_value)
+        navs.append(scheme["net_asset_value"])
         
     return {
         "high_52w": max(navs),
         "low_52w": min(navs),
-        "current_nav": scheme.net_asset_value if scheme else 0
+        "current_nav": scheme["net_asset_value"] if scheme else 0
     }
 @app.get("/api/system/version")
 def get_system_version():
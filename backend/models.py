@@ -1,8 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
 
+class AMC(Base):
+    __tablename__ = "amcs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True) # e.g. "HDFC Mutual Fund" (AMFI AMC header)
+
+class SchemeCategory(Base):
+    __tablename__ = "scheme_categories"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True) # e.g. "Open Ended Schemes(Equity Scheme - Large Cap Fund)"
+
 class Scheme(Base):
     __tablename__ = "schemes"
 
@@ -10,6 +22,8 @@ class Scheme(Base):
     scheme_name = Column(String)
     category = Column(String, nullable=True)
     fund_house = Column(String, nullable=True)
+    amc_id = Column(Integer, ForeignKey("amcs.id"), nullable=True, index=True)
+    category_id = Column(Integer, ForeignKey("scheme_categories.id"), nullable=True, index=True)
     isin_div_payout = Column(String, nullable=True)
     isin_div_reinvestment = Column(String, nullable=True)
     net_asset_value = Column(Float)
@@ -31,6 +45,14 @@ class Investment(Base):
     
     scheme = relationship("Scheme")
 
+    # Keyset pagination order for GET /api/investments (newest first), unfiltered
+    # and filtered by account or scheme
+    __table_args__ = (
+        Index('ix_investments_purchase_date_id', 'purchase_date', 'id'),
+        Index('ix_investments_account_purchase_date_id', 'account_name', 'purchase_date', 'id'),
+        Index('ix_investments_scheme_purchase_date_id', 'scheme_code', 'purchase_date', 'id'),
+    )
+
 class Portfolio(Base):
     """Aggregated holding for a scheme"""
     __tablename__ = "portfolio"
@@ -58,6 +80,7 @@ class Watchlist(Base):
     scheme_code = Column(String, ForeignKey("schemes.scheme_code"))
     group_id = Column(Integer, ForeignKey("watchlist_groups.id"), nullable=True)
     target_nav = Column(Float, nullable=True)
+    drop_alert_pct = Column(Float, nullable=True) # Alert when NAV falls this % below its 52-week high
     units = Column(Float, default=0.0)
     invested_amount = Column(Float, default=0.0)
     added_on = Column(Date, default=datetime.date.today)
@@ -89,6 +112,23 @@ class NAVHistory(Base):
     )
 
 
+class Alert(Base):
+    __tablename__ = "alerts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    watchlist_id = Column(Integer, nullable=True, index=True) # Kept after the watchlist item is deleted
+    scheme_code = Column(String, ForeignKey("schemes.scheme_code"))
+    rule = Column(String) # TARGET_NAV, DROP_FROM_HIGH
+    threshold = Column(Float)
+    previous_nav = Column(Float)
+    nav = Column(Float)
+    nav_date = Column(Date)
+    message = Column(String)
+    created_at = Column(Date, default=datetime.date.today)
+    is_read = Column(Boolean, default=False, index=True)
+
+    scheme = relationship("Scheme")
+
 class Account(Base):
     __tablename__ = "accounts"
 
@@ -0,0 +1,136 @@
+import bisect
+import logging
+import numpy as np
+from datetime import timedelta
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from models import Alert, Scheme, Watchlist
+from services import nav_index
+
+logger = logging.getLogger(__name__)
+
+RULE_TARGET_NAV = "TARGET_NAV"
+RULE_DROP_FROM_HIGH = "DROP_FROM_HIGH"
+
+
+def evaluate_alerts(db: Session, nav_moves: dict):
+    """
+    Checks watchlist alert rules against the NAVs that moved in a sync.
+    nav_moves: {scheme_code: (previous_nav, nav, nav_date)}
+
+    An alert fires when a threshold is crossed between the previous and the new NAV:
+    - TARGET_NAV: NAV rises to or above Watchlist.target_nav
+    - DROP_FROM_HIGH: NAV falls Watchlist.drop_alert_pct % or more below its 52-week high
+    Thresholds are indexed per scheme in sorted order, so each moved scheme costs
+    two bisects plus the alerts that actually fire.
+    """
+    if not nav_moves:
+        return 0
+
+    targets, drops = _build_threshold_index(db, nav_moves.keys())
+    highs = _get_52w_highs(db, drops.keys(), nav_moves)
+    names = dict(db.query(Scheme.scheme_code, Scheme.scheme_name).filter(
+        Scheme.scheme_code.in_(set(targets) | set(drops))
+    ).all())
+
+    alerts = []
+    for code, (previous_nav, nav, nav_date) in nav_moves.items():
+        name = names.get(code, code)
+
+        # Targets in (previous_nav, nav] were crossed upwards
+        thresholds = targets.get(code)
+        if thresholds and nav > previous_nav:
+            lo = bisect.bisect_right(thresholds, (previous_nav, float("inf")))
+            hi = bisect.bisect_right(thresholds, (nav, float("inf")))
+            for target, item_id in thresholds[lo:hi]:
+                alerts.append(Alert(
+                    watchlist_id=item_id, scheme_code=code, rule=RULE_TARGET_NAV, threshold=target,
+                    previous_nav=previous_nav, nav=nav, nav_date=nav_date,
+                    message=f"{name} reached your target NAV of {target:g} (NAV {nav:g})."
+                ))
+
+        # Drop percentages in (previous drop, current drop] were crossed downwards
+        thresholds = drops.get(code)
+        high = highs.get(code)
+        if thresholds and high and nav < previous_nav:
+            previous_drop = max(0.0, (high - previous_nav) / high * 100)
+            drop = (high - nav) / high * 100
+            lo = bisect.bisect_right(thresholds, (previous_drop, float("inf")))
+            hi = bisect.bisect_right(thresholds, (drop, float("inf")))
+            for pct, item_id in thresholds[lo:hi]:
+                alerts.append(Alert(
+                    watchlist_id=item_id, scheme_code=code, rule=RULE_DROP_FROM_HIGH, threshold=pct,
+                    previous_nav=previous_nav, nav=nav, nav_date=nav_date,
+                    message=f"{name} is {drop:.1f}% below its 52-week high of {high:g} (NAV {nav:g})."
+                ))
+
+    if alerts:
+        db.add_all(alerts)
+        db.commit()
+        logger.info(f"Alert engine raised {len(alerts)} alerts for {len(nav_moves)} moved schemes.")
+    return len(alerts)
+
+
+def _build_threshold_index(db: Session, scheme_codes):
+    """Sorted (threshold, watchlist_id) lists per scheme for active (unsold) watchlist items."""
+    items = db.query(
+        Watchlist.id,
+        Watchlist.scheme_code,
+        Watchlist.target_nav,
+        Watchlist.drop_alert_pct
+    ).filter(
+        Watchlist.scheme_code.in_(set(scheme_codes)),
+        or_(Watchlist.is_sold == False, Watchlist.is_sold.is_(None)),
+        or_(Watchlist.target_nav > 0, Watchlist.drop_alert_pct > 0)
+    ).all()
+
+    targets = {}
+    drops = {}
+    for item in items:
+        if item.target_nav and item.target_nav > 0:
+            targets.setdefault(item.scheme_code, []).append((item.target_nav, item.id))
+        if item.drop_alert_pct and item.drop_alert_pct > 0:
+            drops.setdefault(item.scheme_code, []).append((item.drop_alert_pct, item.id))
+    for index in (targets, drops):
+        for thresholds in index.values():
+            thresholds.sort()
+    return targets, drops
+
+
+def _get_52w_highs(db: Session, scheme_codes, nav_moves: dict):
+    """Highest NAV in the 365 days up to each scheme's new NAV date (including the new NAV)."""
+    codes = set(scheme_codes)
+    if not codes:
+        return {}
+    series = nav_index.get_nav_series(db, codes)
+    highs = {}
+    for code in codes:
+        _, nav, nav_date = nav_moves[code]
+        dates, navs = series[code]
+        start = np.searchsorted(dates, np.datetime64(nav_date - timedelta(days=365), "D"))
+        end = np.searchsorted(dates, np.datetime64(nav_date, "D"), side="right")
+        window = navs[start:end]
+        highs[code] = max(float(window.max()), nav) if len(window) else nav
+    return highs
+
+
+def get_alerts(db: Session, unread_only: bool = False, limit: int = 50):
+    """Alert feed, newest first."""
+    query = db.query(Alert)
+    if unread_only:
+        query = query.filter(Alert.is_read == False)
+    return query.order_by(Alert.id.desc()).limit(limit).all()
+
+
+def get_unread_count(db: Session):
+    return db.query(Alert).filter(Alert.is_read == False).count()
+
+
+def mark_alerts_read(db: Session, alert_ids: list = None):
+    """Marks the given alerts (or all unread alerts) as read. Returns the number updated."""
+    query = db.query(Alert).filter(Alert.is_read == False)
+    if alert_ids is not None:
+        query = query.filter(Alert.id.in_(alert_ids))
+    count = query.update({Alert.is_read: True}, synchronize_session=False)
+    db.commit()
+    return count
@@ -0,0 +1,152 @@
+import hashlib
+import threading
+import time
+from datetime import date
+
+# Monotonically increasing data version. Every write path (investments, watchlist,
+# mandates, accounts, NAV sync) bumps it, which invalidates all computed responses.
+_lock = threading.Lock()
+_data_version = 0
+
+# Distinguishes server restarts so ETags from a previous process never match
+_boot_id = format(int(time.time() * 1000), "x")
+
+# (namespace, key) -> (version_token, value)
+_response_cache = {}
+
+# Incrementally maintained per-holding entries (portfolio summary per filter type, tax ledgers).
+# view_key -> {"entries": {(scheme_code, account_name): entry}, "dirty_keys": set(),
+#              "appended_keys": set(), "dirty_schemes": set(), "stale": bool, "day": date,
+#              "daily_refresh": bool, "track_appends": bool, "lock": Lock}
+_holding_views = {}
+
+# scheme_code -> change counter, bumped whenever a scheme's NAV, history or metadata changes
+_scheme_versions = {}
+
+
+def get_data_version():
+    """Returns the current data version."""
+    return _data_version
+
+
+def bump_data_version(holdings=None, schemes=None, all_holdings=False, appended=False):
+    """
+    Marks the underlying data as changed.
+    Called after every commit that mutates investments, watchlist, mandates, accounts or NAVs.
+
+    holdings: (scheme_code, account_name) pairs whose transactions or SIP mandate changed.
+    schemes: scheme codes whose NAV, history or metadata changed (all accounts).
+    all_holdings: forces a full rebuild of every cached holding.
+    appended: the holdings only gained new transactions (nothing edited or deleted),
+              so views tracking appends can apply them incrementally.
+    """
+    global _data_version
+    with _lock:
+        _data_version += 1
+        _response_cache.clear()
+        for view in _holding_views.values():
+            if all_holdings:
+                view["stale"] = True
+            if holdings:
+                target = view["appended_keys"] if appended and view["track_appends"] else view["dirty_keys"]
+                target.update((code, acc or "Default") for code, acc in holdings)
+            if schemes:
+                view["dirty_schemes"].update(schemes)
+        for code in schemes or ():
+            _scheme_versions[code] = _scheme_versions.get(code, 0) + 1
+        return _data_version
+
+
+def get_scheme_version(scheme_code):
+    """Change counter of a scheme's NAV data; used to validate per-scheme caches."""
+    return _scheme_versions.get(scheme_code, 0)
+
+
+def get_version_token():
+    """
+    Token identifying the current state of the data.
+    Includes today's date because summaries depend on it (52-week window, XIRR end date).
+    """
+    return f"{_boot_id}-{_data_version}-{date.today().isoformat()}"
+
+
+def make_etag(token, namespace, key=None):
+    """Builds a weak ETag for a cached response."""
+    suffix = hashlib.md5(repr(key).encode()).hexdigest()[:12] if key is not None else "all"
+    return f'W/"{token}-{namespace}-{suffix}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Checks an If-None-Match header value against an ETag."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def get_or_compute(namespace, key, compute):
+    """
+    Returns (version_token, value) for a cached computation, computing it on a miss.
+    Results computed while a write happened concurrently are returned but not stored.
+    """
+    token = get_version_token()
+    entry = _response_cache.get((namespace, key))
+    if entry and entry[0] == token:
+        return entry
+
+    value = compute()
+
+    with _lock:
+        if get_version_token() == token:
+            _response_cache[(namespace, key)] = (token, value)
+    return token, value
+
+
+def get_holding_view(view_key, daily_refresh=True, track_appends=False):
+    """
+    Returns an incremental per-holding view, creating a stale one if missing.
+    daily_refresh: rebuild fully once per day (for entries that depend on today's date).
+    track_appends: keep appended holdings separate from edited ones (see bump_data_version).
+    """
+    with _lock:
+        view = _holding_views.get(view_key)
+        if view is None:
+            view = {
+                "entries": {},
+                "dirty_keys": set(),
+                "appended_keys": set(),
+                "dirty_schemes": set(),
+                "stale": True,
+                "day": None,
+                "daily_refresh": daily_refresh,
+                "track_appends": track_appends,
+                "lock": threading.Lock()
+            }
+            _holding_views[view_key] = view
+        return view
+
+
+def claim_holding_changes(view):
+    """
+    Atomically takes the pending changes of a view.
+    Returns (stale, dirty_keys, dirty_schemes, appended_keys); changes marked
+    afterwards stay pending.
+    """
+    with _lock:
+        stale = view["stale"] or (view["daily_refresh"] and view["day"] != date.today())
+        dirty_keys = view["dirty_keys"]
+        dirty_schemes = view["dirty_schemes"]
+        appended_keys = view["appended_keys"] - dirty_keys
+        view["stale"] = False
+        view["day"] = date.today()
+        view["dirty_keys"] = set()
+        view["appended_keys"] = set()
+        view["dirty_schemes"] = set()
+        return stale, dirty_keys, dirty_schemes, appended_keys
+
+
+def mark_holding_view_stale(view):
+    """Forces a full rebuild of a view (used when a refresh fails midway)."""
+    with _lock:
+        view["stale"] = True
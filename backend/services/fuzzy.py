@@ -0,0 +1,160 @@
+import logging
+import re
+import threading
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from models import Scheme
+
+logger = logging.getLogger(__name__)
+
+# Results below this share of the query's trigrams are dropped
+MIN_SIMILARITY = 0.4
+
+# The current index; replaced as a whole by rebuild_index() so readers never see a partial one
+_index = None
+_build_lock = threading.Lock()
+
+
+def _normalize(value: str):
+    """Lower-cased letters and digits only, so 'Mid Cap', 'Mid-Cap' and 'midcap' look alike."""
+    return re.sub(r"[^a-z0-9]", "", (value or "").lower())
+
+
+def _trigrams(value: str):
+    text = _normalize(value)
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _category_name(category: str):
+    """'Open Ended Schemes(Equity Scheme - Mid Cap Fund)' -> 'Mid Cap Fund'."""
+    if not category:
+        return ""
+    inner = category.split("(")[1].split(")")[0] if "(" in category else category
+    return inner.split(" - ")[-1]
+
+
+def rebuild_index(db: Session):
+    """
+    Builds a trigram inverted index over scheme name, fund house and category
+    from one projected query, then swaps it in atomically.
+    """
+    global _index
+    with _build_lock:
+        rows = db.query(
+            Scheme.scheme_code,
+            Scheme.scheme_name,
+            Scheme.category,
+            Scheme.fund_house,
+            Scheme.net_asset_value,
+            Scheme.date
+        ).all()
+
+        postings = {}
+        sizes = np.zeros(len(rows), dtype=np.int32)
+        direct_growth = np.zeros(len(rows), dtype=bool)
+        for doc_id, row in enumerate(rows):
+            grams = _trigrams(row.scheme_name) | _trigrams(row.fund_house) | _trigrams(_category_name(row.category))
+            sizes[doc_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(doc_id)
+
+            name = (row.scheme_name or "").lower()
+            direct_growth[doc_id] = "direct" in name and "growth" in name and "idcw" not in name and "dividend" not in name
+
+        _index = {
+            "postings": {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()},
+            "sizes": sizes,
+            "direct_growth": direct_growth,
+            "rows": rows
+        }
+        logger.info(f"Fuzzy search index rebuilt: {len(rows)} schemes, {len(postings)} trigrams")
+        return len(rows)
+
+
+def is_ready():
+    return _index is not None
+
+
+def warm_index(session_factory):
+    """Builds the index in a background thread so the first search does not pay for it."""
+    def build():
+        db = session_factory()
+        try:
+            rebuild_index(db)
+        except Exception as e:
+            logger.error(f"Fuzzy search index build failed: {e}")
+        finally:
+            db.close()
+    threading.Thread(target=build, daemon=True).start()
+
+
+def search(db: Session, query: str, limit: int = 20, direct_growth_only: bool = False):
+    """
+    Typo-tolerant search ("parag parekh flexi", "hdfc midcap").
+    Scores each scheme by the share of the query's trigrams it contains,
+    breaking ties in favour of schemes with fewer trigrams (more specific names).
+    Answered from memory. The index is only built at startup (warm_index) and after
+    a sync; until it is ready, a word-by-word LIKE match over scheme names is returned.
+    """
+    index = _index
+    if index is None:
+        return _like_search(db, query, limit, direct_growth_only)
+
+    grams = [g for g in _trigrams(query) if g in index["postings"]]
+    total = len(_trigrams(query))
+    if not grams or not total:
+        return []
+
+    doc_count = len(index["rows"])
+    hits = np.bincount(np.concatenate([index["postings"][g] for g in grams]), minlength=doc_count)
+    similarity = hits / total
+    candidates = np.flatnonzero(similarity >= MIN_SIMILARITY)
+    if direct_growth_only:
+        candidates = candidates[index["direct_growth"][candidates]]
+    if not len(candidates):
+        return []
+
+    # Best similarity first, then the most specific (smallest) documents
+    order = np.lexsort((index["sizes"][candidates], -similarity[candidates]))[:limit]
+    results = []
+    for doc_id in candidates[order]:
+        row = index["rows"][doc_id]
+        results.append({
+            "scheme_code": row.scheme_code,
+            "scheme_name": row.scheme_name,
+            "category": row.category,
+            "fund_house": row.fund_house,
+            "net_asset_value": row.net_asset_value,
+            "date": row.date,
+            "similarity": round(float(similarity[doc_id]), 3)
+        })
+    return results
+
+
+def _like_search(db: Session, query: str, limit: int, direct_growth_only: bool):
+    """Fallback while the index is loading: schemes whose name contains every word of the query."""
+    words = re.findall(r"\w+", query or "")
+    if not words:
+        return []
+    filters = [Scheme.scheme_name.ilike(f"%{word}%") for word in words]
+    if direct_growth_only:
+        filters += [Scheme.scheme_name.ilike("%direct%"), Scheme.scheme_name.ilike("%growth%"),
+                    ~Scheme.scheme_name.ilike("%idcw%"), ~Scheme.scheme_name.ilike("%dividend%")]
+    rows = db.query(
+        Scheme.scheme_code,
+        Scheme.scheme_name,
+        Scheme.category,
+        Scheme.fund_house,
+        Scheme.net_asset_value,
+        Scheme.date
+    ).filter(*filters).order_by(func.length(Scheme.scheme_name)).limit(limit).all()
+    return [{
+        "scheme_code": row.scheme_code,
+        "scheme_name": row.scheme_name,
+        "category": row.category,
+        "fund_house": row.fund_house,
+        "net_asset_value": row.net_asset_value,
+        "date": row.date,
+        "similarity": None
+    } for row in rows]
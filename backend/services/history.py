@@ -0,0 +1,67 @@
+import numpy as np
+from datetime import date
+from sqlalchemy.orm import Session
+from services import nav_index
+
+# Points returned per chart when the caller does not ask for a size
+DEFAULT_MAX_POINTS = 500
+
+
+def get_scheme_history(db: Session, scheme_code: str, start_date: date = None, end_date: date = None, max_points: int = DEFAULT_MAX_POINTS):
+    """
+    NAV history of a scheme between start_date and end_date (inclusive), oldest first,
+    as parallel `dates` / `navs` arrays.
+
+    The range is cut from the cached NAV series with two binary searches. Ranges longer
+    than max_points are downsampled with Largest-Triangle-Three-Buckets, which keeps
+    the first and last points and the peaks and troughs that shape the line.
+    max_points=0 returns every point.
+    """
+    dates, navs = nav_index.get_nav_series(db, [scheme_code])[scheme_code]
+    lo = np.searchsorted(dates, np.datetime64(start_date, "D")) if start_date else 0
+    hi = np.searchsorted(dates, np.datetime64(end_date, "D"), side="right") if end_date else len(dates)
+    dates, navs = dates[lo:hi], navs[lo:hi]
+
+    total = len(dates)
+    if max_points and total > max_points:
+        keep = lttb_indices(dates.astype(np.int64).astype(float), navs, max_points)
+        dates, navs = dates[keep], navs[keep]
+
+    return {
+        "scheme_code": scheme_code,
+        "from": dates[0].item() if len(dates) else None,
+        "to": dates[-1].item() if len(dates) else None,
+        "total_points": total,
+        "dates": [d.isoformat() for d in dates.tolist()],
+        "navs": navs.tolist()
+    }
+
+
+def lttb_indices(x, y, n_out: int):
+    """
+    Indices of the n_out points picked by Largest-Triangle-Three-Buckets.
+    The first and last points are always kept; every bucket in between contributes
+    the point forming the largest triangle with the previous pick and the next bucket's mean.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (n_out - 2)
+    edges = (np.arange(n_out - 1) * every).astype(np.int64) + 1
+    edges[-1] = n - 1
+
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
@@ -0,0 +1,327 @@
+import codecs
+import csv
+import re
+from datetime import datetime
+from sqlalchemy import func, insert, or_
+from sqlalchemy.orm import Session
+from models import Account, Investment, Scheme
+from services.cache import bump_data_version
+from services.portfolio import rebuild_portfolio_aggregates
+
+# Accepted header names (lower-cased) per field: our own CSV layout plus the
+# column names used by CAMS / KFintech consolidated statement exports.
+COLUMN_ALIASES = {
+    "scheme_code": ["scheme_code", "scheme code", "amfi code", "amfi_code", "amfi scheme code"],
+    "isin": ["isin", "isin no", "isin code"],
+    "scheme_name": ["scheme_name", "scheme name", "scheme"],
+    "date": ["purchase_date", "date", "transaction date", "trade date", "txn date", "nav date"],
+    "type": ["type", "transaction type", "transaction description", "description", "transaction"],
+    "amount": ["amount", "amount (inr)", "amount(inr)", "amount (rs)"],
+    "units": ["units", "unit", "quantity"],
+    "nav": ["purchase_nav", "nav", "price", "nav/price", "nav (inr)"],
+    "account": ["account_name", "account"],
+    "holding_period": ["holding_period", "holding period"],
+}
+
+DATE_FORMATS = ["%Y-%m-%d", "%d-%b-%Y", "%d-%b-%y", "%d/%m/%Y", "%d-%m-%Y", "%d %b %Y"]
+
+# Transaction descriptions that take units out of a folio
+REDEMPTION_WORDS = ("redemption", "redeem", "switch out", "switch-out", "swp", "stp out", "transfer out", "sell")
+
+
+class TransactionImporter:
+    """
+    Streaming importer for transaction CSVs.
+
+    feed() parses chunks of the request body as they arrive and keeps only the
+    parsed rows; finish() validates them against the scheme master, drops
+    duplicates, inserts the batch in one transaction and rebuilds the affected
+    Portfolio rows once.
+    """
+
+    def __init__(self, db: Session, account_name: str = "Default"):
+        self.db = db
+        self.account_name = account_name or "Default"
+        self.rows = []
+        self.errors = []
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._pending = ""
+        self._line_no = 0
+        # Physical lines of the CSV record being read; a quoted field can span several
+        self._record = []
+        self._record_line = 0
+        self._quotes = 0
+        self._columns = None
+
+    def feed(self, chunk: bytes):
+        text = self._pending + self._decoder.decode(chunk)
+        lines = text.split("\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._add_line(line)
+
+    def finish(self, dry_run: bool = False):
+        tail = self._pending + self._decoder.decode(b"", final=True)
+        self._pending = ""
+        if tail:
+            self._add_line(tail)
+        if self._record:
+            # Unbalanced quote at the end of the file; let the CSV parser report it
+            self._parse_record()
+        if self._columns is None:
+            self.errors.append({"row": 0, "error": "No header row with a date and a scheme code, ISIN or scheme name column"})
+            return self._result(0, 0, [])
+
+        rows = self._resolve_schemes(self.rows)
+        rows, duplicates = self._remove_duplicates(rows)
+        if dry_run:
+            return self._result(0, duplicates, [], would_import=len(rows))
+        if not rows:
+            return self._result(0, duplicates, [])
+
+        keys = {(r["scheme_code"], r["account_name"]) for r in rows}
+        try:
+            new_accounts = self._create_missing_accounts({r["account_name"] for r in rows})
+            self.db.execute(insert(Investment), rows)
+            rebuild_portfolio_aggregates(self.db, keys)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        bump_data_version(holdings=keys)
+        return self._result(len(rows), duplicates, new_accounts)
+
+    def _result(self, imported, duplicates, new_accounts, would_import=None):
+        result = {
+            "imported": imported,
+            "duplicates": duplicates,
+            "accounts_created": new_accounts,
+            "error_count": len(self.errors),
+            "errors": sorted(self.errors, key=lambda e: e["row"])
+        }
+        if would_import is not None:
+            result["would_import"] = would_import
+        return result
+
+    def _add_line(self, line: str):
+        """Buffers a physical line until the record's quotes balance, then parses the record."""
+        self._line_no += 1
+        if not self._record:
+            self._record_line = self._line_no
+        self._record.append(line)
+        # An escaped "" counts twice, so an odd total means a quoted field is still open
+        self._quotes += line.count('"')
+        if self._quotes % 2 == 0:
+            self._parse_record()
+
+    def _parse_record(self):
+        lines = self._record
+        self._record = []
+        self._quotes = 0
+        lines[-1] = lines[-1].rstrip("\r")
+        if not "".join(lines).strip():
+            return
+        try:
+            values = next(csv.reader([line + "\n" for line in lines[:-1]] + lines[-1:]))
+        except csv.Error as e:
+            self.errors.append({"row": self._record_line, "error": f"Malformed CSV: {e}"})
+            return
+
+        if self._columns is None:
+            # Statements often have a preamble; the header is the first line naming the columns we need
+            self._columns = _match_header(values)
+            return
+
+        try:
+            row = self._parse_row(values)
+        except ValueError as e:
+            self.errors.append({"row": self._record_line, "error": str(e)})
+            return
+        if row:
+            self.rows.append(row)
+
+    def _parse_row(self, values):
+        field = lambda name: _cell(values, self._columns.get(name))
+        if not any(v.strip() for v in values):
+            return None
+
+        purchase_date = _parse_date(field("date"))
+        description = field("type")
+        amount = _parse_number(field("amount"))
+        units = _parse_number(field("units"))
+        nav = _parse_number(field("nav"))
+
+        # Any two of amount / units / NAV determine the third
+        if nav is None and amount is not None and units:
+            nav = abs(amount / units)
+        if nav is None or nav <= 0:
+            raise ValueError("Missing or invalid NAV")
+        if units is None and amount is not None:
+            units = amount / nav
+        if amount is None and units is not None:
+            amount = units * nav
+        if not units or amount is None:
+            raise ValueError("Missing units and amount")
+
+        is_redemption = units < 0 or amount < 0 or any(w in description.lower() for w in REDEMPTION_WORDS)
+        if is_redemption:
+            invest_type = "REDEMPTION"
+            units, amount = -abs(units), -abs(amount)
+        else:
+            invest_type = _normalize_type(description)
+            units, amount = abs(units), abs(amount)
+
+        holding_period = _parse_number(field("holding_period"))
+        return {
+            "line": self._record_line,
+            "scheme_code": field("scheme_code").strip(),
+            "isin": field("isin").strip().upper(),
+            # Statements wrap long scheme names onto several lines inside the quoted cell
+            "scheme_name": " ".join(field("scheme_name").split()),
+            "type": invest_type,
+            "amount": amount,
+            "units": units,
+            "purchase_nav": nav,
+            "purchase_date": purchase_date,
+            "holding_period": holding_period,
+            "account_name": field("account").strip() or self.account_name
+        }
+
+    def _resolve_schemes(self, rows):
+        """Maps each row to a known scheme by code, then ISIN, then exact name (one query)."""
+        codes = {r["scheme_code"] for r in rows if r["scheme_code"]}
+        isins = {r["isin"] for r in rows if r["isin"]}
+        names = {r["scheme_name"].lower() for r in rows if r["scheme_name"] and not r["scheme_code"] and not r["isin"]}
+
+        filters = []
+        if codes:
+            filters.append(Scheme.scheme_code.in_(codes))
+        if isins:
+            filters.append(Scheme.isin_div_payout.in_(isins))
+            filters.append(Scheme.isin_div_reinvestment.in_(isins))
+        by_code, by_isin, by_name = set(), {}, {}
+        if filters or names:
+            query = self.db.query(Scheme.scheme_code, Scheme.scheme_name, Scheme.isin_div_payout, Scheme.isin_div_reinvestment)
+            if names:
+                filters.append(func.lower(Scheme.scheme_name).in_(names))
+            for s in query.filter(or_(*filters)).all():
+                by_code.add(s.scheme_code)
+                for isin in (s.isin_div_payout, s.isin_div_reinvestment):
+                    if isin:
+                        by_isin[isin.upper()] = s.scheme_code
+                if s.scheme_name:
+                    by_name[s.scheme_name.lower()] = s.scheme_code
+
+        resolved = []
+        for r in rows:
+            code = None
+            if r["scheme_code"] in by_code:
+                code = r["scheme_code"]
+            elif r["isin"] in by_isin:
+                code = by_isin[r["isin"]]
+            elif r["scheme_name"].lower() in by_name:
+                code = by_name[r["scheme_name"].lower()]
+            if not code:
+                label = r["scheme_code"] or r["isin"] or r["scheme_name"] or "(blank)"
+                self.errors.append({"row": r["line"], "error": f"Unknown scheme: {label}"})
+                continue
+            resolved.append({
+                "scheme_code": code,
+                "type": r["type"],
+                "amount": r["amount"],
+                "units": r["units"],
+                "purchase_nav": r["purchase_nav"],
+                "purchase_date": r["purchase_date"],
+                "holding_period": r["holding_period"],
+                "account_name": r["account_name"]
+            })
+        return resolved
+
+    def _remove_duplicates(self, rows):
+        """Drops rows already in the database or repeated in the file (same holding, date, units and amount)."""
+        dedup_key = lambda code, acc, d, units, amount: (code, acc or "Default", d, round(units, 4), round(amount, 2))
+
+        seen = set()
+        codes = {r["scheme_code"] for r in rows}
+        if codes:
+            existing = self.db.query(
+                Investment.scheme_code,
+                Investment.account_name,
+                Investment.purchase_date,
+                Investment.units,
+                Investment.amount
+            ).filter(Investment.scheme_code.in_(codes)).all()
+            seen = {dedup_key(*e) for e in existing}
+
+        unique = []
+        duplicates = 0
+        for r in rows:
+            key = dedup_key(r["scheme_code"], r["account_name"], r["purchase_date"], r["units"], r["amount"])
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            unique.append(r)
+        return unique, duplicates
+
+    def _create_missing_accounts(self, names):
+        existing = {name for (name,) in self.db.query(Account.name).filter(Account.name.in_(names)).all()}
+        new_accounts = sorted(names - existing)
+        for name in new_accounts:
+            self.db.add(Account(name=name))
+        return new_accounts
+
+
+def _match_header(values):
+    """Returns {field: column index} if the row looks like a header, else None."""
+    normalized = [v.strip().lower() for v in values]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    has_scheme = "scheme_code" in columns or "isin" in columns or "scheme_name" in columns
+    if "date" in columns and has_scheme:
+        return columns
+    return None
+
+
+def _cell(values, index):
+    if index is None or index >= len(values):
+        return ""
+    return values[index]
+
+
+def _parse_date(value: str):
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {value or '(blank)'}")
+
+
+def _parse_number(value: str):
+    """Parses '1,234.50', '(1,234.50)' or '-1234.5'; blank returns None."""
+    value = value.strip().replace(",", "").replace("₹", "")
+    if not value:
+        return None
+    negative = value.startswith("(") and value.endswith(")")
+    if negative:
+        value = value[1:-1]
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"Invalid number: {value}")
+    return -number if negative else number
+
+
+def _normalize_type(description: str):
+    text = description.strip().upper()
+    if text in ("SIP", "LUMPSUM"):
+        return text
+    if re.search(r"\bSIP\b|SYSTEMATIC", text):
+        return "SIP"
+    return "LUMPSUM"
@@ -0,0 +1,211 @@
+import math
+import re
+from sqlalchemy.orm import Session
+from services import portfolio
+
+# Fallback AMC names matched against the scheme name when fund_house is missing
+KNOWN_AMCS = [
+    'Aditya Birla', 'SBI', 'HDFC', 'ICICI Prudential', 'Axis', 'Kotak', 'Nippon India',
+    'UTI', 'Bandhan', 'IDFC', 'DSP', 'Mirae Asset', 'Tata', 'HSBC', 'Franklin Templeton',
+    'Sundaram', 'PGIM India', 'Invesco', 'LIC', 'Union', 'Quant', 'Parag Parikh', 'PPFAS',
+    'Edelweiss', 'Canara Robeco', 'Bajaj Finserv', 'Mahindra Manulife', '360 ONE',
+    'Trust', 'WhiteOak', 'Samco', 'Navi', 'Quantum', 'Motilal Oswal', 'Baroda BNP Paribas',
+    'JM Financial', 'Bank of India', 'Helios', 'Zerodha', 'Groww', 'Old Bridge'
+]
+
+INFLATION_RATE = 6.0  # India avg est
+
+
+def get_portfolio_insights(db: Session, filter_type: str = None):
+    """
+    AMC, asset class and category allocation plus the Portfolio IQ score and insights.
+    Same rules as the Dashboard / portfolioIQ.js, computed from the portfolio summary.
+    """
+    summary = portfolio.get_portfolio_summary(db, filter_type=filter_type)
+    if not summary or not summary["holdings"]:
+        return {"amc": [], "asset": [], "category": [], "insights": None}
+
+    amc_agg = {}
+    asset_agg = {}
+    category_agg = {}
+    for item in summary["holdings"]:
+        value = item["current_value"]
+        amc = get_amc_name(item.get("fund_house"), item.get("scheme_name"))
+        asset, category = split_category(item.get("category"))
+        amc_agg[amc] = amc_agg.get(amc, 0) + value
+        asset_agg[asset] = asset_agg.get(asset, 0) + value
+        category_agg[category] = category_agg.get(category, 0) + value
+
+    amc_data = _with_percentage(amc_agg)
+    asset_data = _with_percentage(asset_agg)
+    category_data = _with_percentage(category_agg)
+
+    return {
+        "amc": amc_data,
+        "asset": asset_data,
+        "category": category_data,
+        "insights": generate_insights(summary, amc_data, asset_data, category_data)
+    }
+
+
+def get_amc_name(fund_house: str, scheme_name: str):
+    """Short AMC name: fund_house, else a known AMC in the scheme name, else the name prefix."""
+    amc = fund_house.replace(" Mutual Fund", "").strip() if fund_house else None
+    if not amc or amc == 'Other':
+        name = scheme_name or ''
+        matched = next((k for k in KNOWN_AMCS if k.lower() in name.lower()), None)
+        if matched:
+            amc = matched
+        elif ' - ' in name:
+            amc = name.split(' - ')[0].replace(" Mutual Fund", "").strip()
+        else:
+            amc = name.split(' ')[0]
+    return amc or 'Other'
+
+
+def split_category(category: str):
+    """
+    Splits a scheme category into (asset class, category).
+    "Open Ended Schemes(Equity Scheme - Large Cap Fund)" -> ("Equity", "Large Cap")
+    """
+    cat = category or 'Other'
+    clean = cat
+    if '(' in cat:
+        clean = cat.split('(')[1].split(')')[0].strip()
+
+    if ' - ' in clean:
+        parts = clean.split(' - ')
+        asset = parts[0].strip()
+        name = parts[-1].strip()
+    else:
+        asset = 'Other'
+        name = clean
+
+    asset = re.sub(r' Scheme$', '', asset, flags=re.IGNORECASE)
+    name = re.sub(r' Scheme$', '', re.sub(r' Fund$', '', name, flags=re.IGNORECASE), flags=re.IGNORECASE)
+    return asset, name
+
+
+def _with_percentage(agg: dict):
+    total = sum(agg.values())
+    data = [
+        {"name": name, "value": value or 0, "percentage": (value / total) * 100 if total > 0 else 0}
+        for name, value in agg.items()
+    ]
+    data.sort(key=lambda item: item["value"], reverse=True)
+    return data
+
+
+def _share(value, total):
+    return (value / total) * 100 if total else 0
+
+
+def generate_insights(summary: dict, amc_data: list, asset_data: list, category_data: list):
+    """Heuristic health score (0-100) and insight cards."""
+    holdings = summary["holdings"]
+    total_value = summary["total_current_value"]
+    insights = []
+    score = 50  # Base Score
+
+    # --- 1. Performance Analysis (0-20 pts) ---
+    xirr = summary.get("portfolio_xirr") or 0
+    if xirr > INFLATION_RATE:
+        score += min(20, (xirr - INFLATION_RATE) * 2)
+        insights.append(_insight('success', 'TrendingUp', 'Beating Inflation',
+                                 f"Your XIRR of {xirr:.1f}% is crushing the estimated {INFLATION_RATE:g}% inflation rate."))
+    elif xirr > 0:
+        score += 5
+        insights.append(_insight('neutral', 'Clock', 'Moderate Growth',
+                                 f"Your portfolio is positive ({xirr:.1f}%) but barely beating inflation."))
+    else:
+        score -= 10
+        insights.append(_insight('warning', 'AlertCircle', 'Underperformance',
+                                 "Overall portfolio is generating negative returns. Review asset allocation."))
+
+    # --- 2. Diversification Analysis (0-20 pts) ---
+    top_amc = amc_data[0] if amc_data else None
+    if top_amc and top_amc["value"] > 0:
+        if _share(top_amc["value"], total_value) > 40:
+            score -= 10
+            insights.append(_insight('warning', 'PieChart', 'High AMC Concentration',
+                                     f"You have heavy exposure to {top_amc['name']}. Consider diversifying across fund houses."))
+        else:
+            score += 10
+
+    equity = next((a for a in asset_data if 'equity' in a["name"].lower()), None)
+    if equity:
+        equity_pct = _share(equity["value"], total_value)
+        if equity_pct > 90:
+            insights.append(_insight('info', 'Zap', 'Aggressive Profile',
+                                     "Your portfolio is heavily equity-focused. Ensure this matches your risk appetite."))
+        if 50 < equity_pct < 90:
+            score += 10  # Balanced growth
+
+    # --- 3. Fund Level Analysis ---
+    returns = [
+        (((h["current_value"] - h["invested_amount"]) / h["invested_amount"]) * 100, h)
+        for h in holdings if h["invested_amount"] > 0
+    ]
+    if returns:
+        star_return, star = max(returns, key=lambda r: r[0])
+        if star_return > 20:
+            insights.append(_insight('star', 'Award', 'Star Performer',
+                                     f"🚀 {star['scheme_name'].split(' - ')[0]} is leading with a stunning {star_return:.1f}% return."))
+
+    # --- 4. Opportunity Checks ---
+    dips = [
+        ((h["average_nav"] - h["current_nav"]) / h["average_nav"] * 100, h)
+        for h in holdings if h["current_nav"] < h["average_nav"]
+    ]
+    if dips:
+        discount, best_dip = max(dips, key=lambda d: d[0])
+        if discount > 1:
+            insights.append(_insight('info', 'TrendingDown', 'Buy the Dip',
+                                     f"📉 {best_dip['scheme_name'].split(' - ')[0]} is trading {discount:.1f}% below cost."))
+            score += 5
+        else:
+            insights.append(_insight('ghost', 'TrendingDown', 'Buy the Dip', "No significant dip opportunities detected."))
+    else:
+        insights.append(_insight('ghost', 'TrendingDown', 'Buy the Dip', "All funds trading above average cost."))
+
+    # --- 5. Composition Analysis ---
+    passive_value = sum(
+        h["current_value"] for h in holdings
+        if 'index' in h["scheme_name"].lower() or 'nifty' in h["scheme_name"].lower()
+    )
+    passive_pct = _share(passive_value, total_value)
+    if passive_pct > 5:
+        insights.append(_insight('success', 'Shield', 'Index Fund Strength',
+                                 f"🛡️ {passive_pct:.0f}% of your portfolio is in low-cost Index Funds/ETFs."))
+        score += 5
+    else:
+        insights.append(_insight('ghost', 'Shield', 'Index Fund Strength', "Consider low-cost Index Funds for core stability."))
+
+    # Safety Net (Debt)
+    debt = next((a for a in asset_data if 'debt' in a["name"].lower() or 'liquid' in a["name"].lower()), None)
+    if not debt or debt["value"] == 0:
+        score -= 5
+        insights.append(_insight('warning', 'Umbrella', 'No Safety Net',
+                                 "You have 0% allocation to Debt/Liquid funds. Consider an emergency cushion."))
+    else:
+        insights.append(_insight('ghost', 'Umbrella', 'Safety Net', "Emergency cushion (Debt/Liquid) present."))
+
+    # Sector/Category Bias
+    if category_data:
+        top_category = category_data[0]
+        category_pct = _share(top_category["value"], total_value)
+        if category_pct > 40:
+            insights.append(_insight('info', 'Zap', 'Sector Bias',
+                                     f"🏗️ Your portfolio is heavily tilted towards {top_category['name']} ({category_pct:.0f}%)."))
+        else:
+            score += 5
+            insights.append(_insight('ghost', 'Zap', 'Sector Bias', "Sector allocation appears well-balanced."))
+
+    return {
+        "score": min(100, max(0, math.floor(score + 0.5))),
+        "items": insights
+    }
+
+
+def _insight(type_: str, icon: str, title: str, message: str):
+    return {"type": type_, "icon": icon, "title": title, "message": message}
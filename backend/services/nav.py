@@ -1,9 +1,12 @@
 import requests
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from models import Scheme
+from models import Scheme, AMC, SchemeCategory
 from datetime import datetime
 import logging
+from services.cache import bump_data_version
+from services.alerts import evaluate_alerts
+from services import search, fuzzy, scheme_master, risk
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +24,9 @@ def fetch_nav_data():
 
 def parse_and_sync_nav_data(db: Session, data: str):
     """Parses the AMFI text data and updates the database."""
-    from models import Investment, Watchlist, NAVHistory
+    from models import Investment, Watchlist, NAVHistory, SIPMandate
     
-    # 1. Get Active Schemes (Present in Portfolio or Watchlist)
+    # 1. Get Active Schemes (Present in Portfolio, Watchlist or a SIP mandate)
     active_schemes = set()
     
     investments = db.query(Investment.scheme_code).distinct().all()
@@ -33,10 +36,32 @@ def parse_and_sync_nav_data(db: Session, data: str):
     watchlist = db.query(Watchlist.scheme_code).distinct().all()
     for (code,) in watchlist:
         active_schemes.add(code)
+
+    # SIP installments are priced from nav_history, so mandates need it even before their first transaction
+    mandates = db.query(SIPMandate.scheme_code).distinct().all()
+    for (code,) in mandates:
+        active_schemes.add(code)
+
+    # Default benchmark of the risk scorecard (downside capture)
+    active_schemes.add(risk.DEFAULT_BENCHMARK)
+    
+    # Active schemes whose NAV or category changed in this sync
+    changed_schemes = set()
+    # Schemes added to the master or renamed in this sync, for the search index
+    indexed_schemes = []
+    # Active schemes whose NAV moved: scheme_code -> (previous_nav, nav, nav_date), for the alert engine
+    nav_moves = {}
     
     lines = data.split('\n')
     count = 0
     current_category = None
+    current_category_id = None
+    current_amc = None
+    current_amc_id = None
+
+    # Dimension lookups (name -> id), extended as new headers appear
+    amc_ids = dict(db.query(AMC.name, AMC.id).all())
+    category_ids = dict(db.query(SchemeCategory.name, SchemeCategory.id).all())
     
     for line in lines:
         if not line or ";" not in line:
@@ -51,7 +76,14 @@ def parse_and_sync_nav_data(db: Session, data: str):
                 candidate = line.strip()
                 if "(" in candidate and ")" in candidate:
                     current_category = candidate
-                # Else it's likely an AMC header, ignore it for 'category' field
+                    current_category_id = _get_dimension_id(db, SchemeCategory, category_ids, candidate)
+                    # The AMC headers of this category follow
+                    current_amc = None
+                    current_amc_id = None
+                else:
+                    # AMC header: the exact fund house of the schemes below it
+                    current_amc = candidate
+                    current_amc_id = _get_dimension_id(db, AMC, amc_ids, candidate)
                 continue
             
         parts = line.split(';')
@@ -91,6 +123,9 @@ def parse_and_sync_nav_data(db: Session, data: str):
                     scheme_code=scheme_code,
                     scheme_name=scheme_name,
                     category=current_category, # New Field
+                    fund_house=current_amc,
+                    amc_id=current_amc_id,
+                    category_id=current_category_id,
                     isin_div_payout=isin_growth,
                     isin_div_reinvestment=isin_reinvest,
                     net_asset_value=net_asset_value,
@@ -98,12 +133,31 @@ def parse_and_sync_nav_data(db: Session, data: str):
                     last_updated=datetime.now().date()
                 )
                 db.add(scheme)
+                indexed_schemes.append(scheme_code)
             else:
+                if scheme_name and scheme.scheme_name != scheme_name:
+                    # AMCs rename schemes (mergers, plan renames); keep the master and search index current
+                    scheme.scheme_name = scheme_name
+                    indexed_schemes.append(scheme_code)
+                    if scheme_code in active_schemes:
+                        changed_schemes.add(scheme_code)
+                if scheme_code in active_schemes and (
+                    scheme.net_asset_value != net_asset_value or scheme.date != date_obj
+                    or (current_category and scheme.category != current_category)
+                ):
+                    changed_schemes.add(scheme_code)
+                    if scheme.net_asset_value and scheme.net_asset_value != net_asset_value and scheme_code not in nav_moves:
+                        nav_moves[scheme_code] = (scheme.net_asset_value, net_asset_value, date_obj)
                 scheme.net_asset_value = net_asset_value
                 scheme.date = date_obj
                 scheme.last_updated = datetime.now().date()
                 if current_category:
                      scheme.category = current_category # Update category if available
+                     scheme.category_id = current_category_id
+                if current_amc_id:
+                    scheme.amc_id = current_amc_id
+                    if not scheme.fund_house:
+                        scheme.fund_house = current_amc
             
             # Upsert logic for NAV History (Only Active Schemes)
             if scheme_code in active_schemes:
@@ -120,6 +174,7 @@ def parse_and_sync_nav_data(db: Session, data: str):
                         net_asset_value=net_asset_value
                     )
                     db.add(history_entry)
+                    changed_schemes.add(scheme_code)
             
             count += 1
             if count % 100 == 0:
@@ -132,6 +187,27 @@ def parse_and_sync_nav_data(db: Session, data: str):
             continue
             
     db.commit()
+    bump_data_version(schemes=changed_schemes)
+
+    try:
+        search.index_schemes(db, indexed_schemes)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Search index update failed: {e}")
+        db.rollback()
+
+    # New NAVs are committed: swap in a fresh scheme master snapshot for the read paths
+    try:
+        scheme_master.rebuild(db)
+    except Exception as e:
+        logger.error(f"Scheme master cache refresh failed: {e}")
+
+    # Watchlist target / drop-from-high alerts for the NAVs that moved
+    try:
+        evaluate_alerts(db, nav_moves)
+    except Exception as e:
+        logger.error(f"Alert evaluation failed: {e}")
+        db.rollback()
     
     # --- PHASE 2: Gap Recovery (Backfill) ---
     logger.info(f"Phase 1 Complete. Updated {count} schemes. Starting Phase 2: Gap Recovery for {len(active_schemes)} active schemes.")
@@ -143,17 +219,38 @@ def parse_and_sync_nav_data(db: Session, data: str):
             logger.error(f"Failed to backfill history for {code}: {e}")
 
     # 7. Sync Metadata (Category/Fund House) from MFAPI
+    updated_meta = 0
     try:
         updated_meta = fetch_and_update_scheme_metadata(db)
         logger.info(f"Metadata sync finished: {updated_meta} schemes updated.")
     except Exception as e:
         logger.error(f"Metadata sync failed: {e}")
 
+    # Swap in a fresh fuzzy search index and scheme master with the new names, categories and NAVs
+    try:
+        fuzzy.rebuild_index(db)
+    except Exception as e:
+        logger.error(f"Fuzzy search index rebuild failed: {e}")
+    if updated_meta:
+        try:
+            scheme_master.rebuild(db)
+        except Exception as e:
+            logger.error(f"Scheme master cache refresh failed: {e}")
+
     return {
         "status": "success", 
         "message": f"Processed {count} records. updated_meta"
     }
 
+def _get_dimension_id(db: Session, model, ids: dict, name: str):
+    """Returns the id of an AMC / category row, creating (and committing) it on first sight."""
+    if name not in ids:
+        row = model(name=name)
+        db.add(row)
+        db.commit()
+        ids[name] = row.id
+    return ids[name]
+
 def fetch_scheme_history_api(scheme_code: str):
     """Fetches historical NAV data from mfapi.in"""
     url = f"https://api.mfapi.in/mf/{scheme_code}"
@@ -177,18 +274,14 @@ def backfill_scheme_history(db: Session, scheme_code: str):
     ).order_by(NAVHistory.date.desc()).limit(2).all()
     
     # Check if we need to backfill due to OLD start dates (User requested backdated tracking)
-    # Find the earliest 'added_on' date for this scheme in Watchlist or Investment
-    from models import Watchlist, Investment
+    # Find the earliest 'added_on' date for this scheme in Watchlist, Investment or SIP mandates
+    from models import Watchlist, Investment, SIPMandate
     earliest_track_date = db.query(func.min(Watchlist.added_on)).filter(Watchlist.scheme_code == scheme_code).scalar()
     earliest_inv_date = db.query(func.min(Investment.purchase_date)).filter(Investment.scheme_code == scheme_code).scalar()
+    earliest_sip_date = db.query(func.min(SIPMandate.start_date)).filter(SIPMandate.scheme_code == scheme_code).scalar()
     
-    required_start_date = None
-    if earliest_track_date and earliest_inv_date:
-        required_start_date = min(earliest_track_date, earliest_inv_date)
-    elif earliest_track_date:
-        required_start_date = earliest_track_date
-    elif earliest_inv_date:
-        required_start_date = earliest_inv_date
+    start_dates = [d for d in (earliest_track_date, earliest_inv_date, earliest_sip_date) if d]
+    required_start_date = min(start_dates) if start_dates else None
         
     # Get earliest history date we currently have
     earliest_history = db.query(func.min(NAVHistory.date)).filter(NAVHistory.scheme_code == scheme_code).scalar()
@@ -257,12 +350,14 @@ def backfill_scheme_history(db: Session, scheme_code: str):
     if new_rows:
         db.bulk_save_objects(new_rows)
         db.commit()
+        bump_data_version(schemes=[scheme_code])
         logger.info(f"Backfilled {len(new_rows)} days of history for {scheme_code}")
 
 def fetch_and_update_scheme_metadata(db: Session):
     """
-    Fetches scheme metadata (category, fund house) from MFAPI.in for all active schemes
-    and updates the database.
+    Fetches scheme metadata (fund house) from MFAPI.in for all active schemes
+    and updates the database. The category stays the AMFI header set by the NAV
+    sync, so it matches category_id.
     """
     import requests
     from models import Investment, Watchlist, Scheme
@@ -285,6 +380,7 @@ def fetch_and_update_scheme_metadata(db: Session):
     
     count = 0
     updated_count = 0
+    updated_codes = set()
     for code in active_schemes:
         try:
             url = f"https://api.mfapi.in/mf/{code}"
@@ -293,25 +389,18 @@ def fetch_and_update_scheme_metadata(db: Session):
                 data = response.json()
                 meta = data.get("meta", {})
                 fund_house = meta.get("fund_house")
-                category = meta.get("scheme_category")
                 
-                if category or fund_house:
+                if fund_house:
                     scheme = db.query(Scheme).filter(Scheme.scheme_code == str(code)).first()
-                    if scheme:
-                        changed = False
-                        if category and scheme.category != category:
-                            scheme.category = category
-                            changed = True
-                        if fund_house and scheme.fund_house != fund_house:
-                            scheme.fund_house = fund_house
-                            changed = True
-                        
-                        if changed:
-                            updated_count += 1
+                    if scheme and scheme.fund_house != fund_house:
+                        scheme.fund_house = fund_house
+                        updated_count += 1
+                        updated_codes.add(scheme.scheme_code)
             count += 1
         except Exception as e:
             logger.error(f"Failed to fetch metadata for {code}: {e}")
             
     db.commit()
+    bump_data_version(schemes=updated_codes)
     logger.info(f"Metadata update complete. Updated {updated_count} schemes.")
     return updated_count
@@ -0,0 +1,124 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy import String, cast, select
+from sqlalchemy.orm import Session
+from models import NAVHistory
+from services import cache, scheme_master
+
+# Upper bound on schemes kept in memory (~16 bytes per NAV point)
+MAX_CACHED_SCHEMES = 1000
+
+_lock = threading.Lock()
+# scheme_code -> (scheme_version, dates datetime64[D] array, navs float array), LRU ordered
+_series = OrderedDict()
+
+_EMPTY = (np.array([], dtype="datetime64[D]"), np.array([], dtype=float))
+
+
+def get_nav_series(db: Session, scheme_codes):
+    """
+    Returns {scheme_code: (dates, navs)} with the full nav_history of each scheme
+    as sorted NumPy arrays. Series are cached per scheme and reloaded only after
+    that scheme's NAV history changed (see cache.bump_data_version(schemes=...)).
+    """
+    result = {}
+    missing = []
+    with _lock:
+        for code in scheme_codes:
+            entry = _series.get(code)
+            if entry and entry[0] == cache.get_scheme_version(code):
+                _series.move_to_end(code)
+                result[code] = (entry[1], entry[2])
+            else:
+                missing.append(code)
+
+    if missing:
+        loaded = _load_series(db, missing)
+        with _lock:
+            for code, (version, dates, navs) in loaded.items():
+                result[code] = (dates, navs)
+                # Skip storing if the scheme changed while we were loading
+                if version == cache.get_scheme_version(code):
+                    _series[code] = (version, dates, navs)
+                    _series.move_to_end(code)
+            while len(_series) > MAX_CACHED_SCHEMES:
+                _series.popitem(last=False)
+
+    return result
+
+
+def _load_series(db: Session, scheme_codes):
+    """Loads sorted history arrays for the given schemes in a single query."""
+    versions = {code: cache.get_scheme_version(code) for code in scheme_codes}
+
+    # Dates come back as ISO strings and are parsed by NumPy in one go,
+    # which is much cheaper than building a date object per row.
+    rows = db.execute(
+        select(
+            NAVHistory.scheme_code,
+            cast(NAVHistory.date, String),
+            NAVHistory.net_asset_value
+        ).where(
+            NAVHistory.scheme_code.in_(scheme_codes)
+        ).order_by(NAVHistory.scheme_code, NAVHistory.date)
+    ).all()
+
+    columns = list(zip(*rows)) or [(), (), ()]
+    codes = np.array(columns[0], dtype=object)
+    dates = np.array(columns[1], dtype="datetime64[D]")
+    navs = np.array(columns[2], dtype=float)
+
+    loaded = {code: (versions[code],) + _EMPTY for code in scheme_codes}
+    if len(rows):
+        change = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        starts = np.concatenate(([0], change))
+        ends = np.concatenate((change, [len(rows)]))
+        for a, b in zip(starts, ends):
+            code = codes[a]
+            loaded[code] = (versions[code], dates[a:b], navs[a:b])
+    return loaded
+
+
+def lookup_navs(db: Session, pairs):
+    """
+    Prices many (scheme_code, date) pairs with the NAV on or before each date.
+    Returns one dict per pair, in order: scheme_code, date, nav, nav_date
+    (nav/nav_date are None when no NAV is known on or before the date).
+
+    Dates are binary-searched in each scheme's sorted history, one
+    searchsorted call per scheme. The scheme's current NAV from the master
+    table counts as one more point, in case history lags behind it.
+    """
+    by_code = {}
+    for i, (code, d) in enumerate(pairs):
+        by_code.setdefault(code, []).append(i)
+
+    series = get_nav_series(db, by_code.keys())
+    latest = get_latest_navs(db, by_code.keys())
+
+    results = [None] * len(pairs)
+    for code, indexes in by_code.items():
+        dates, navs = series[code]
+        current = latest.get(code)
+        if current and current[0] and current[1] and (not len(dates) or np.datetime64(current[0], "D") > dates[-1]):
+            dates = np.append(dates, np.datetime64(current[0], "D"))
+            navs = np.append(navs, current[1])
+
+        wanted = np.array([pairs[i][1] for i in indexes], dtype="datetime64[D]")
+        positions = np.searchsorted(dates, wanted, side="right") - 1
+        for i, pos in zip(indexes, positions):
+            found = pos >= 0
+            results[i] = {
+                "scheme_code": code,
+                "date": pairs[i][1],
+                "nav": float(navs[pos]) if found else None,
+                "nav_date": dates[pos].item() if found else None
+            }
+    return results
+
+
+def get_latest_navs(db: Session, scheme_codes):
+    """{scheme_code: (date, nav)} of the current NAV in the scheme master."""
+    schemes = scheme_master.get_schemes(db, scheme_codes, fields=("date", "net_asset_value"))
+    return {code: (s["date"], s["net_asset_value"]) for code, s in schemes.items()}
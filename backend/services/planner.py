@@ -0,0 +1,228 @@
+import heapq
+from datetime import date
+from sqlalchemy.orm import Session
+from services import tax
+
+
+def plan_redemption(db: Session, target_amount: float, account_name: str = None, scheme_codes: list = None, as_of: date = None):
+    """
+    Chooses which units to redeem to raise target_amount with the least
+    short-term gain (ties broken by least long-term gain), priced at the
+    current scheme NAV.
+
+    Redemptions consume each holding's lots FIFO, so a holding's lots form a
+    chain that must be sold in order. Each chain is merged into blocks of
+    non-decreasing tax cost per rupee (a lower envelope), and blocks from all
+    holdings are taken cheapest-first from a heap.
+    """
+    as_of = as_of or date.today()
+    holdings = _load_holdings(db, account_name, scheme_codes, as_of)
+
+    heap = []
+    for h_index, holding in enumerate(holdings):
+        for block in _cost_blocks(holding["segments"]):
+            heapq.heappush(heap, (block["rate"], h_index, block["start"], block))
+
+    # Holdings must be consumed in FIFO order; blocks of a holding come out in order
+    # because the envelope makes their rates non-decreasing.
+    remaining = target_amount
+    taken = {}
+    while heap and remaining > 0.005:
+        _, h_index, _, block = heapq.heappop(heap)
+        holding = holdings[h_index]
+        for seg in holding["segments"][block["start"]:block["end"]]:
+            if remaining <= 0.005:
+                break
+            fraction = min(1.0, remaining / seg["value"])
+            remaining -= seg["value"] * fraction
+            taken.setdefault(h_index, []).append((seg, fraction))
+
+    plan = []
+    totals = {"amount": 0.0, "stcg": 0.0, "ltcg": 0.0}
+    for h_index, parts in sorted(taken.items()):
+        holding = holdings[h_index]
+        lots = []
+        units = amount = stcg = ltcg = 0.0
+        for seg, fraction in parts:
+            lot_units = seg["units"] * fraction
+            gain = seg["gain"] * fraction
+            units += lot_units
+            amount += seg["value"] * fraction
+            if seg["term"] == "LTCG":
+                ltcg += gain
+            else:
+                stcg += gain
+            lots.append({
+                "buy_date": seg["buy_date"],
+                "units": lot_units,
+                "gain": gain,
+                "term": seg["term"],
+                "holding_days": seg["holding_days"]
+            })
+        plan.append({
+            "scheme_code": holding["scheme_code"],
+            "scheme_name": holding["scheme_name"],
+            "account_name": holding["account_name"],
+            "nav": holding["nav"],
+            "units": units,
+            "amount": amount,
+            "stcg": stcg,
+            "ltcg": ltcg,
+            "lots": lots
+        })
+        totals["amount"] += amount
+        totals["stcg"] += stcg
+        totals["ltcg"] += ltcg
+
+    return {
+        "target_amount": target_amount,
+        "planned_amount": totals["amount"],
+        "shortfall": max(0.0, target_amount - totals["amount"]),
+        "total_stcg": totals["stcg"],
+        "total_ltcg": totals["ltcg"],
+        "plan": plan
+    }
+
+
+def get_harvest_opportunities(db: Session, account_name: str = None, as_of: date = None):
+    """
+    Per account, the equity LTCG exemption still unused in the current financial
+    year and the long-term units that could be sold to use it up.
+    Only the FIFO prefix of lots that are already long term can be harvested.
+    """
+    as_of = as_of or date.today()
+    fy_start = tax.get_financial_year_start(as_of)
+    limit = tax.get_ltcg_exemption_limit(as_of)
+
+    # LTCG already realized this FY on equity-oriented funds
+    gains = tax.get_capital_gains(db, start_date=fy_start, end_date=as_of, account_name=account_name)
+    realized = {}
+    for lot in gains["lots"]:
+        if lot["asset_class"] == "equity" and lot["term"] == "LTCG":
+            realized[lot["account_name"]] = realized.get(lot["account_name"], 0.0) + lot["gain"]
+
+    by_account = {}
+    for holding in _load_holdings(db, account_name, None, as_of):
+        if holding["asset_class"] == "equity":
+            by_account.setdefault(holding["account_name"], []).append(holding)
+
+    result = []
+    for account in sorted(set(by_account) | set(realized)):
+        realized_ltcg = realized.get(account, 0.0)
+        remaining = max(0.0, limit - realized_ltcg)
+        suggestions = []
+
+        # Largest gains per rupee first, so fewer units are sold for the same exemption
+        candidates = []
+        for holding in by_account.get(account, []):
+            prefix = []
+            for seg in holding["segments"]:
+                if seg["term"] != "LTCG":
+                    break
+                prefix.append(seg)
+            if prefix:
+                gain = sum(s["gain"] for s in prefix)
+                value = sum(s["value"] for s in prefix)
+                if gain > 0:
+                    candidates.append((-(gain / value), holding, prefix))
+        candidates.sort(key=lambda c: c[0])
+
+        for _, holding, prefix in candidates:
+            if remaining <= 0.005:
+                break
+            units = gain = amount = 0.0
+            for seg in prefix:
+                if remaining - gain <= 0.005:
+                    break
+                fraction = 1.0 if seg["gain"] <= 0 else min(1.0, (remaining - gain) / seg["gain"])
+                units += seg["units"] * fraction
+                gain += seg["gain"] * fraction
+                amount += seg["value"] * fraction
+            if units > 0:
+                remaining -= gain
+                suggestions.append({
+                    "scheme_code": holding["scheme_code"],
+                    "scheme_name": holding["scheme_name"],
+                    "units": units,
+                    "amount": amount,
+                    "ltcg": gain,
+                    "nav": holding["nav"]
+                })
+
+        result.append({
+            "account_name": account,
+            "financial_year": tax.get_financial_year(as_of),
+            "exemption_limit": limit,
+            "realized_ltcg": realized_ltcg,
+            "unused_exemption": max(0.0, limit - realized_ltcg),
+            "harvestable_ltcg": sum(s["ltcg"] for s in suggestions),
+            "suggestions": suggestions
+        })
+    return result
+
+
+def _load_holdings(db: Session, account_name: str, scheme_codes: list, as_of: date):
+    """Open lots of each holding as FIFO-ordered segments priced at the current NAV."""
+    ledgers = tax.get_ledgers(db)
+    ledgers = {
+        key: ledger for key, ledger in ledgers.items()
+        if ledger["open_lots"]
+        and (not account_name or key[1] == account_name)
+        and (not scheme_codes or key[0] in scheme_codes)
+    }
+    scheme_map = tax.get_scheme_info(db, {code for code, _ in ledgers})
+
+    holdings = []
+    for (code, account), ledger in sorted(ledgers.items()):
+        scheme = scheme_map.get(code)
+        if not scheme or not scheme.net_asset_value:
+            continue
+        nav = scheme.net_asset_value
+        asset_class = tax.get_asset_class(scheme.category, scheme.scheme_name)
+        segments = []
+        for lot in ledger["open_lots"]:
+            value = lot["units"] * nav
+            if value <= 0:
+                continue
+            segments.append({
+                "buy_date": lot["date"],
+                "units": lot["units"],
+                "value": value,
+                "gain": value - lot["units"] * lot["cost_per_unit"],
+                "term": tax.get_gain_term(asset_class, lot["date"], as_of),
+                "holding_days": (as_of - lot["date"]).days
+            })
+        if segments:
+            holdings.append({
+                "scheme_code": code,
+                "scheme_name": scheme.scheme_name,
+                "account_name": account,
+                "asset_class": asset_class,
+                "nav": nav,
+                "segments": segments
+            })
+    return holdings
+
+
+def _cost_blocks(segments):
+    """
+    Merges a FIFO chain of lots into blocks whose cost per rupee,
+    (short-term gain, long-term gain) / value, is non-decreasing.
+    """
+    stack = []
+    for i, seg in enumerate(segments):
+        stcg = seg["gain"] if seg["term"] == "STCG" else 0.0
+        ltcg = seg["gain"] if seg["term"] == "LTCG" else 0.0
+        block = {"start": i, "end": i + 1, "value": seg["value"], "stcg": stcg, "ltcg": ltcg}
+        block["rate"] = (stcg / seg["value"], ltcg / seg["value"])
+
+        # A cheaper block behind a dearer one can only be reached by selling both
+        while stack and stack[-1]["rate"] >= block["rate"]:
+            prev = stack.pop()
+            value = prev["value"] + block["value"]
+            stcg = prev["stcg"] + block["stcg"]
+            ltcg = prev["ltcg"] + block["ltcg"]
+            block = {"start": prev["start"], "end": block["end"], "value": value, "stcg": stcg, "ltcg": ltcg}
+            block["rate"] = (stcg / value, ltcg / value)
+        stack.append(block)
+    return stack
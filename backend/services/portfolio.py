@@ -1,7 +1,10 @@
-from sqlalchemy.orm import Session
+import numpy as np
+from sqlalchemy.orm import Session, joinedload
 from models import Investment, Portfolio, Scheme, Watchlist, WatchlistGroup, NAVHistory
 from datetime import date, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, case
+from services import cache, tax, nav_index
+from services.cache import bump_data_version
 
 def add_investment(db: Session, scheme_code: str, invest_type: str, amount: float, purchase_nav: float, purchase_date: date, holding_period: float = None, account_name: str = "Default"):
     """
@@ -73,9 +76,102 @@ def add_investment(db: Session, scheme_code: str, invest_type: str, amount: floa
             db.add(new_portfolio_item)
     
     db.commit()
+    bump_data_version(holdings=[(scheme_code, account_name)], appended=True)
     db.refresh(new_investment)
     return new_investment
 
+def rebuild_portfolio_aggregates(db: Session, keys):
+    """
+    Recomputes the Portfolio rows of the given (scheme_code, account_name) holdings
+    by replaying their transactions in date order, with the same Average Cost rules
+    as add_investment. Used after bulk writes instead of updating row by row.
+    Does not commit.
+    """
+    keys = {(code, acc or "Default") for code, acc in keys}
+    if not keys:
+        return
+
+    rows = db.query(
+        Investment.scheme_code,
+        Investment.account_name,
+        Investment.units,
+        Investment.amount,
+        Investment.purchase_nav
+    ).filter(
+        Investment.scheme_code.in_({code for code, _ in keys})
+    ).order_by(Investment.purchase_date, Investment.id).all()
+
+    # key -> [total_units, invested_amount, average_nav]
+    state = {}
+    for r in rows:
+        key = (r.scheme_code, r.account_name or "Default")
+        if key not in keys:
+            continue
+        item = state.get(key)
+        if item is None:
+            if r.units > 0:
+                state[key] = [r.units, r.amount, r.purchase_nav]
+        elif r.units < 0:
+            units_to_reduce = min(abs(r.units), item[0])
+            new_total_units = item[0] - units_to_reduce
+            if new_total_units < 1e-6:
+                item[:] = [0.0, 0.0, 0.0]
+            else:
+                item[1] -= units_to_reduce * item[2]
+                item[0] = new_total_units
+        else:
+            item[0] += r.units
+            item[1] += r.amount
+            item[2] = item[1] / item[0]
+
+    existing = db.query(Portfolio).filter(Portfolio.scheme_code.in_({code for code, _ in keys})).all()
+    seen = set()
+    for row in existing:
+        key = (row.scheme_code, row.account_name or "Default")
+        if key not in keys:
+            continue
+        seen.add(key)
+        row.total_units, row.invested_amount, row.average_nav = state.get(key, (0.0, 0.0, 0.0))
+    for key, (total_units, invested_amount, average_nav) in state.items():
+        if key not in seen:
+            db.add(Portfolio(
+                scheme_code=key[0],
+                total_units=total_units,
+                average_nav=average_nav,
+                invested_amount=invested_amount,
+                account_name=key[1]
+            ))
+
+def repair_portfolio_aggregates(db: Session):
+    """
+    Rebuilds every Portfolio row from the transactions and commits; returns how many
+    rows changed. Rows written before redemptions were applied per account drift from
+    the transactions, and this brings them back in line. Rows that already match are
+    left untouched.
+    """
+    # One row per holding: rows without an account belong to Default, extra rows are dropped
+    keys = set()
+    fixed = 0
+    for row in db.query(Portfolio).order_by(Portfolio.id).all():
+        key = (row.scheme_code, row.account_name or "Default")
+        if key in keys:
+            db.delete(row)
+            fixed += 1
+            continue
+        keys.add(key)
+        if row.account_name is None:
+            row.account_name = "Default"
+            fixed += 1
+    db.flush()
+
+    keys |= {(code, acc or "Default") for code, acc in db.query(Investment.scheme_code, Investment.account_name).distinct().all()}
+    rebuild_portfolio_aggregates(db, keys)
+    changed = fixed + len(db.new) + len([row for row in db.dirty if db.is_modified(row)])
+    db.commit()
+    if changed:
+        bump_data_version()
+    return changed
+
 def calculate_xirr(transactions):
     """
     Calculates XIRR using Newton-Raphson method.
@@ -141,289 +237,372 @@ def get_portfolio_summary(db: Session, filter_type: str = None):
     """
     Returns the portfolio with current valuation and XIRR.
     Supports filtering by 'SIP' or 'LUMPSUM'.
+
+    Holdings are cached per (scheme, account) and only recomputed when their
+    transactions, their scheme's NAV or their SIP mandate changed. Totals are
+    re-aggregated from the cached entries.
     """
+    view_key = filter_type if filter_type and filter_type.lower() != 'all' else None
+    view = cache.get_holding_view(view_key)
+
+    with view["lock"]:
+        stale, dirty_keys, dirty_schemes, _ = cache.claim_holding_changes(view)
+        try:
+            if stale:
+                view["entries"] = _build_holding_entries(db, view_key)
+            elif dirty_keys or dirty_schemes:
+                entries = view["entries"]
+                # NAV changes only matter for schemes we actually hold
+                nav_schemes = dirty_schemes & {code for code, _ in entries}
+                is_dirty = lambda key: key in dirty_keys or key[0] in nav_schemes
+
+                for key in [k for k in entries if is_dirty(k)]:
+                    del entries[key]
+                affected_schemes = nav_schemes | {code for code, _ in dirty_keys}
+                entries.update(_build_holding_entries(db, view_key, affected_schemes, is_dirty))
+        except Exception:
+            cache.mark_holding_view_stale(view)
+            raise
+
+        entries = sorted(view["entries"].values(), key=lambda e: e["order"])
+
+    return _aggregate_holdings(entries)
+
+def _build_holding_entries(db: Session, filter_type: str = None, scheme_codes: set = None, include=None):
+    """
+    Computes holding entries keyed by (scheme_code, account_name).
+    When scheme_codes is given, only holdings of those schemes are loaded,
+    and include(key) can further restrict which of them are computed.
+    """
+    from models import SIPMandate
+
     # 1. Fetch Investments (Filtered)
-    query = db.query(Investment)
-    if filter_type and filter_type.lower() != 'all':
+    # Column projection: plain row tuples instead of hydrated ORM objects
+    query = db.query(
+        Investment.id,
+        Investment.scheme_code,
+        Investment.type,
+        Investment.amount,
+        Investment.units,
+        Investment.purchase_date,
+        Investment.holding_period,
+        Investment.account_name
+    )
+    if filter_type:
         # exact match for 'SIP' or 'LUMPSUM' (case sensitive in DB usually)
-        # Assuming frontend sends 'SIP' or 'LUMPSUM'
         query = query.filter(Investment.type == filter_type)
-    
+    if scheme_codes is not None:
+        if not scheme_codes:
+            return {}
+        query = query.filter(Investment.scheme_code.in_(scheme_codes))
+
     investments = query.all()
-    
+
     # 2. Group by Scheme AND Account
     inv_map = {}
-    scheme_codes = set()
-    
     for inv in investments:
-        # Use a tuple key: (scheme_code, account_name)
         # account_name might be None in DB, handle gracefully
         acc = inv.account_name if inv.account_name else "Default"
         key = (inv.scheme_code, acc)
-        
-        if key not in inv_map:
-            inv_map[key] = []
-        inv_map[key].append(inv)
-        scheme_codes.add(inv.scheme_code)
-        
+        if include and not include(key):
+            continue
+        inv_map.setdefault(key, []).append(inv)
+
     # 3. Fetch Schemes Details
-    schemes = db.query(Scheme).filter(Scheme.scheme_code.in_(scheme_codes)).all()
+    codes = {code for code, _ in inv_map}
+    schemes = db.query(
+        Scheme.scheme_code,
+        Scheme.scheme_name,
+        Scheme.category,
+        Scheme.fund_house,
+        Scheme.net_asset_value,
+        Scheme.date
+    ).filter(Scheme.scheme_code.in_(codes)).all()
     scheme_map = {s.scheme_code: s for s in schemes}
-    
+
     # 4. Fetch SIP Mandates (for accurate Start Date and Duration)
-    from models import SIPMandate
-    sip_mandates = db.query(SIPMandate).all()
     sip_map = {}
-    for m in sip_mandates:
-        # Use tuple key: (scheme_code, account_name)
+    mandates = db.query(
+        SIPMandate.scheme_code,
+        SIPMandate.account_name,
+        SIPMandate.start_date,
+        SIPMandate.duration_years
+    ).filter(SIPMandate.scheme_code.in_(codes)).all()
+    for m in mandates:
         acc = m.account_name if m.account_name else "Default"
         sip_map[(m.scheme_code, acc)] = m
 
-    summary = []
-    total_invested = 0
-    total_current_value = 0
-    total_realized_pnl = 0.0
-    global_cashflows = []
-    
-    for (scheme_code, account_name), raw_txns in inv_map.items():
-        scheme = scheme_map.get(scheme_code)
-        if not scheme: continue 
-        
-        # Aggregate logic with Realized P&L (Average Cost Method)
-        # Sort transactions by date to ensure correct cost basis evolution
-        sorted_txns = sorted(raw_txns, key=lambda x: x.purchase_date)
-        
-        curr_units = 0.0
-        curr_invested = 0.0
-        scheme_realized_pnl = 0.0
-        scheme_realized_value = 0.0
-        
-        # First Investment Date (for Duration calculation)
-        first_invested_date = sorted_txns[0].purchase_date if sorted_txns else None
+    # 5. FIFO ledgers, shared with the tax reports and maintained incrementally there.
+    # Type-filtered views hold no redemptions, so nothing is realized in them.
+    ledgers = tax.get_ledgers(db, set(inv_map)) if not filter_type else {}
 
-        total_units_sold = 0.0
-        total_units_bought = 0.0 # New: Track total bought units
-        gross_invested_amount = 0.0 # New: Track total money put in
-        last_sell_date = None
-        
-        for txn in sorted_txns:
-            if txn.units > 0: # BUY (SIP/LUMPSUM)
-                curr_units += txn.units
-                curr_invested += txn.amount
-                total_units_bought += txn.units
-                gross_invested_amount += txn.amount
-            else: # SELL (REDEMPTION) - Units are negative
-                units_sold = abs(txn.units)
-                total_units_sold += units_sold
-                last_sell_date = txn.purchase_date # Since sorted by date, this will update to latest
+    entries = {}
+    for key, raw_txns in inv_map.items():
+        scheme = scheme_map.get(key[0])
+        if not scheme:
+            continue
+        entries[key] = _compute_holding(db, scheme, key[1], raw_txns, sip_map.get(key), ledgers.get(key))
+    return entries
+
+def _compute_holding(db: Session, scheme, account_name: str, raw_txns: list, sip_mandate=None, ledger=None):
+    """
+    Computes the summary entry of a single (scheme, account) holding.
+    scheme, raw_txns and sip_mandate are projected rows (attribute access only);
+    ledger is the holding's FIFO ledger from tax.get_ledgers (None if nothing to match).
+    """
+    scheme_code = scheme.scheme_code
+    
+    # Aggregate logic with Realized P&L (Average Cost Method)
+    # Sort transactions by date to ensure correct cost basis evolution
+    sorted_txns = sorted(raw_txns, key=lambda x: x.purchase_date)
+    
+    curr_units = 0.0
+    curr_invested = 0.0
+    scheme_realized_pnl = 0.0
+    scheme_realized_value = 0.0
+    
+    # First Investment Date (for Duration calculation)
+    first_invested_date = sorted_txns[0].purchase_date if sorted_txns else None
+
+    total_units_sold = 0.0
+    total_units_bought = 0.0 # New: Track total bought units
+    gross_invested_amount = 0.0 # New: Track total money put in
+    last_sell_date = None
+    
+    for txn in sorted_txns:
+        if txn.units > 0: # BUY (SIP/LUMPSUM)
+            curr_units += txn.units
+            curr_invested += txn.amount
+            total_units_bought += txn.units
+            gross_invested_amount += txn.amount
+        else: # SELL (REDEMPTION) - Units are negative
+            units_sold = abs(txn.units)
+            total_units_sold += units_sold
+            last_sell_date = txn.purchase_date # Since sorted by date, this will update to latest
+            
+            if curr_units > 0:
+                # Calculate Average Cost at time of sale
+                avg_cost_per_unit = curr_invested / curr_units
+                cost_of_sold = avg_cost_per_unit * units_sold
                 
-                if curr_units > 0:
-                    # Calculate Average Cost at time of sale
-                    avg_cost_per_unit = curr_invested / curr_units
-                    cost_of_sold = avg_cost_per_unit * units_sold
-                    
-                    sale_value = abs(txn.amount) # Amount stored as negative for outflows
-                    pnl = sale_value - cost_of_sold
-                    scheme_realized_pnl += pnl
-                    scheme_realized_value += sale_value
-                    
-                    # Reduce basis
-                    curr_invested -= cost_of_sold
-                    curr_units -= units_sold
-                    
-                    # Safety adjustments for floating point errors
-                    if curr_units < 1e-5: 
-                        curr_units = 0
-                        curr_invested = 0
-                else:
-                    # Selling without units (shouldn't happen technically)
-                    pass
-
-        # Skip if units are zero AND no P&L (completely inactive)
-        # But if we have Realized P&L, we might want to show it? 
-        # For now, let's keep the user's existing logic of skipping sold-out schemes in active view,
-        # OR better: The user wants "Realized P&L" on Dashboard. 
-        # If we skip here, we lose the P&L stats.
-        # However, the current view is "Holdings". Sold out schemes shouldn't appear in Holdings.
-        # But we need to aggregate P&L globally.
-        
-        # We will continue to calculate, but flag for filtering
-        is_active = curr_units >= 0.01
-        
-        # Average NAV
-        avg_nav = curr_invested / curr_units if curr_units > 0 else 0
-        
-        # Original Buy NAV (Weighted Average of ALL buys)
-        avg_buy_nav = gross_invested_amount / total_units_bought if total_units_bought > 0 else 0
-        
-        # Avg Sold NAV
-        avg_sold_nav = scheme_realized_value / total_units_sold if total_units_sold > 0 else 0
-        
-        # Tax Status Calculation (Simplified)
-        # Logic: If 'Equity' in category and duration > 365 days -> Long Term
-        # Else if duration > 1095 days (3 years) -> Long Term
-        # Else Short Term
+                sale_value = abs(txn.amount) # Amount stored as negative for outflows
+                pnl = sale_value - cost_of_sold
+                scheme_realized_pnl += pnl
+                scheme_realized_value += sale_value
+                
+                # Reduce basis
+                curr_invested -= cost_of_sold
+                curr_units -= units_sold
+                
+                # Safety adjustments for floating point errors
+                if curr_units < 1e-5: 
+                    curr_units = 0
+                    curr_invested = 0
+            else:
+                # Selling without units (shouldn't happen technically)
+                pass
+
+    # Skip if units are zero AND no P&L (completely inactive)
+    # But if we have Realized P&L, we might want to show it? 
+    # For now, let's keep the user's existing logic of skipping sold-out schemes in active view,
+    # OR better: The user wants "Realized P&L" on Dashboard. 
+    # If we skip here, we lose the P&L stats.
+    # However, the current view is "Holdings". Sold out schemes shouldn't appear in Holdings.
+    # But we need to aggregate P&L globally.
+    
+    # We will continue to calculate, but flag for filtering
+    is_active = curr_units >= 0.01
+    
+    # Average NAV
+    avg_nav = curr_invested / curr_units if curr_units > 0 else 0
+    
+    # Original Buy NAV (Weighted Average of ALL buys)
+    avg_buy_nav = gross_invested_amount / total_units_bought if total_units_bought > 0 else 0
+    
+    # Avg Sold NAV
+    avg_sold_nav = scheme_realized_value / total_units_sold if total_units_sold > 0 else 0
+    
+    # Tax Status (FIFO lots, per Indian capital gains rules)
+    # Realized P&L above stays on Average Cost to match invested_amount; the
+    # STCG/LTCG split follows the lots actually consumed by each redemption.
+    realized_lots = ledger["realized"] if ledger else []
+    realized_stcg, realized_ltcg = tax.summarize_realized(realized_lots, scheme.category, scheme.scheme_name)
+    asset_class = tax.get_asset_class(scheme.category, scheme.scheme_name)
+    terms = {tax.get_gain_term(asset_class, lot["buy_date"], lot["sell_date"]) for lot in realized_lots}
+    if terms == {"LTCG"}:
+        tax_status = "Long Term"
+    elif terms == {"STCG", "LTCG"}:
+        tax_status = "Mixed"
+    else:
         tax_status = "Short Term"
-        days_held = 0
-        if first_invested_date and last_sell_date:
-            days_held = (last_sell_date - first_invested_date).days
-            
-        is_equity = scheme.category and ('Equity' in scheme.category or 'Index' in scheme.category)
-        if is_equity:
-            if days_held > 365:
-                tax_status = "Long Term"
-        else:
-            if days_held > 1095:
-                tax_status = "Long Term"
 
-        # Current Value
-        current_nav = scheme.net_asset_value
-        current_val = curr_units * current_nav
-        
-        # XIRR Calculation
-        scheme_txns = []
-        for inv in raw_txns:
-            scheme_txns.append((inv.purchase_date, -inv.amount))
-            global_cashflows.append((inv.purchase_date, -inv.amount))
-            
-        nav_date = scheme.date if scheme.date else date.today()
-        scheme_txns.append((nav_date, current_val))
-        
-        xirr_val = calculate_xirr(scheme_txns)
-        
-        # Absolute Return
-        abs_return = current_val - curr_invested
-        return_pct = (abs_return / curr_invested) * 100 if curr_invested > 0 else 0
-        
-        # Last Investment Details
-        last_inv = sorted(raw_txns, key=lambda x: x.purchase_date, reverse=True)[0]
-        last_invested_date = last_inv.purchase_date
-        holding_period = last_inv.holding_period
+    # Current Value
+    current_nav = scheme.net_asset_value
+    current_val = curr_units * current_nav
+    
+    # XIRR Calculation
+    scheme_txns = [(inv.purchase_date, -inv.amount) for inv in raw_txns]
         
-        # Check if any transaction is currently of type SIP
-        is_sip = any(i.type == 'SIP' for i in raw_txns)
+    nav_date = scheme.date if scheme.date else date.today()
+    scheme_txns.append((nav_date, current_val))
+    
+    xirr_val = calculate_xirr(scheme_txns)
+    
+    # Absolute Return
+    abs_return = current_val - curr_invested
+    return_pct = (abs_return / curr_invested) * 100 if curr_invested > 0 else 0
+    
+    # Last Investment Details
+    last_inv = sorted(raw_txns, key=lambda x: x.purchase_date, reverse=True)[0]
+    last_invested_date = last_inv.purchase_date
+    holding_period = last_inv.holding_period
+    
+    # Check if any transaction is currently of type SIP
+    is_sip = any(i.type == 'SIP' for i in raw_txns)
 
-        # Baseline for Plan/Redemption Calculation
-        sip_mandate = sip_map.get((scheme_code, account_name))
-        
-        # Default Plan Baseline (Start of Plan)
-        plan_start_date = first_invested_date
-        
-        if sip_mandate:
-            # ALWAYS prioritize Mandate Start Date for the Strategic Plan
-            # This ensures consistency with the SIP Tracker entry
-            plan_start_date = sip_mandate.start_date
-            
-            if sip_mandate.duration_years:
-                holding_period = sip_mandate.duration_years
-
-        # Calculate Strategic Target Date
-        redemption_date = None
-        if plan_start_date and holding_period:
-            # Approximation: 365.25 days per year
-            days = int(holding_period * 365.25)
-            redemption_date = plan_start_date + timedelta(days=days)
-        
-        # 52-Week High/Low Calculation
-        one_year_ago = date.today() - timedelta(days=365)
+    # Baseline for Plan/Redemption Calculation (sip_mandate)
+    
+    # Default Plan Baseline (Start of Plan)
+    plan_start_date = first_invested_date
+    
+    if sip_mandate:
+        # ALWAYS prioritize Mandate Start Date for the Strategic Plan
+        # This ensures consistency with the SIP Tracker entry
+        plan_start_date = sip_mandate.start_date
         
-        # We need dates, so we must fetch the rows
-        query_52w = db.query(NAVHistory).filter(
+        if sip_mandate.duration_years:
+            holding_period = sip_mandate.duration_years
+
+    # Calculate Strategic Target Date
+    redemption_date = None
+    if plan_start_date and holding_period:
+        # Approximation: 365.25 days per year
+        days = int(holding_period * 365.25)
+        redemption_date = plan_start_date + timedelta(days=days)
+    
+    # 52-Week High/Low Calculation
+    one_year_ago = date.today() - timedelta(days=365)
+    
+    # We need dates, so we must fetch the rows
+    query_52w = db.query(NAVHistory.net_asset_value, NAVHistory.date).filter(
+        NAVHistory.scheme_code == scheme_code,
+        NAVHistory.date >= one_year_ago
+    )
+    
+    high_52_row = query_52w.order_by(NAVHistory.net_asset_value.desc()).first()
+    low_52_row = query_52w.order_by(NAVHistory.net_asset_value.asc()).first()
+
+    min_52w = low_52_row.net_asset_value if low_52_row else current_nav
+    max_52w = high_52_row.net_asset_value if high_52_row else current_nav
+    
+    min_52w_date = low_52_row.date if low_52_row else None
+    max_52w_date = high_52_row.date if high_52_row else None
+
+    # Calculate "Since Invested" High/Low (History >= First Invested Date)
+    min_since_invested = current_nav
+    max_since_invested = current_nav
+    min_since_invested_date = None
+    max_since_invested_date = None
+
+    if first_invested_date:
+        query_since = db.query(NAVHistory.net_asset_value, NAVHistory.date).filter(
             NAVHistory.scheme_code == scheme_code,
-            NAVHistory.date >= one_year_ago
+            NAVHistory.date >= first_invested_date
         )
         
-        high_52_row = query_52w.order_by(NAVHistory.net_asset_value.desc()).first()
-        low_52_row = query_52w.order_by(NAVHistory.net_asset_value.asc()).first()
+        high_since_row = query_since.order_by(NAVHistory.net_asset_value.desc()).first()
+        low_since_row = query_since.order_by(NAVHistory.net_asset_value.asc()).first()
+        
+        min_since_invested = low_since_row.net_asset_value if low_since_row else current_nav
+        max_since_invested = high_since_row.net_asset_value if high_since_row else current_nav
+        
+        min_since_invested_date = low_since_row.date if low_since_row else None
+        max_since_invested_date = high_since_row.date if high_since_row else None
+
+        # Fallback checks against current NAV logic (similar to watchlist)
+        if current_nav > max_since_invested:
+            max_since_invested = current_nav
+            max_since_invested_date = date.today()
+        if current_nav < min_since_invested and min_since_invested > 0:
+             min_since_invested = current_nav
+             min_since_invested_date = date.today()
+        elif min_since_invested == 0:
+             min_since_invested = current_nav
+             min_since_invested_date = date.today()
+    
+    holding = {
+        "scheme_code": scheme_code,
+        "scheme_name": scheme.scheme_name,
+        "category": scheme.category,
+        "fund_house": scheme.fund_house,
+        "invested_amount": curr_invested,
+        "current_value": current_val,
+        "total_units": curr_units,
+        "average_nav": avg_nav,
+        "current_nav": current_nav,
+        "absolute_return": abs_return,
+        "return_percentage": return_pct,
+        "xirr": xirr_val,
+        "last_invested_date": last_invested_date,
+        "first_invested_date": first_invested_date,
+        "plan_start_date": plan_start_date,
+        "last_sell_date": last_sell_date,
+        "holding_period": holding_period,
+        "redemption_date": redemption_date,
+        "is_sip": is_sip,
+        "min_52w": min_52w,
+        "max_52w": max_52w,
+        "min_52w_date": min_52w_date,
+        "max_52w_date": max_52w_date,
+        "min_52w_date": min_52w_date,
+        "max_52w_date": max_52w_date,
+        "min_since_invested": min_since_invested,
+        "max_since_invested": max_since_invested,
+        "min_since_invested_date": min_since_invested_date,
+        "max_since_invested_date": max_since_invested_date,
+        "realized_pnl": scheme_realized_pnl,
+        "realized_value": scheme_realized_value,
+        "total_units_sold": total_units_sold,
+        "avg_sold_nav": avg_sold_nav,
+        "total_units_bought": total_units_bought,
+        "avg_buy_nav": avg_buy_nav,
+        "gross_invested_amount": gross_invested_amount,
+        "tax_status": tax_status,
+        "realized_stcg": realized_stcg,
+        "realized_ltcg": realized_ltcg,
+        "account_name": account_name
+    }
+
+    return {
+        "order": min(inv.id for inv in raw_txns),
+        "holding": holding,
+        "cashflows": [(inv.purchase_date, -inv.amount) for inv in raw_txns],
+        "invested": curr_invested,
+        "current_value": current_val,
+        "realized_pnl": scheme_realized_pnl
+    }
+
+def _aggregate_holdings(entries: list):
+    """Re-aggregates portfolio totals and global XIRR from cached holding entries."""
+    summary = []
+    total_invested = 0
+    total_current_value = 0
+    total_realized_pnl = 0.0
+    cashflows_by_date = {}
+
+    for entry in entries:
+        summary.append(entry["holding"])
+        total_invested += entry["invested"]
+        total_current_value += entry["current_value"]
+        total_realized_pnl += entry["realized_pnl"]
+        for d, amount in entry["cashflows"]:
+            cashflows_by_date[d] = cashflows_by_date.get(d, 0.0) + amount
 
-        min_52w = low_52_row.net_asset_value if low_52_row else current_nav
-        max_52w = high_52_row.net_asset_value if high_52_row else current_nav
-        
-        min_52w_date = low_52_row.date if low_52_row else None
-        max_52w_date = high_52_row.date if high_52_row else None
-
-        # Calculate "Since Invested" High/Low (History >= First Invested Date)
-        min_since_invested = current_nav
-        max_since_invested = current_nav
-        min_since_invested_date = None
-        max_since_invested_date = None
-
-        if first_invested_date:
-            query_since = db.query(NAVHistory).filter(
-                NAVHistory.scheme_code == scheme_code,
-                NAVHistory.date >= first_invested_date
-            )
-            
-            high_since_row = query_since.order_by(NAVHistory.net_asset_value.desc()).first()
-            low_since_row = query_since.order_by(NAVHistory.net_asset_value.asc()).first()
-            
-            min_since_invested = low_since_row.net_asset_value if low_since_row else current_nav
-            max_since_invested = high_since_row.net_asset_value if high_since_row else current_nav
-            
-            min_since_invested_date = low_since_row.date if low_since_row else None
-            max_since_invested_date = high_since_row.date if high_since_row else None
-
-            # Fallback checks against current NAV logic (similar to watchlist)
-            if current_nav > max_since_invested:
-                max_since_invested = current_nav
-                max_since_invested_date = date.today()
-            if current_nav < min_since_invested and min_since_invested > 0:
-                 min_since_invested = current_nav
-                 min_since_invested_date = date.today()
-            elif min_since_invested == 0:
-                 min_since_invested = current_nav
-                 min_since_invested_date = date.today()
-        
-        summary.append({
-            "scheme_code": scheme_code,
-            "scheme_name": scheme.scheme_name,
-            "category": scheme.category,
-            "fund_house": scheme.fund_house,
-            "invested_amount": curr_invested,
-            "current_value": current_val,
-            "total_units": curr_units,
-            "average_nav": avg_nav,
-            "current_nav": current_nav,
-            "absolute_return": abs_return,
-            "return_percentage": return_pct,
-            "xirr": xirr_val,
-            "last_invested_date": last_invested_date,
-            "first_invested_date": first_invested_date,
-            "plan_start_date": plan_start_date,
-            "last_sell_date": last_sell_date,
-            "holding_period": holding_period,
-            "redemption_date": redemption_date,
-            "is_sip": is_sip,
-            "min_52w": min_52w,
-            "max_52w": max_52w,
-            "min_52w_date": min_52w_date,
-            "max_52w_date": max_52w_date,
-            "min_52w_date": min_52w_date,
-            "max_52w_date": max_52w_date,
-            "min_since_invested": min_since_invested,
-            "max_since_invested": max_since_invested,
-            "min_since_invested_date": min_since_invested_date,
-            "max_since_invested_date": max_since_invested_date,
-            "realized_pnl": scheme_realized_pnl,
-            "realized_value": scheme_realized_value,
-            "total_units_sold": total_units_sold,
-            "avg_sold_nav": avg_sold_nav,
-            "total_units_bought": total_units_bought,
-            "avg_buy_nav": avg_buy_nav,
-            "gross_invested_amount": gross_invested_amount,
-            "tax_status": tax_status,
-            "account_name": account_name
-        })
-        
-        total_invested += curr_invested
-        total_current_value += current_val
-        total_realized_pnl += scheme_realized_pnl
-        
     # Global Portfolio XIRR
     portfolio_xirr = 0.0
     if total_current_value > 0 or total_realized_pnl != 0:
         # Add current value as a cashflow at today's date
-        calc_cashflows = list(global_cashflows)
+        calc_cashflows = list(cashflows_by_date.items())
         calc_cashflows.append((date.today(), total_current_value))
         portfolio_xirr = calculate_xirr(calc_cashflows)
 
@@ -437,11 +616,78 @@ def get_portfolio_summary(db: Session, filter_type: str = None):
             "portfolio_xirr": portfolio_xirr
         }
 
+
+# Grouping columns for get_portfolio_aggregates, with the label used for missing values
+AGGREGATE_DIMENSIONS = {
+    "account": (func.coalesce(Portfolio.account_name, "Default"), "Default"),
+    "fund_house": (Scheme.fund_house, "Unknown"),
+    "category": (Scheme.category, "Uncategorized"),
+}
+
+def get_portfolio_aggregates(db: Session, by: str = "account"):
+    """
+    Rolls up holdings by account, fund house, category or watchlist group with a
+    single grouped query: invested amount, current value, gain and counts.
+    Holdings come from the aggregated Portfolio table (Average Cost basis).
+    """
+    if by == "group":
+        return _get_watchlist_group_aggregates(db)
+
+    column, missing_label = AGGREGATE_DIMENSIONS[by]
+    current_value = func.sum(Portfolio.total_units * Scheme.net_asset_value)
+    rows = db.query(
+        column.label("name"),
+        func.sum(Portfolio.invested_amount).label("invested_amount"),
+        current_value.label("current_value"),
+        func.count(Portfolio.id).label("holding_count"),
+        func.count(func.distinct(Portfolio.scheme_code)).label("scheme_count")
+    ).join(
+        Scheme, Scheme.scheme_code == Portfolio.scheme_code
+    ).filter(
+        Portfolio.total_units >= 0.01
+    ).group_by(column).order_by(current_value.desc()).all()
+
+    return [_aggregate_row(row, missing_label) for row in rows]
+
+def _get_watchlist_group_aggregates(db: Session):
+    """Watchlist rollup per group; sold items are valued at their sold NAV, as in get_watchlist."""
+    nav = case((Watchlist.is_sold == True, func.coalesce(Watchlist.sold_nav, Scheme.net_asset_value)), else_=Scheme.net_asset_value)
+    current_value = func.sum(func.coalesce(Watchlist.units, 0.0) * nav)
+    rows = db.query(
+        WatchlistGroup.name.label("name"),
+        func.sum(func.coalesce(Watchlist.invested_amount, 0.0)).label("invested_amount"),
+        current_value.label("current_value"),
+        func.count(Watchlist.id).label("holding_count"),
+        func.count(func.distinct(Watchlist.scheme_code)).label("scheme_count")
+    ).join(
+        Scheme, Scheme.scheme_code == Watchlist.scheme_code
+    ).outerjoin(
+        WatchlistGroup, WatchlistGroup.id == Watchlist.group_id
+    ).group_by(WatchlistGroup.name).order_by(current_value.desc()).all()
+
+    return [_aggregate_row(row, "Uncategorized") for row in rows]
+
+def _aggregate_row(row, missing_label: str):
+    invested = row.invested_amount or 0.0
+    value = row.current_value or 0.0
+    gain = value - invested
+    return {
+        "name": row.name or missing_label,
+        "invested_amount": invested,
+        "current_value": value,
+        "gain": gain,
+        "return_percentage": (gain / invested) * 100 if invested > 0 else 0,
+        "holding_count": row.holding_count,
+        "scheme_count": row.scheme_count
+    }
+
 def delete_scheme_history(db: Session, scheme_code: str):
     """
     Permanently delete all investment history for a scheme.
     Used for removing 'Sold' items from history.
     """
+    accounts = [acc for (acc,) in db.query(Investment.account_name).filter(Investment.scheme_code == scheme_code).distinct().all()]
+
     # 1. Delete all investments for this scheme
     db.query(Investment).filter(Investment.scheme_code == scheme_code).delete()
     
@@ -449,6 +695,7 @@ def delete_scheme_history(db: Session, scheme_code: str):
     db.query(Portfolio).filter(Portfolio.scheme_code == scheme_code).delete()
     
     db.commit()
+    bump_data_version(holdings=[(scheme_code, acc) for acc in accounts])
     return True
 
 def redeem_investment(db: Session, scheme_code: str, units: float, nav: float, date: date, remarks: str = None, account_name: str = "Default"):
@@ -468,41 +715,22 @@ def redeem_investment(db: Session, scheme_code: str, units: float, nav: float, d
     )
     
     db.add(new_redemption)
-    db.commit()
-    db.refresh(new_redemption)
-    
-    # 2. Update Portfolio Aggregate
-    # We update the portfolio table item. 
-    # Logic similar to add_investment but we need to handle reduction.
-    
-    portfolio_item = db.query(Portfolio).filter(Portfolio.scheme_code == scheme_code).first()
-    if portfolio_item:
-        # Avoid division by zero if it was somehow 0
-        if portfolio_item.total_units > 0:
-             # Reduce Invested Amount proportionally (Average Cost Method)
-             # Invested Amount remains proportional to units if we consider 'Remaining Cost'
-             # Or we can just calculate: New Invested = (Old Invested / Old Units) * New Units
-             
-             avg_cost = portfolio_item.invested_amount / portfolio_item.total_units
-             cost_removed = avg_cost * units
-             
-             portfolio_item.total_units -= units
-             portfolio_item.invested_amount -= cost_removed
-             
-             # Safety
-             if portfolio_item.total_units < 1e-5:
-                 portfolio_item.total_units = 0
-                 portfolio_item.invested_amount = 0
-        else:
-             portfolio_item.total_units = 0
-             portfolio_item.invested_amount = 0
 
+    # 2. Update Portfolio Aggregate of this account's holding (Average Cost replay,
+    # so a backdated redemption is costed the same way as in the holdings view)
+    try:
+        db.flush()
+        rebuild_portfolio_aggregates(db, [(scheme_code, account_name)])
         db.commit()
-        db.refresh(portfolio_item)
-        
+    except Exception:
+        db.rollback()
+        raise
+    db.refresh(new_redemption)
+
+    bump_data_version(holdings=[(scheme_code, account_name)], appended=True)
     return new_redemption
 
-def add_to_watchlist(db: Session, scheme_code: str, group_id: int = None, target_nav: float = None, units: float = 0.0, invested_amount: float = 0.0):
+def add_to_watchlist(db: Session, scheme_code: str, group_id: int = None, target_nav: float = None, units: float = 0.0, invested_amount: float = 0.0, drop_alert_pct: float = None):
     """Adds a scheme to the watchlist with optional group and details."""
     # Check if already in watchlist WITH THE SAME GROUP (allow same fund in different groups)
     # ONLY check for ACTIVE items. If an item is SOLD, we allow adding a new ACTIVE one.
@@ -516,11 +744,14 @@ def add_to_watchlist(db: Session, scheme_code: str, group_id: int = None, target
         # Update existing entry (same fund, same group)
         if target_nav is not None:
             existing.target_nav = target_nav
+        if drop_alert_pct is not None:
+            existing.drop_alert_pct = drop_alert_pct
         if units > 0:
             existing.units = units
         if invested_amount > 0:
             existing.invested_amount = invested_amount
         db.commit()
+        bump_data_version()
         db.refresh(existing)
         return existing
     
@@ -529,24 +760,31 @@ def add_to_watchlist(db: Session, scheme_code: str, group_id: int = None, target
         scheme_code=scheme_code,
         group_id=group_id,
         target_nav=target_nav,
+        drop_alert_pct=drop_alert_pct,
         units=units,
         invested_amount=invested_amount
     )
     db.add(item)
     db.commit()
+    bump_data_version()
     return item
 
 def get_watchlist(db: Session):
     """Gets watchlist with details and latest NAVs."""
-    from models import NAVHistory
     from datetime import timedelta, date
-    from sqlalchemy import func
 
-    items = db.query(Watchlist).all()
+    # Eager-load scheme and group in the same query instead of one lazy load per item
+    items = db.query(Watchlist).options(
+        joinedload(Watchlist.scheme),
+        joinedload(Watchlist.group)
+    ).all()
     result = []
     
     today = date.today()
     one_year_ago = today - timedelta(days=365)
+
+    # NAV history of every watched scheme in one query (cached per scheme in nav_index)
+    nav_series = nav_index.get_nav_series(db, {item.scheme_code for item in items})
     
     for item in items:
         group_name = item.group.name if item.group else "Uncategorized"
@@ -564,37 +802,11 @@ def get_watchlist(db: Session):
         gain_loss = (current_value - item.invested_amount) if item.invested_amount else 0
         gain_loss_pct = (gain_loss / item.invested_amount * 100) if item.invested_amount > 0 else 0
 
-        # Calculate 52-Week High/Low (Last 365 Days) WITH DATES
-        query_52w = db.query(NAVHistory).filter(
-            NAVHistory.scheme_code == item.scheme_code,
-            NAVHistory.date >= one_year_ago
-        )
-        
-        high_52_row = query_52w.order_by(NAVHistory.net_asset_value.desc()).first()
-        low_52_row = query_52w.order_by(NAVHistory.net_asset_value.asc()).first()
-
-        high_52 = high_52_row.net_asset_value if high_52_row else current_nav
-        low_52 = low_52_row.net_asset_value if low_52_row else current_nav
-        
-        high_52_date = high_52_row.date if high_52_row else None
-        low_52_date = low_52_row.date if low_52_row else None
+        # 52-Week High/Low (Last 365 Days) and "Since Tracking" High/Low (History >= Added On) WITH DATES
+        dates, navs = nav_series[item.scheme_code]
+        high_52, high_52_date, low_52, low_52_date = _nav_extremes(dates, navs, one_year_ago, current_nav)
+        high_all, high_date, low_all, low_date = _nav_extremes(dates, navs, item.added_on, current_nav)
 
-        # Calculate "Since Tracking" High/Low (History >= Added On) WITH DATES
-        # We need actual rows to get dates.
-        query_base = db.query(NAVHistory).filter(NAVHistory.scheme_code == item.scheme_code)
-        
-        if item.added_on:
-            query_base = query_base.filter(NAVHistory.date >= item.added_on)
-            
-        high_row = query_base.order_by(NAVHistory.net_asset_value.desc()).first()
-        low_row = query_base.order_by(NAVHistory.net_asset_value.asc()).first()
-
-        high_all = high_row.net_asset_value if high_row else current_nav
-        low_all = low_row.net_asset_value if low_row else current_nav
-        
-        high_date = high_row.date if high_row else None
-        low_date = low_row.date if low_row else None
-        
         # Fallback Logic
         if current_nav > high_52: 
             high_52 = current_nav
@@ -629,6 +841,7 @@ def get_watchlist(db: Session):
             "group_id": item.group_id,
             "group_name": group_name,
             "target_nav": item.target_nav,
+            "drop_alert_pct": item.drop_alert_pct,
             "units": item.units,
             "invested_amount": item.invested_amount,
             "current_value": current_value,
@@ -651,6 +864,20 @@ def get_watchlist(db: Session):
         })
     return result
 
+def _nav_extremes(dates, navs, since, current_nav):
+    """
+    Highest and lowest NAV on/after `since` (all history if None) with their dates.
+    Falls back to current_nav with no date when there is no history in the window.
+    Ties resolve to the earliest date.
+    """
+    start = np.searchsorted(dates, np.datetime64(since, "D")) if since else 0
+    window = navs[start:]
+    if not len(window):
+        return current_nav, None, current_nav, None
+    high = start + int(np.argmax(window))
+    low = start + int(np.argmin(window))
+    return float(navs[high]), dates[high].item(), float(navs[low]), dates[low].item()
+
 def delete_watchlist_item(db: Session, item_id: int):
     """Hard delete a watchlist item."""
     item = db.query(Watchlist).filter(Watchlist.id == item_id).first()
@@ -658,6 +885,7 @@ def delete_watchlist_item(db: Session, item_id: int):
         return False
     db.delete(item)
     db.commit()
+    bump_data_version()
     return True
 
 def update_watchlist_item_date(db: Session, item_id: int, new_date: date):
@@ -668,6 +896,7 @@ def update_watchlist_item_date(db: Session, item_id: int, new_date: date):
     
     item.added_on = new_date
     db.commit()
+    bump_data_version()
     db.refresh(item)
     return item
 
@@ -682,6 +911,7 @@ def mark_watchlist_item_sold(db: Session, item_id: int, sold_nav: float, sold_da
     item.sold_date = sold_date
     
     db.commit()
+    bump_data_version()
     db.refresh(item)
     return item
 
@@ -694,6 +924,7 @@ def create_watchlist_group(db: Session, name: str):
     group = WatchlistGroup(name=name)
     db.add(group)
     db.commit()
+    bump_data_version()
     db.refresh(group)
     return group
 
@@ -708,6 +939,7 @@ def update_watchlist_group(db: Session, group_id: int, name: str):
         return None
     group.name = name
     db.commit()
+    bump_data_version()
     db.refresh(group)
     return group
 
@@ -723,6 +955,7 @@ def delete_watchlist_group(db: Session, group_id: int):
     # Delete group
     db.delete(group)
     db.commit()
+    bump_data_version()
     return True
 
 def delete_investment(db: Session, investment_id: int):
@@ -733,56 +966,32 @@ def delete_investment(db: Session, investment_id: int):
     if not investment:
         return False
     
-    # Update Portfolio - Reverse impact
-    portfolio_item = db.query(Portfolio).filter(
-        Portfolio.scheme_code == investment.scheme_code,
-        Portfolio.account_name == investment.account_name
-    ).first()
-    
-    if portfolio_item:
-        portfolio_item.total_units -= investment.units
-        portfolio_item.invested_amount -= investment.amount
-        
-        # Handle floating point precision / zeroing out
-        if portfolio_item.total_units <= 0.0001:  # Threshold for practical zero
-            portfolio_item.total_units = 0.0
-            portfolio_item.invested_amount = 0.0
-            portfolio_item.average_nav = 0.0
-        else:
-            # Recalculate Average NAV based on remaining amount and units
-            portfolio_item.average_nav = portfolio_item.invested_amount / portfolio_item.total_units
-            
+    holding_key = (investment.scheme_code, investment.account_name)
     db.delete(investment)
-    db.commit()
+
+    # Replay the holding's remaining transactions (a deleted redemption must restore its cost, not its proceeds)
+    try:
+        db.flush()
+        rebuild_portfolio_aggregates(db, [holding_key])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    bump_data_version(holdings=[holding_key])
     return True
 
 def update_investment(db: Session, investment_id: int, scheme_code: str, invest_type: str, amount: float, purchase_nav: float, purchase_date: date, holding_period: float = None, account_name: str = "Default"):
     """
-    Updates an investment by reversing old one and adding new one.
+    Updates an investment and rebuilds the Portfolio rows of the old and new holding.
     """
     # 1. Get old investment
     investment = db.query(Investment).filter(Investment.id == investment_id).first()
     if not investment:
         return None
         
-    # 2. Revert Old Portfolio Impact
-    old_portfolio_item = db.query(Portfolio).filter(
-        Portfolio.scheme_code == investment.scheme_code,
-        Portfolio.account_name == investment.account_name
-    ).first()
-    
-    if old_portfolio_item:
-        old_portfolio_item.total_units -= investment.units
-        old_portfolio_item.invested_amount -= investment.amount
-        
-        if old_portfolio_item.total_units <= 0.0001:
-            old_portfolio_item.total_units = 0.0
-            old_portfolio_item.invested_amount = 0.0
-            old_portfolio_item.average_nav = 0.0
-        else:
-            old_portfolio_item.average_nav = old_portfolio_item.invested_amount / old_portfolio_item.total_units
+    old_holding_key = (investment.scheme_code, investment.account_name)
 
-    # 3. Update Investment Record
+    # 2. Update Investment Record
     investment.scheme_code = scheme_code
     investment.type = invest_type
     investment.amount = amount
@@ -794,31 +1003,14 @@ def update_investment(db: Session, investment_id: int, scheme_code: str, invest_
     new_units = amount / purchase_nav
     investment.units = new_units
     
-    # 4. Apply New Portfolio Impact
-    new_portfolio_item = db.query(Portfolio).filter(
-        Portfolio.scheme_code == scheme_code,
-        Portfolio.account_name == account_name
-    ).first()
-    
-    if new_portfolio_item:
-        new_total_units = new_portfolio_item.total_units + new_units
-        new_total_invested = new_portfolio_item.invested_amount + amount
-        
-        new_portfolio_item.total_units = new_total_units
-        new_portfolio_item.invested_amount = new_total_invested
-        # Weighted Average NAV
-        new_portfolio_item.average_nav = new_total_invested / new_total_units
-    else:
-        # Create new if didn't exist 
-        new_portfolio_item = Portfolio(
-            scheme_code=scheme_code,
-            total_units=new_units,
-            average_nav=purchase_nav,
-            invested_amount=amount,
-            account_name=account_name
-        )
-        db.add(new_portfolio_item)
-        
-    db.commit()
+    # 3. Rebuild the Portfolio rows of the old and new holding from their transactions
+    try:
+        db.flush()
+        rebuild_portfolio_aggregates(db, [old_holding_key, (scheme_code, account_name)])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    bump_data_version(holdings=[old_holding_key, (scheme_code, account_name)])
     db.refresh(investment)
     return investment
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+import numpy as np
+from sqlalchemy.orm import Session
+from services import cache, nav_index
+from services.sip import add_months
+
+# Point-to-point periods in months; CAGR is reported for the periods of a year or more
+PERIODS = (("1M", 1), ("3M", 3), ("6M", 6), ("1Y", 12), ("3Y", 36), ("5Y", 60))
+
+# Upper bound on schemes whose statistics are kept in memory
+MAX_CACHED_SCHEMES = 5000
+
+_lock = threading.Lock()
+# scheme_code -> ((scheme_version, latest_date, latest_nav), stats), LRU ordered
+_stats = OrderedDict()
+
+
+def get_return_stats(db: Session, scheme_codes):
+    """
+    Returns {scheme_code: stats} with point-to-point returns over PERIODS, CAGR for
+    periods of a year or more and since the first NAV, and the 52-week high / low.
+
+    Everything is measured back from the scheme's latest NAV (history plus the
+    current NAV in the scheme master), with the start NAV being the last one on or
+    before the period start. A scheme's stats only change when a new NAV arrives, so
+    they are cached per scheme until then. Unknown schemes with no NAVs are omitted.
+    """
+    codes = list(dict.fromkeys(scheme_codes))
+    latest = nav_index.get_latest_navs(db, codes)
+
+    result = {}
+    missing = []
+    with _lock:
+        for code in codes:
+            entry = _stats.get(code)
+            if entry and entry[0] == _stats_key(code, latest.get(code)):
+                _stats.move_to_end(code)
+                result[code] = entry[1]
+            else:
+                missing.append(code)
+
+    if missing:
+        series = nav_index.get_nav_series(db, missing)
+        computed = {}
+        for code in missing:
+            key = _stats_key(code, latest.get(code))
+            stats = _compute_stats(code, *series[code], latest.get(code))
+            computed[code] = (key, stats)
+
+        with _lock:
+            for code, (key, stats) in computed.items():
+                if stats is not None:
+                    result[code] = stats
+                # Skip storing if the scheme changed while we were computing
+                if key == _stats_key(code, latest.get(code)):
+                    _stats[code] = (key, stats)
+                    _stats.move_to_end(code)
+            while len(_stats) > MAX_CACHED_SCHEMES:
+                _stats.popitem(last=False)
+
+    return {code: result[code] for code in codes if result.get(code) is not None}
+
+
+def _stats_key(code, current):
+    return (cache.get_scheme_version(code),) + tuple(current or (None, None))
+
+
+def _compute_stats(code, dates, navs, current):
+    """Stats for one scheme from its sorted NAV arrays (all periods in one searchsorted call)."""
+    if current and current[0] and current[1] and (not len(dates) or np.datetime64(current[0], "D") > dates[-1]):
+        dates = np.append(dates, np.datetime64(current[0], "D"))
+        navs = np.append(navs, current[1])
+    if not len(dates):
+        return None
+
+    end_date = dates[-1].item()
+    end_nav = float(navs[-1])
+    starts = np.array([add_months(end_date, -months) for _, months in PERIODS], dtype="datetime64[D]")
+    positions = np.searchsorted(dates, starts, side="right") - 1
+
+    returns = {}
+    cagr = {}
+    for (label, months), pos in zip(PERIODS, positions):
+        if pos < 0 or navs[pos] <= 0:
+            returns[label] = None
+            if months >= 12:
+                cagr[label] = None
+            continue
+        growth = end_nav / float(navs[pos])
+        returns[label] = round((growth - 1) * 100, 2)
+        if months >= 12:
+            days = (end_date - dates[pos].item()).days
+            cagr[label] = round((growth ** (365 / days) - 1) * 100, 2) if days > 0 else None
+
+    inception_days = (end_date - dates[0].item()).days
+    inception_cagr = None
+    if inception_days >= 365 and navs[0] > 0:
+        inception_cagr = round(((end_nav / float(navs[0])) ** (365 / inception_days) - 1) * 100, 2)
+
+    window_start = np.searchsorted(dates, np.datetime64(end_date - timedelta(days=365), "D"))
+    window_dates, window_navs = dates[window_start:], navs[window_start:]
+    high, low = int(np.argmax(window_navs)), int(np.argmin(window_navs))
+
+    return {
+        "scheme_code": code,
+        "nav": end_nav,
+        "nav_date": end_date,
+        "returns": returns,
+        "cagr": cagr,
+        "inception_date": dates[0].item(),
+        "inception_cagr": inception_cagr,
+        "high_52w": float(window_navs[high]),
+        "high_52w_date": window_dates[high].item(),
+        "low_52w": float(window_navs[low]),
+        "low_52w_date": window_dates[low].item()
+    }
@@ -0,0 +1,247 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy.orm import Session
+from models import Portfolio
+from services import cache, nav_index, scheme_master
+
+# NAV days per year used to annualize daily figures
+TRADING_DAYS = 252
+
+# Annual risk-free rate (%) for Sharpe / Sortino, roughly the 91-day T-bill yield
+DEFAULT_RISK_FREE_RATE = 6.5
+
+# Benchmark for downside capture when the caller names none: UTI Nifty 50 Index Fund -
+# Direct Plan - Growth. The NAV sync keeps its history like a held scheme's.
+DEFAULT_BENCHMARK = "120716"
+
+# Upper bound on per-scheme results kept in memory
+MAX_CACHED_RESULTS = 5000
+
+_lock = threading.Lock()
+# (scheme_code, years, risk_free, benchmark) -> (version key, metrics), LRU ordered
+_metrics = OrderedDict()
+
+
+def get_scheme_risk(db: Session, scheme_codes, years: int = 3, risk_free: float = DEFAULT_RISK_FREE_RATE, benchmark: str = None):
+    """
+    Returns {scheme_code: metrics} over the last `years` of each scheme's NAV history:
+    annualized volatility, max drawdown with peak / trough / recovery dates, Sharpe
+    and Sortino ratios, and downside capture against `benchmark` (DEFAULT_BENCHMARK
+    if not given; downside_capture_reason says why it is null).
+    Results are cached per scheme until its or the benchmark's NAVs change.
+    """
+    benchmark = benchmark or DEFAULT_BENCHMARK
+    codes = list(dict.fromkeys(scheme_codes))
+    wanted = codes + ([benchmark] if benchmark not in codes else [])
+    latest = nav_index.get_latest_navs(db, wanted)
+    bench_key = _version_key(benchmark, latest)
+
+    result = {}
+    missing = []
+    with _lock:
+        for code in codes:
+            entry = _metrics.get((code, years, risk_free, benchmark))
+            if entry and entry[0] == (_version_key(code, latest), bench_key):
+                _metrics.move_to_end((code, years, risk_free, benchmark))
+                result[code] = entry[1]
+            else:
+                missing.append(code)
+
+    if missing:
+        series = _get_series(db, missing + [benchmark], latest)
+        bench = series[benchmark]
+        computed = {}
+        for code in missing:
+            dates, navs = _window(*series[code], years)
+            metrics = _risk_metrics(dates, navs, risk_free, bench) if len(navs) > 2 else None
+            computed[code] = ((_version_key(code, latest), bench_key), metrics)
+
+        with _lock:
+            for code, (key, metrics) in computed.items():
+                result[code] = metrics
+                # Skip storing if the scheme changed while we were computing
+                if key[0][0] == cache.get_scheme_version(code):
+                    _metrics[(code, years, risk_free, benchmark)] = (key, metrics)
+                    _metrics.move_to_end((code, years, risk_free, benchmark))
+            while len(_metrics) > MAX_CACHED_RESULTS:
+                _metrics.popitem(last=False)
+
+    return {code: result[code] for code in codes if result.get(code) is not None}
+
+
+def get_portfolio_risk(db: Session, account_name: str = None, years: int = 3, risk_free: float = DEFAULT_RISK_FREE_RATE, benchmark: str = None):
+    """
+    Risk scorecard of the current holdings (Portfolio rows with units left).
+
+    Each holding gets its scheme's metrics plus its value and weight. The portfolio
+    line uses the value-weighted daily returns of the holdings on the union of their
+    NAV dates (NAVs forward-filled; a scheme with no NAV yet on a day is left out and
+    the other weights are scaled up for that day).
+    """
+    benchmark = benchmark or DEFAULT_BENCHMARK
+    query = db.query(Portfolio.scheme_code, Portfolio.account_name, Portfolio.total_units, Portfolio.invested_amount).filter(
+        Portfolio.total_units >= 0.01
+    )
+    if account_name:
+        query = query.filter(Portfolio.account_name == account_name)
+    rows = query.all()
+    if not rows:
+        return {"portfolio": None, "benchmark": benchmark, "holdings": []}
+
+    codes = list(dict.fromkeys(r.scheme_code for r in rows))
+    names = scheme_master.get_schemes(db, codes, fields=("scheme_name", "net_asset_value"))
+    metrics = get_scheme_risk(db, codes, years=years, risk_free=risk_free, benchmark=benchmark)
+
+    holdings = []
+    value_by_code = {}
+    for r in rows:
+        nav = (names.get(r.scheme_code) or {}).get("net_asset_value") or 0
+        value = r.total_units * nav
+        value_by_code[r.scheme_code] = value_by_code.get(r.scheme_code, 0) + value
+        holdings.append({
+            "scheme_code": r.scheme_code,
+            "scheme_name": (names.get(r.scheme_code) or {}).get("scheme_name"),
+            "account_name": r.account_name or "Default",
+            "current_value": round(value, 2),
+            "invested_amount": round(r.invested_amount or 0, 2),
+            "risk": metrics.get(r.scheme_code)
+        })
+
+    total_value = sum(value_by_code.values())
+    for h in holdings:
+        h["weight"] = round(h["current_value"] / total_value * 100, 2) if total_value else 0
+    holdings.sort(key=lambda h: h["current_value"], reverse=True)
+
+    portfolio = None
+    if total_value > 0:
+        wanted = codes + ([benchmark] if benchmark not in codes else [])
+        series = _get_series(db, wanted, nav_index.get_latest_navs(db, wanted))
+        dates, navs = _portfolio_index(
+            {code: _window(*series[code], years) for code in codes},
+            {code: value / total_value for code, value in value_by_code.items()}
+        )
+        if len(navs) > 2:
+            portfolio = _risk_metrics(dates, navs, risk_free, series[benchmark])
+            portfolio["current_value"] = round(total_value, 2)
+
+    return {"portfolio": portfolio, "benchmark": benchmark, "holdings": holdings}
+
+
+def _version_key(code, latest):
+    return (cache.get_scheme_version(code),) + tuple(latest.get(code) or (None, None))
+
+
+def _get_series(db: Session, codes, latest):
+    """NAV arrays per scheme, with the scheme master's current NAV appended when history lags it."""
+    series = nav_index.get_nav_series(db, codes)
+    result = {}
+    for code in codes:
+        dates, navs = series[code]
+        current = latest.get(code)
+        if current and current[0] and current[1] and (not len(dates) or np.datetime64(current[0], "D") > dates[-1]):
+            dates = np.append(dates, np.datetime64(current[0], "D"))
+            navs = np.append(navs, current[1])
+        result[code] = (dates, navs)
+    return result
+
+
+def _window(dates, navs, years):
+    """The last `years` of a series, counted back from its latest NAV."""
+    if not len(dates):
+        return dates, navs
+    start = np.searchsorted(dates, dates[-1] - np.timedelta64(int(round(years * 365.25)), "D"))
+    return dates[start:], navs[start:]
+
+
+def _risk_metrics(dates, navs, risk_free, benchmark):
+    returns = navs[1:] / navs[:-1] - 1
+    rf_daily = risk_free / 100 / TRADING_DAYS
+
+    annual_return = returns.mean() * TRADING_DAYS
+    volatility = returns.std(ddof=1) * np.sqrt(TRADING_DAYS)
+    downside = np.sqrt(np.mean(np.minimum(returns - rf_daily, 0) ** 2)) * np.sqrt(TRADING_DAYS)
+
+    # Max drawdown: deepest fall below the running peak
+    peaks = np.maximum.accumulate(navs)
+    drawdowns = navs / peaks - 1
+    trough = int(np.argmin(drawdowns))
+    peak = int(np.argmax(navs[:trough + 1]))
+    recovered = np.flatnonzero(navs[trough:] >= navs[peak])
+    recovery = trough + int(recovered[0]) if drawdowns[trough] < 0 and len(recovered) else None
+
+    metrics = {
+        "from": dates[0].item(),
+        "to": dates[-1].item(),
+        "observations": int(len(returns)),
+        "annual_return": round(float(annual_return) * 100, 2),
+        "volatility": round(float(volatility) * 100, 2),
+        "max_drawdown": round(float(drawdowns[trough]) * 100, 2),
+        "max_drawdown_peak_date": dates[peak].item(),
+        "max_drawdown_trough_date": dates[trough].item(),
+        "max_drawdown_recovery_date": dates[recovery].item() if recovery is not None else None,
+        "sharpe_ratio": _ratio(annual_return - risk_free / 100, volatility),
+        "sortino_ratio": _ratio(annual_return - risk_free / 100, downside),
+        "downside_capture": None,
+        "downside_capture_reason": None
+    }
+    metrics["downside_capture"], metrics["downside_capture_reason"] = _downside_capture(dates, navs, *benchmark)
+    return metrics
+
+
+def _ratio(excess, risk):
+    return round(float(excess / risk), 2) if risk > 0 else None
+
+
+def _downside_capture(dates, navs, bench_dates, bench_navs):
+    """
+    Fund return / benchmark return on the days the benchmark fell, in %
+    (below 100 means the fund lost less than the benchmark in down markets).
+    Both series are aligned on their common NAV dates first.
+    Returns (value, reason); reason says why value is None.
+    """
+    if not len(bench_dates):
+        return None, "Benchmark has no NAV history yet"
+    common, fund_idx, bench_idx = np.intersect1d(dates, bench_dates, assume_unique=True, return_indices=True)
+    if len(common) < 3:
+        return None, "Too few NAV dates in common with the benchmark"
+    fund = navs[fund_idx]
+    bench = bench_navs[bench_idx]
+    fund_returns = fund[1:] / fund[:-1] - 1
+    bench_returns = bench[1:] / bench[:-1] - 1
+    down = bench_returns < 0
+    if not down.any():
+        return None, "Benchmark did not fall on any day in the window"
+    return round(float(fund_returns[down].mean() / bench_returns[down].mean()) * 100, 2), None
+
+
+def _portfolio_index(series, weights):
+    """
+    Value-weighted portfolio index (starting at 1) on the union of the holdings' NAV dates.
+    Returns (dates, index values).
+    """
+    grid = np.unique(np.concatenate([dates for dates, _ in series.values()])) if series else np.array([], dtype="datetime64[D]")
+    if len(grid) < 2:
+        return grid, np.array([], dtype=float)
+
+    codes = list(series)
+    matrix = np.full((len(codes), len(grid)), np.nan)
+    for row, code in enumerate(codes):
+        dates, navs = series[code]
+        if not len(dates):
+            continue
+        positions = np.searchsorted(dates, grid, side="right") - 1
+        valid = positions >= 0
+        matrix[row, valid] = navs[positions[valid]]
+
+    returns = matrix[:, 1:] / matrix[:, :-1] - 1
+    w = np.array([weights.get(code, 0) for code in codes])[:, None]
+    available = ~np.isnan(returns)
+    weight_sum = (w * available).sum(axis=0)
+    daily = np.where(weight_sum > 0, np.nansum(returns * w, axis=0) / np.where(weight_sum > 0, weight_sum, 1), np.nan)
+
+    keep = ~np.isnan(daily) & (weight_sum > 0)
+    first = int(np.argmax(keep)) if keep.any() else len(keep)
+    daily = np.nan_to_num(daily[first:])
+    index = np.concatenate(([1.0], np.cumprod(1 + daily)))
+    return grid[first:], index
@@ -0,0 +1,137 @@
+import logging
+import sys
+import threading
+from sqlalchemy.orm import Session
+from models import AMC, Scheme, SchemeCategory
+
+logger = logging.getLogger(__name__)
+
+# The AMFI master has ~40k schemes (~13 MB in memory); beyond this the snapshot is skipped
+# and reads go to the database.
+MAX_SCHEMES = 150000
+
+COLUMNS = (
+    "scheme_code",
+    "scheme_name",
+    "category",
+    "fund_house",
+    "amc_id",
+    "category_id",
+    "isin_div_payout",
+    "isin_div_reinvestment",
+    "net_asset_value",
+    "date",
+    "last_updated"
+)
+
+# Read-only snapshot of the schemes table, replaced as a whole by rebuild() after each
+# sync commit so readers never see a half-updated master:
+# {"columns": {name: tuple}, "index": {scheme_code: row}, "amcs": [...], "categories": [...]}
+_snapshot = None
+_build_lock = threading.Lock()
+
+
+def rebuild(db: Session):
+    """Loads the scheme master into column tuples with a code -> row index, then swaps it in."""
+    global _snapshot
+    with _build_lock:
+        total = db.query(Scheme).count()
+        if total > MAX_SCHEMES:
+            logger.warning(f"Scheme master cache disabled: {total} schemes exceeds {MAX_SCHEMES}")
+            _snapshot = None
+            return 0
+
+        rows = db.query(*[getattr(Scheme, name) for name in COLUMNS]).all()
+        columns = list(zip(*rows)) or [()] * len(COLUMNS)
+
+        # Fund houses, categories and dates repeat across thousands of schemes; share one object each
+        shared = {}
+        for name in ("category", "fund_house", "isin_div_reinvestment", "date", "last_updated"):
+            position = COLUMNS.index(name)
+            columns[position] = tuple(_share(value, shared) for value in columns[position])
+
+        index = {code: row for row, code in enumerate(columns[0])}
+        amc_names = dict(db.query(AMC.id, AMC.name).all())
+        category_names = dict(db.query(SchemeCategory.id, SchemeCategory.name).all())
+        amc_ids = set(columns[COLUMNS.index("amc_id")])
+        category_ids = set(columns[COLUMNS.index("category_id")])
+
+        _snapshot = {
+            "columns": dict(zip(COLUMNS, (tuple(c) for c in columns))),
+            "index": index,
+            "amcs": sorted(amc_names[i] for i in amc_ids if i in amc_names),
+            "categories": sorted(category_names[i] for i in category_ids if i in category_names)
+        }
+        logger.info(f"Scheme master cache loaded: {len(index)} schemes")
+        return len(index)
+
+
+def _share(value, shared):
+    if isinstance(value, str):
+        return sys.intern(value)
+    if value is None:
+        return None
+    return shared.setdefault(value, value)
+
+
+def is_ready():
+    return _snapshot is not None
+
+
+def warm(session_factory):
+    """Loads the snapshot in a background thread at startup; reads use the database until then."""
+    def build():
+        db = session_factory()
+        try:
+            rebuild(db)
+        except Exception as e:
+            logger.error(f"Scheme master cache load failed: {e}")
+        finally:
+            db.close()
+    threading.Thread(target=build, daemon=True).start()
+
+
+def get_scheme(db: Session, scheme_code: str, fields=COLUMNS):
+    """Scheme row as a dict, or None if the code is unknown."""
+    return get_schemes(db, [scheme_code], fields).get(scheme_code)
+
+
+def get_schemes(db: Session, scheme_codes, fields=COLUMNS):
+    """
+    {scheme_code: dict} for the known codes among scheme_codes.
+    Served from the snapshot; codes it does not have (or all of them while it is
+    loading) are read from the database in one query.
+    """
+    snapshot = _snapshot
+    result = {}
+    missing = list(scheme_codes)
+    if snapshot is not None:
+        index = snapshot["index"]
+        columns = [snapshot["columns"][name] for name in fields]
+        missing = []
+        for code in scheme_codes:
+            row = index.get(code)
+            if row is None:
+                missing.append(code)
+            else:
+                result[code] = dict(zip(fields, (column[row] for column in columns)))
+
+    if missing:
+        rows = db.query(Scheme.scheme_code, *[getattr(Scheme, name) for name in fields]).filter(
+            Scheme.scheme_code.in_(set(missing))
+        ).all()
+        for row in rows:
+            result[row[0]] = dict(zip(fields, row[1:]))
+    return result
+
+
+def get_amc_names():
+    """AMC names that have at least one scheme, sorted; None when the snapshot is not loaded."""
+    snapshot = _snapshot
+    return list(snapshot["amcs"]) if snapshot is not None else None
+
+
+def get_category_names():
+    """Scheme categories that have at least one scheme, sorted; None when the snapshot is not loaded."""
+    snapshot = _snapshot
+    return list(snapshot["categories"]) if snapshot is not None else None
@@ -0,0 +1,130 @@
+import logging
+import re
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from models import Scheme
+from services import fuzzy, scheme_master
+
+logger = logging.getLogger(__name__)
+
+# FTS5 table over scheme names; scheme_code is stored but not tokenized.
+# prefix='2 3' keeps 2- and 3-character prefix indexes so short prefix queries stay fast.
+FTS_TABLE = "schemes_fts"
+
+# Columns returned by the search endpoints
+SLIM_FIELDS = ("scheme_code", "scheme_name", "category", "fund_house", "net_asset_value", "date")
+
+# Set by ensure_search_index(); False on non-SQLite backends or SQLite builds without FTS5
+_fts_available = False
+
+
+def ensure_search_index(engine):
+    """
+    Creates the FTS5 index if the backend supports it, and fills it when it is
+    out of step with the schemes table (first run, or rows added outside the sync).
+    """
+    global _fts_available
+    if engine.dialect.name != "sqlite":
+        _fts_available = False
+        return False
+
+    try:
+        with engine.begin() as connection:
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "scheme_code UNINDEXED, scheme_name, tokenize='unicode61', prefix='2 3')"
+            ))
+            indexed = connection.execute(text(f"SELECT COUNT(*) FROM {FTS_TABLE}")).scalar()
+            total = connection.execute(text("SELECT COUNT(*) FROM schemes")).scalar()
+            if indexed != total:
+                logger.info(f"Rebuilding scheme search index ({indexed} indexed, {total} schemes)")
+                connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+                connection.execute(text(
+                    f"INSERT INTO {FTS_TABLE} (scheme_code, scheme_name) SELECT scheme_code, scheme_name FROM schemes"
+                ))
+        _fts_available = True
+    except Exception as e:
+        logger.warning(f"FTS5 search index unavailable, using LIKE search: {e}")
+        _fts_available = False
+    return _fts_available
+
+
+def index_schemes(db: Session, scheme_codes):
+    """Re-indexes the given schemes (new or renamed) in the current transaction."""
+    codes = list(scheme_codes)
+    if not _fts_available:
+        return
+    # Chunked to stay under SQLite's bound-parameter limit on the first full sync
+    for start in range(0, len(codes), 500):
+        chunk = codes[start:start + 500]
+        params = {f"c{i}": code for i, code in enumerate(chunk)}
+        placeholders = ", ".join(f":c{i}" for i in range(len(chunk)))
+        db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE scheme_code IN ({placeholders})"), params)
+        db.execute(text(
+            f"INSERT INTO {FTS_TABLE} (scheme_code, scheme_name) "
+            f"SELECT scheme_code, scheme_name FROM schemes WHERE scheme_code IN ({placeholders})"
+        ), params)
+
+
+def search_schemes(db: Session, query: str, limit: int = 50):
+    """
+    Searches schemes by name and returns slim rows, best matches first.
+    Every word of the query is matched as a prefix ("hdfc mid" finds
+    "HDFC Mid-Cap Opportunities"), ranked by bm25 over all matches (FTS5
+    keeps only the top `limit` while ranking; a prefix that matches all ~40k
+    schemes takes ~0.1-0.2 s, two words a few ms).
+    Falls back to fuzzy (trigram) matching when nothing matches, and to a
+    substring LIKE when FTS5 is unavailable.
+    """
+    tokens = re.findall(r"\w+", query or "")
+    if _fts_available and tokens:
+        match = " ".join(f'"{token}"*' for token in tokens)
+        rows = _search_cached_master(db, match, limit)
+        if rows is None:
+            rows = db.execute(text(
+                f"SELECT s.scheme_code, s.scheme_name, s.category, s.fund_house, s.net_asset_value, s.date "
+                f"FROM (SELECT scheme_code, rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY rank LIMIT :limit) f "
+                f"JOIN schemes s ON s.scheme_code = f.scheme_code ORDER BY f.rank"
+            ), {"match": match, "limit": limit}).all()
+            rows = [_slim(row) for row in rows]
+        if rows or not fuzzy.is_ready():
+            return rows
+        # Nothing starts with these words: try typo-tolerant matching instead
+        return fuzzy.search(db, query, limit=limit)
+
+    rows = db.query(
+        Scheme.scheme_code,
+        Scheme.scheme_name,
+        Scheme.category,
+        Scheme.fund_house,
+        Scheme.net_asset_value,
+        Scheme.date
+    ).filter(
+        Scheme.scheme_name.like(f"%{query}%")
+    ).limit(limit).all()
+    return [_slim(row) for row in rows]
+
+
+def _search_cached_master(db: Session, match: str, limit: int):
+    """
+    Ranks codes in the FTS index only and fills in the rows from the scheme master
+    snapshot, skipping the join back to schemes. None when the snapshot is not loaded.
+    """
+    if not scheme_master.is_ready():
+        return None
+    codes = [code for (code,) in db.execute(text(
+        f"SELECT scheme_code FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY rank LIMIT :limit"
+    ), {"match": match, "limit": limit}).all()]
+    schemes = scheme_master.get_schemes(db, codes, fields=SLIM_FIELDS)
+    return [schemes[code] for code in codes if code in schemes]
+
+
+def _slim(row):
+    return {
+        "scheme_code": row.scheme_code,
+        "scheme_name": row.scheme_name,
+        "category": row.category,
+        "fund_house": row.fund_house,
+        "net_asset_value": row.net_asset_value,
+        "date": row.date
+    }
@@ -0,0 +1,41 @@
+import json
+from datetime import date, datetime
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    # orjson is in requirements.txt; stdlib json keeps the API working without it
+    orjson = None
+
+
+def _default(value):
+    """Types orjson / json cannot encode natively (ORM objects, pydantic models, Decimals)."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "item"):
+        return value.item()  # NumPy scalar
+    if hasattr(value, "tolist"):
+        return value.tolist()  # NumPy array
+    return jsonable_encoder(value)
+
+
+def dumps(content) -> bytes:
+    """
+    Encodes plain payloads (dicts, lists, str/int/float, dates, NumPy values) straight to JSON bytes.
+    Anything else falls back to FastAPI's jsonable_encoder, so ORM objects still work, just slower.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse encoded with orjson. Return it directly from an endpoint to skip
+    FastAPI's jsonable_encoder pass, which walks every value of large responses.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
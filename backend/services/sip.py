@@ -0,0 +1,160 @@
+import calendar
+import logging
+import numpy as np
+from datetime import date, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from models import Investment, SIPMandate
+from services import nav_index
+from services.cache import bump_data_version
+from services.portfolio import rebuild_portfolio_aggregates
+
+logger = logging.getLogger(__name__)
+
+# An installment is priced at the first NAV on/after its date; a larger gap means
+# the history is missing, so the installment is left for a later run.
+MAX_PRICE_LAG_DAYS = 7
+
+
+def add_months(d: date, months: int):
+    """Same day n months later, clamped to the month end (31-Jan + 1 -> 28/29-Feb)."""
+    month_index = d.month - 1 + months
+    year = d.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def get_installment_dates(start_date: date, duration_years: float, until: date):
+    """Monthly installment dates of a mandate from start_date up to `until` (inclusive)."""
+    total = int(round((duration_years or 0) * 12)) if duration_years else None
+    dates = []
+    k = 0
+    while total is None or k < total:
+        d = add_months(start_date, k)
+        if d > until:
+            break
+        dates.append(d)
+        k += 1
+    return dates
+
+
+def materialize_sip_installments(db: Session, until: date = None, dry_run: bool = False):
+    """
+    Creates the missing SIP Investment rows of every ACTIVE mandate up to `until`
+    (default today).
+
+    Each installment is priced from nav_history at the first NAV on/after its date
+    and recorded on that NAV date (the allotment date). Schemes whose history does
+    not reach back to the mandate start are backfilled first.
+
+    An installment is skipped if the holding already has a SIP transaction on its
+    allotment date or in its calendar month, so reruns (and installments entered by
+    hand) never duplicate. All rows are inserted in one statement and the affected
+    holdings are rebuilt once.
+    """
+    until = until or date.today()
+    mandates = db.query(
+        SIPMandate.id,
+        SIPMandate.scheme_code,
+        SIPMandate.account_name,
+        SIPMandate.sip_amount,
+        SIPMandate.start_date,
+        SIPMandate.duration_years
+    ).filter(SIPMandate.status == 'ACTIVE').all()
+    mandates = [m for m in mandates if m.start_date and m.sip_amount and m.sip_amount > 0]
+    if not mandates:
+        return {"created": 0, "dry_run": dry_run, "mandates": [], "unpriced": []}
+
+    codes = {m.scheme_code for m in mandates}
+    series = _get_covered_series(db, mandates)
+
+    # Dates of the SIP transactions already recorded, per holding (one query).
+    # Each matches at most one installment and is removed once it has.
+    existing = db.query(
+        Investment.scheme_code,
+        Investment.account_name,
+        Investment.purchase_date
+    ).filter(
+        Investment.scheme_code.in_(codes),
+        Investment.type == 'SIP'
+    ).all()
+    recorded = {}
+    for r in existing:
+        if r.purchase_date:
+            recorded.setdefault((r.scheme_code, r.account_name or "Default"), []).append(r.purchase_date)
+
+    rows = []
+    summary = []
+    unpriced = []
+    for m in mandates:
+        account = m.account_name or "Default"
+        holding_dates = recorded.setdefault((m.scheme_code, account), [])
+        dates, navs = series[m.scheme_code]
+        created = 0
+        for sip_date in get_installment_dates(m.start_date, m.duration_years, until):
+            idx = np.searchsorted(dates, np.datetime64(sip_date, "D"))
+            priced = idx < len(dates) and dates[idx] <= np.datetime64(sip_date + timedelta(days=MAX_PRICE_LAG_DAYS), "D")
+            allotment_date = dates[idx].item() if priced else None
+
+            # Already recorded on its allotment date (a rerun) or by hand in its month
+            match = next((d for d in holding_dates if d == allotment_date), None) or next(
+                (d for d in holding_dates if (d.year, d.month) == (sip_date.year, sip_date.month)), None
+            )
+            if match:
+                holding_dates.remove(match)
+                continue
+
+            if not priced:
+                unpriced.append({"mandate_id": m.id, "scheme_code": m.scheme_code, "date": sip_date})
+                continue
+
+            nav = float(navs[idx])
+            rows.append({
+                "scheme_code": m.scheme_code,
+                "type": "SIP",
+                "amount": m.sip_amount,
+                "units": m.sip_amount / nav,
+                "purchase_nav": nav,
+                "purchase_date": allotment_date,
+                "holding_period": m.duration_years,
+                "account_name": account
+            })
+            created += 1
+        summary.append({"mandate_id": m.id, "scheme_code": m.scheme_code, "account_name": account, "created": created})
+
+    if rows and not dry_run:
+        keys = {(r["scheme_code"], r["account_name"]) for r in rows}
+        try:
+            db.execute(insert(Investment), rows)
+            rebuild_portfolio_aggregates(db, keys)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        bump_data_version(holdings=keys)
+
+    return {"created": len(rows), "dry_run": dry_run, "mandates": summary, "unpriced": unpriced}
+
+
+def _get_covered_series(db: Session, mandates):
+    """
+    NAV arrays for the mandates' schemes. The daily sync only backfills schemes that
+    are already tracked, so a scheme whose history starts after its earliest mandate
+    is backfilled from MFAPI here before pricing.
+    """
+    from services.nav import backfill_scheme_history
+
+    starts = {}
+    for m in mandates:
+        starts[m.scheme_code] = min(starts.get(m.scheme_code, m.start_date), m.start_date)
+
+    series = nav_index.get_nav_series(db, starts)
+    stale = [code for code, start in starts.items() if not len(series[code][0]) or series[code][0][0] > np.datetime64(start, "D")]
+    for code in stale:
+        try:
+            backfill_scheme_history(db, code)
+        except Exception as e:
+            logger.error(f"Failed to backfill history for {code}: {e}")
+    if stale:
+        series.update(nav_index.get_nav_series(db, stale))
+    return series
@@ -0,0 +1,464 @@
+import re
+from collections import deque
+from datetime import date
+from sqlalchemy.orm import Session
+from models import Investment, Scheme
+from services import cache
+
+# Incremental view holding one FIFO ledger per (scheme_code, account_name)
+LEDGER_VIEW = "tax_ledger"
+
+# Finance Act 2023: debt funds bought on/after this date are taxed as short term regardless of holding
+SPECIFIED_FUND_CUTOFF = date(2023, 4, 1)
+# Finance (No. 2) Act 2024: revised holding periods for transfers on/after this date
+HOLDING_PERIOD_REVISION = date(2024, 7, 23)
+
+# Annual LTCG exemption on equity-oriented funds (Section 112A)
+LTCG_EXEMPTION_LIMIT = 125000.0
+LTCG_EXEMPTION_LIMIT_BEFORE_FY2024 = 100000.0
+
+# Units below this are treated as fully consumed (float dust)
+UNIT_EPSILON = 1e-6
+
+
+def get_financial_year(d: date):
+    """Indian financial year label for a date, e.g. 2024-05-10 -> 'FY2024-25'."""
+    start = d.year if d.month >= 4 else d.year - 1
+    return f"FY{start}-{str(start + 1)[-2:]}"
+
+
+def get_financial_year_start(d: date):
+    return date(d.year if d.month >= 4 else d.year - 1, 4, 1)
+
+
+def get_ltcg_exemption_limit(d: date):
+    """Equity LTCG exemption for the financial year containing d."""
+    return LTCG_EXEMPTION_LIMIT if get_financial_year_start(d).year >= 2024 else LTCG_EXEMPTION_LIMIT_BEFORE_FY2024
+
+
+# Hybrid sub-categories that hold at least 65% in (hedged or unhedged) equity
+EQUITY_ORIENTED_HYBRIDS = {
+    "Aggressive Hybrid Fund",
+    "Arbitrage Fund",
+    "Equity Savings",
+    "Balanced Advantage",
+    "Dynamic Asset Allocation or Balanced Advantage",
+}
+# Hybrid sub-categories that hold more than 65% in debt ("specified" funds)
+DEBT_ORIENTED_HYBRIDS = {"Conservative Hybrid Fund"}
+# Pre-2018 AMFI category headers, e.g. "Open Ended Schemes(Income)"
+LEGACY_CATEGORIES = {
+    "Growth": "equity",
+    "ELSS": "equity",
+    "Income": "debt",
+    "Gilt": "debt",
+    "Liquid": "debt",
+    "Money Market": "debt",
+}
+# "Other Scheme - Index Funds / ETFs" mixes equity and debt trackers; the index name decides
+DEBT_INDEX_PATTERN = re.compile(
+    r"\b(SDL|Gilt|G-?Sec|Bond|Debt|Crisil IBX|Target Maturity|T-?Bill|Treasury|Liquid|Money Market|Corporate)\b",
+    re.IGNORECASE
+)
+
+
+def get_asset_class(category: str, scheme_name: str = None):
+    """
+    Classifies a scheme for capital gains: 'equity', 'debt' or 'other', from its
+    AMFI category, e.g. "Open Ended Schemes(Hybrid Scheme - Aggressive Hybrid Fund)"
+    or "Hybrid Scheme - Aggressive Hybrid Fund" (MFAPI metadata).
+    - equity: Equity schemes and equity-oriented hybrids (>= 65% equity)
+    - debt ("specified"): Debt schemes, conservative hybrids and debt index funds / ETFs
+    - other: everything else (gold, FoFs, multi-asset, solution oriented, ...)
+    """
+    if not category:
+        return "other"
+    inner = category.strip()
+    if inner.endswith(")") and "(" in inner:
+        inner = inner[inner.index("(") + 1:-1]
+    scheme_type, _, sub_type = (part.strip() for part in inner.partition(" - "))
+
+    if not sub_type:
+        return LEGACY_CATEGORIES.get(scheme_type, "other")
+    if scheme_type == "Equity Scheme":
+        return "equity"
+    if scheme_type == "Debt Scheme":
+        return "debt"
+    if scheme_type == "Hybrid Scheme":
+        if sub_type in EQUITY_ORIENTED_HYBRIDS:
+            return "equity"
+        if sub_type in DEBT_ORIENTED_HYBRIDS:
+            return "debt"
+        return "other"
+    if scheme_type == "Other Scheme" and sub_type in ("Index Funds", "Other  ETFs", "Other ETFs"):
+        return "debt" if scheme_name and DEBT_INDEX_PATTERN.search(scheme_name) else "equity"
+    return "other"
+
+
+def get_long_term_days(asset_class: str, buy_date: date, sell_date: date):
+    """
+    Minimum holding days for a lot to be long term, or None if it can never be.
+    - Equity: more than 12 months
+    - Debt bought on/after 1-Apr-2023: always short term
+    - Others (and older debt): 24 months if sold on/after 23-Jul-2024, else 36 months
+    """
+    if asset_class == "equity":
+        return 365
+    if asset_class == "debt" and buy_date >= SPECIFIED_FUND_CUTOFF:
+        return None
+    return 730 if sell_date >= HOLDING_PERIOD_REVISION else 1095
+
+
+def get_gain_term(asset_class: str, buy_date: date, sell_date: date):
+    """Returns 'LTCG' or 'STCG' for a lot bought on buy_date and sold on sell_date."""
+    threshold = get_long_term_days(asset_class, buy_date, sell_date)
+    if threshold is not None and (sell_date - buy_date).days > threshold:
+        return "LTCG"
+    return "STCG"
+
+
+def build_ledger(txns):
+    """
+    Builds a FIFO lot ledger from transaction rows (id, purchase_date, units, amount).
+    Buys open lots; redemptions consume the oldest open lots first.
+    """
+    ledger = {"open_lots": deque(), "realized": [], "last_date": None, "last_id": 0}
+    for txn in sorted(txns, key=lambda t: (t.purchase_date, t.id)):
+        apply_transaction(ledger, txn)
+    return ledger
+
+
+def apply_transaction(ledger, txn):
+    """Applies one transaction to a ledger. Transactions must arrive in (date, id) order."""
+    if txn.units > 0:
+        ledger["open_lots"].append({
+            "txn_id": txn.id,
+            "date": txn.purchase_date,
+            "units": txn.units,
+            "cost_per_unit": txn.amount / txn.units
+        })
+    elif txn.units < 0:
+        units_to_sell = abs(txn.units)
+        sale_price = abs(txn.amount) / units_to_sell
+        lots = ledger["open_lots"]
+
+        # Selling more than we hold (shouldn't happen) leaves the excess unmatched
+        while units_to_sell > UNIT_EPSILON and lots:
+            lot = lots[0]
+            units = min(lot["units"], units_to_sell)
+            cost = units * lot["cost_per_unit"]
+            proceeds = units * sale_price
+            ledger["realized"].append({
+                "buy_txn_id": lot["txn_id"],
+                "sell_txn_id": txn.id,
+                "buy_date": lot["date"],
+                "sell_date": txn.purchase_date,
+                "units": units,
+                "cost": cost,
+                "proceeds": proceeds,
+                "gain": proceeds - cost,
+                "holding_days": (txn.purchase_date - lot["date"]).days
+            })
+            lot["units"] -= units
+            units_to_sell -= units
+            if lot["units"] < UNIT_EPSILON:
+                lots.popleft()
+
+    ledger["last_date"] = txn.purchase_date
+    ledger["last_id"] = max(ledger["last_id"], txn.id)
+
+
+def get_ledgers(db: Session, keys=None):
+    """
+    Returns {(scheme_code, account_name): ledger}, optionally restricted to keys.
+
+    Ledgers are cached and maintained incrementally: new transactions dated on or
+    after a ledger's last transaction are applied in place; edits, deletes and
+    back-dated entries rebuild only the affected (scheme, account) ledger.
+    """
+    view = cache.get_holding_view(LEDGER_VIEW, daily_refresh=False, track_appends=True)
+
+    with view["lock"]:
+        stale, dirty_keys, _, appended_keys = cache.claim_holding_changes(view)
+        try:
+            entries = view["entries"]
+            if stale:
+                entries = view["entries"] = _load_ledgers(db)
+            else:
+                if dirty_keys:
+                    for key in dirty_keys:
+                        entries.pop(key, None)
+                    entries.update(_load_ledgers(db, dirty_keys))
+                if appended_keys:
+                    _apply_appended(db, entries, appended_keys)
+        except Exception:
+            cache.mark_holding_view_stale(view)
+            raise
+
+        if keys is None:
+            return dict(entries)
+        return {key: entries[key] for key in keys if key in entries}
+
+
+def _query_transactions(db: Session, keys=None, min_id=None):
+    """Projected transaction rows grouped by (scheme_code, account_name)."""
+    query = db.query(
+        Investment.id,
+        Investment.scheme_code,
+        Investment.account_name,
+        Investment.purchase_date,
+        Investment.units,
+        Investment.amount
+    )
+    if keys is not None:
+        query = query.filter(Investment.scheme_code.in_({code for code, _ in keys}))
+    if min_id is not None:
+        query = query.filter(Investment.id > min_id)
+
+    grouped = {}
+    for row in query.all():
+        key = (row.scheme_code, row.account_name or "Default")
+        if keys is not None and key not in keys:
+            continue
+        grouped.setdefault(key, []).append(row)
+    return grouped
+
+
+def _load_ledgers(db: Session, keys=None):
+    return {key: build_ledger(txns) for key, txns in _query_transactions(db, keys).items()}
+
+
+def _apply_appended(db: Session, entries: dict, keys: set):
+    """Applies only the new transactions of appended holdings, rebuilding if any is back-dated."""
+    known = [entries[key]["last_id"] for key in keys if key in entries]
+    min_id = min(known) if len(known) == len(keys) else None
+    new_txns = _query_transactions(db, keys, min_id)
+
+    rebuild = set()
+    for key in keys:
+        ledger = entries.get(key)
+        if ledger is None:
+            rebuild.add(key)
+            continue
+        txns = sorted(
+            (t for t in new_txns.get(key, []) if t.id > ledger["last_id"]),
+            key=lambda t: (t.purchase_date, t.id)
+        )
+        if txns and ledger["last_date"] and txns[0].purchase_date < ledger["last_date"]:
+            rebuild.add(key)
+            continue
+        if txns:
+            # Copy-on-write: readers may still be iterating the cached ledger
+            ledger = entries[key] = _copy_ledger(ledger)
+            for txn in txns:
+                apply_transaction(ledger, txn)
+
+    if rebuild:
+        for key in rebuild:
+            entries.pop(key, None)
+        entries.update(_load_ledgers(db, rebuild))
+
+
+def _copy_ledger(ledger):
+    return {
+        "open_lots": deque(dict(lot) for lot in ledger["open_lots"]),
+        "realized": list(ledger["realized"]),
+        "last_date": ledger["last_date"],
+        "last_id": ledger["last_id"]
+    }
+
+
+def get_scheme_info(db: Session, codes):
+    """Projected scheme rows (name, category, current NAV) keyed by scheme code."""
+    schemes = db.query(
+        Scheme.scheme_code,
+        Scheme.scheme_name,
+        Scheme.category,
+        Scheme.net_asset_value
+    ).filter(Scheme.scheme_code.in_(codes)).all()
+    return {s.scheme_code: s for s in schemes}
+
+
+def summarize_realized(realized_lots, category: str, scheme_name: str = None):
+    """Splits realized FIFO lots of one scheme into STCG/LTCG totals."""
+    asset_class = get_asset_class(category, scheme_name)
+    stcg = 0.0
+    ltcg = 0.0
+    for lot in realized_lots:
+        if get_gain_term(asset_class, lot["buy_date"], lot["sell_date"]) == "LTCG":
+            ltcg += lot["gain"]
+        else:
+            stcg += lot["gain"]
+    return stcg, ltcg
+
+
+def get_tax_lots(db: Session, scheme_code: str = None, account_name: str = None):
+    """
+    Returns open FIFO lots with unrealized gain (and the term they would get if
+    sold today), plus realized lots, for each (scheme, account).
+    """
+    ledgers = _filter_ledgers(get_ledgers(db), scheme_code, account_name)
+    scheme_map = get_scheme_info(db, {code for code, _ in ledgers})
+    today = date.today()
+
+    result = []
+    for (code, account), ledger in ledgers.items():
+        scheme = scheme_map.get(code)
+        if not scheme:
+            continue
+        asset_class = get_asset_class(scheme.category, scheme.scheme_name)
+        current_nav = scheme.net_asset_value or 0.0
+
+        open_lots = []
+        for lot in ledger["open_lots"]:
+            cost = lot["units"] * lot["cost_per_unit"]
+            value = lot["units"] * current_nav
+            open_lots.append({
+                "buy_txn_id": lot["txn_id"],
+                "buy_date": lot["date"],
+                "units": lot["units"],
+                "cost_per_unit": lot["cost_per_unit"],
+                "cost": cost,
+                "current_value": value,
+                "unrealized_gain": value - cost,
+                "holding_days": (today - lot["date"]).days,
+                "term_if_sold_today": get_gain_term(asset_class, lot["date"], today)
+            })
+
+        realized_lots = [
+            dict(lot, term=get_gain_term(asset_class, lot["buy_date"], lot["sell_date"]))
+            for lot in ledger["realized"]
+        ]
+
+        result.append({
+            "scheme_code": code,
+            "scheme_name": scheme.scheme_name,
+            "account_name": account,
+            "asset_class": asset_class,
+            "current_nav": current_nav,
+            "open_lots": open_lots,
+            "realized_lots": realized_lots
+        })
+    return result
+
+
+def get_capital_gains(db: Session, start_date: date = None, end_date: date = None, account_name: str = None, scheme_code: str = None):
+    """Returns realized per-lot gains in a sell-date range, classified STCG/LTCG, with totals."""
+    ledgers = _filter_ledgers(get_ledgers(db), scheme_code, account_name)
+    scheme_map = get_scheme_info(db, {code for code, _ in ledgers})
+
+    lots = []
+    total_stcg = 0.0
+    total_ltcg = 0.0
+    for (code, account), ledger in ledgers.items():
+        scheme = scheme_map.get(code)
+        asset_class = get_asset_class(scheme.category, scheme.scheme_name) if scheme else "other"
+        for lot in ledger["realized"]:
+            if start_date and lot["sell_date"] < start_date:
+                continue
+            if end_date and lot["sell_date"] > end_date:
+                continue
+            term = get_gain_term(asset_class, lot["buy_date"], lot["sell_date"])
+            if term == "LTCG":
+                total_ltcg += lot["gain"]
+            else:
+                total_stcg += lot["gain"]
+            lots.append(dict(
+                lot,
+                scheme_code=code,
+                scheme_name=scheme.scheme_name if scheme else None,
+                account_name=account,
+                asset_class=asset_class,
+                term=term
+            ))
+
+    lots.sort(key=lambda l: (l["sell_date"], l["sell_txn_id"], l["buy_date"]))
+    return {
+        "lots": lots,
+        "total_stcg": total_stcg,
+        "total_ltcg": total_ltcg,
+        "total_gain": total_stcg + total_ltcg
+    }
+
+
+def get_redemption_index(db: Session):
+    """
+    Realized gains keyed by financial year, then (scheme_code, account_name):
+    {fy: {key: {"stcg", "ltcg", "proceeds", "cost", "units", "lot_count"}}}.
+    Built from the FIFO ledgers once per data version.
+    """
+    return cache.get_or_compute("redemption_index", None, lambda: _build_redemption_index(db))[1]
+
+
+def _build_redemption_index(db: Session):
+    ledgers = get_ledgers(db)
+    scheme_map = get_scheme_info(db, {code for code, _ in ledgers})
+
+    index = {}
+    for key, ledger in ledgers.items():
+        scheme = scheme_map.get(key[0])
+        asset_class = get_asset_class(scheme.category, scheme.scheme_name) if scheme else "other"
+        for lot in ledger["realized"]:
+            fy = get_financial_year(lot["sell_date"])
+            bucket = index.setdefault(fy, {}).get(key)
+            if bucket is None:
+                bucket = index[fy][key] = {"stcg": 0.0, "ltcg": 0.0, "proceeds": 0.0, "cost": 0.0, "units": 0.0, "lot_count": 0}
+            if get_gain_term(asset_class, lot["buy_date"], lot["sell_date"]) == "LTCG":
+                bucket["ltcg"] += lot["gain"]
+            else:
+                bucket["stcg"] += lot["gain"]
+            bucket["proceeds"] += lot["proceeds"]
+            bucket["cost"] += lot["cost"]
+            bucket["units"] += lot["units"]
+            bucket["lot_count"] += 1
+    return index
+
+
+def get_realized_report(db: Session, financial_years: list = None, account_name: str = None, scheme_code: str = None):
+    """
+    Realized P&L by financial year, account and scheme with the STCG/LTCG split.
+    Each year is a lookup in the redemption index; totals are rolled up from its buckets.
+    """
+    index = get_redemption_index(db)
+    years = sorted(index, reverse=True) if not financial_years else [fy for fy in dict.fromkeys(financial_years) if fy in index]
+    scheme_map = get_scheme_info(db, {code for fy in years for code, _ in index[fy]})
+
+    report = []
+    for fy in years:
+        accounts = {}
+        for (code, account), bucket in index[fy].items():
+            if (scheme_code and code != scheme_code) or (account_name and account != account_name):
+                continue
+            scheme = scheme_map.get(code)
+            accounts.setdefault(account, []).append(dict(
+                bucket,
+                scheme_code=code,
+                scheme_name=scheme.scheme_name if scheme else None,
+                total_gain=bucket["stcg"] + bucket["ltcg"]
+            ))
+        if not accounts:
+            continue
+
+        account_rows = []
+        for account, schemes in sorted(accounts.items()):
+            schemes.sort(key=lambda s: s["scheme_name"] or s["scheme_code"])
+            account_rows.append(dict(_sum_buckets(schemes), account_name=account, schemes=schemes))
+        report.append(dict(_sum_buckets(account_rows), financial_year=fy, accounts=account_rows))
+
+    return dict(_sum_buckets(report), financial_years=report)
+
+
+def _sum_buckets(rows):
+    totals = {"stcg": 0.0, "ltcg": 0.0, "proceeds": 0.0, "cost": 0.0}
+    for row in rows:
+        for field in totals:
+            totals[field] += row[field]
+    totals["total_gain"] = totals["stcg"] + totals["ltcg"]
+    return totals
+
+
+def _filter_ledgers(ledgers: dict, scheme_code: str = None, account_name: str = None):
+    return {
+        key: ledger for key, ledger in ledgers.items()
+        if (not scheme_code or key[0] == scheme_code) and (not account_name or key[1] == account_name)
+    }
@@ -0,0 +1,170 @@
+import numpy as np
+from datetime import date
+from sqlalchemy.orm import Session
+from models import Investment, Scheme
+from services import nav_index
+
+
+def get_portfolio_timeseries(db: Session, start_date: date = None, end_date: date = None, interval: str = "daily", account_name: str = None, scheme_code: str = None):
+    """
+    Returns invested amount, market value and unrealized P&L over time for the
+    whole portfolio, one account or one scheme.
+
+    Each (scheme, account) holding becomes a step function of cumulative units
+    and cost basis (Average Cost Method, same as the summary). The step functions
+    are sampled on the date grid with searchsorted and valued against the
+    forward-filled NAV series from nav_history (cached per scheme in nav_index).
+    """
+    query = db.query(
+        Investment.scheme_code,
+        Investment.account_name,
+        Investment.purchase_date,
+        Investment.units,
+        Investment.amount,
+        Investment.purchase_nav
+    )
+    if account_name:
+        query = query.filter(Investment.account_name == account_name)
+    if scheme_code:
+        query = query.filter(Investment.scheme_code == scheme_code)
+    rows = query.all()
+
+    if not rows:
+        return {"interval": interval, "points": []}
+
+    end_date = end_date or date.today()
+    start_date = start_date or min(r.purchase_date for r in rows)
+    if start_date > end_date:
+        return {"interval": interval, "points": []}
+
+    grid = _date_grid(start_date, end_date, interval)
+
+    # 1. Group transactions per holding
+    holdings = {}
+    for r in rows:
+        if r.purchase_date > end_date:
+            continue
+        key = (r.scheme_code, r.account_name or "Default")
+        holdings.setdefault(key, []).append(r)
+
+    codes = {code for code, _ in holdings}
+    nav_series = _load_nav_series(db, codes, end_date, holdings)
+
+    invested = np.zeros(len(grid))
+    value = np.zeros(len(grid))
+
+    # 2. Sample each holding's step functions on the grid
+    for (code, _), txns in holdings.items():
+        txn_dates, cum_units, cum_cost = _holding_steps(txns)
+        idx = np.searchsorted(txn_dates, grid, side="right") - 1
+        held = idx >= 0
+        units = np.where(held, cum_units[np.maximum(idx, 0)], 0.0)
+        cost = np.where(held, cum_cost[np.maximum(idx, 0)], 0.0)
+
+        nav_dates, navs = nav_series[code]
+        if not len(navs):
+            invested += cost
+            value += cost
+            continue
+        nav_idx = np.searchsorted(nav_dates, grid, side="right") - 1
+        nav = navs[np.maximum(nav_idx, 0)]
+        # No NAV known yet: value the holding at cost
+        holding_value = np.where(nav_idx >= 0, units * nav, cost)
+
+        invested += cost
+        value += holding_value
+
+    pnl = value - invested
+    dates = grid.astype(date)
+
+    return {
+        "interval": interval,
+        "points": [
+            {
+                "date": d,
+                "invested": round(float(i), 2),
+                "value": round(float(v), 2),
+                "pnl": round(float(p), 2)
+            }
+            for d, i, v, p in zip(dates, invested, value, pnl)
+        ]
+    }
+
+
+def _date_grid(start_date: date, end_date: date, interval: str):
+    """Daily grid, or weekly grid anchored on end_date."""
+    step = 7 if interval == "weekly" else 1
+    end = np.datetime64(end_date, "D")
+    count = (end_date - start_date).days // step
+    return end - np.arange(count, -1, -1) * np.timedelta64(step, "D")
+
+
+def _holding_steps(txns):
+    """
+    Cumulative units and cost basis after each transaction date.
+    Redemptions reduce cost at the running average cost (as in the summary).
+    """
+    txns = sorted(txns, key=lambda t: t.purchase_date)
+    dates, units_after, cost_after = [], [], []
+    curr_units = 0.0
+    curr_cost = 0.0
+
+    for t in txns:
+        if t.units > 0:
+            curr_units += t.units
+            curr_cost += t.amount
+        elif curr_units > 0:
+            units_sold = min(abs(t.units), curr_units)
+            curr_cost -= (curr_cost / curr_units) * units_sold
+            curr_units -= units_sold
+            if curr_units < 1e-5:
+                curr_units = 0.0
+                curr_cost = 0.0
+
+        # Several transactions on one day collapse into the last state
+        if dates and dates[-1] == t.purchase_date:
+            units_after[-1] = curr_units
+            cost_after[-1] = curr_cost
+        else:
+            dates.append(t.purchase_date)
+            units_after.append(curr_units)
+            cost_after.append(curr_cost)
+
+    return np.array(dates, dtype="datetime64[D]"), np.array(units_after), np.array(cost_after)
+
+
+def _load_nav_series(db: Session, codes: set, end_date: date, holdings: dict):
+    """
+    Per-scheme sorted (dates, navs) arrays from nav_history, completed with
+    transaction NAVs and the current scheme NAV where history has gaps.
+    """
+    history = nav_index.get_nav_series(db, codes)
+    end = np.datetime64(end_date, "D")
+
+    # Transaction NAVs and current NAVs fill gaps; history wins on the same date
+    fallback = {code: {} for code in codes}
+    for (code, _), txns in holdings.items():
+        for t in txns:
+            if t.purchase_nav:
+                fallback[code][t.purchase_date] = t.purchase_nav
+    for s in db.query(Scheme.scheme_code, Scheme.date, Scheme.net_asset_value).filter(Scheme.scheme_code.in_(codes)).all():
+        if s.date and s.net_asset_value and s.date <= end_date:
+            fallback[s.scheme_code][s.date] = s.net_asset_value
+
+    series = {}
+    for code in codes:
+        hist_dates, hist_navs = history[code]
+        fb_dates = np.array(list(fallback[code].keys()), dtype="datetime64[D]")
+        fb_navs = np.array(list(fallback[code].values()), dtype=float)
+
+        dates = np.concatenate((hist_dates, fb_dates))
+        navs = np.concatenate((hist_navs, fb_navs))
+        priority = np.concatenate((np.zeros(len(hist_dates)), np.ones(len(fb_dates))))
+
+        order = np.lexsort((priority, dates))
+        dates, navs = dates[order], navs[order]
+        keep = np.ones(len(dates), dtype=bool)
+        keep[1:] = dates[1:] != dates[:-1]
+        keep &= dates <= end
+        series[code] = (dates[keep], navs[keep])
+    return series
@@ -70,6 +70,8 @@ const FundSelector = ({ onSelect, selectedScheme }) => {
             let filtered = data;
             if (selectedAMC) {
                 filtered = data.filter(s => {
+                    // Exact fund house match (AMC list comes from the AMFI AMC headers)
+                    if (s.fund_house === selectedAMC) return true;
                     const schemeLower = s.scheme_name.toLowerCase();
                     const amcLower = selectedAMC.toLowerCase();
                     // Check if scheme name contains the AMC name
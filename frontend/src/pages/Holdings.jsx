@@ -1070,7 +1070,7 @@ const Row = ({ item, isChild = false, showXIRR, onRedeem, activeTab = 'active',
                     </div>
                 </td>
                 <td className="p-4 align-middle text-center">
-                    <span className={`text-xs px-2 py-1 rounded font-medium ${item.tax_status === 'Long Term' ? 'bg-emerald-900/30 text-emerald-400' : 'bg-amber-900/30 text-amber-400'}`}>
+                    <span className={`text-xs px-2 py-1 rounded font-medium ${item.tax_status === 'Long Term' ? 'bg-emerald-900/30 text-emerald-400' : item.tax_status === 'Mixed' ? 'bg-blue-900/30 text-blue-400' : 'bg-amber-900/30 text-amber-400'}`}>
                         {item.tax_status || 'Short Term'}
                     </span>
                 </td>
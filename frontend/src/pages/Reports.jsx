@@ -1,93 +1,70 @@
 import { useState, useEffect, useMemo } from 'react';
-import { getPortfolio } from '../services/api';
+import { getRealizedReport, getAccounts } from '../services/api';
 import { ArrowUp, ArrowDown, RefreshCw, FileText } from 'lucide-react';
 import PrivacyGuard from '../components/PrivacyGuard';
 
 const Reports = () => {
-    const [portfolio, setPortfolio] = useState(null);
+    const [report, setReport] = useState(null);
     const [loading, setLoading] = useState(true);
+    const [accounts, setAccounts] = useState([]);
+    const [filterAccount, setFilterAccount] = useState('');
+    const [selectedYears, setSelectedYears] = useState([]);
+    const [availableYears, setAvailableYears] = useState([]);
 
     useEffect(() => {
-        fetchPortfolio();
+        getAccounts().then(({ data }) => setAccounts(data)).catch(err => console.error("Failed to fetch accounts", err));
     }, []);
 
-    const fetchPortfolio = async () => {
+    useEffect(() => {
+        fetchReport();
+    }, [filterAccount, selectedYears]);
+
+    // Filtering happens on the server: fy (repeatable) and account are query parameters
+    const fetchReport = async () => {
         try {
-            const { data } = await getPortfolio();
-            setPortfolio(data);
+            const { data } = await getRealizedReport({
+                fy: selectedYears.length ? selectedYears : undefined,
+                account: filterAccount || undefined
+            });
+            setReport(data);
+            if (!selectedYears.length) {
+                setAvailableYears(data.financial_years.map(year => year.financial_year));
+            }
         } catch (error) {
-            console.error("Failed to fetch portfolio", error);
+            console.error("Failed to fetch realized report", error);
         } finally {
             setLoading(false);
         }
     };
 
-    // Helper: Calculate Financial Year
-    const getFinancialYear = (dateString) => {
-        if (!dateString) return 'Unknown';
-        const date = new Date(dateString);
-        const month = date.getMonth(); // 0-11
-        const year = date.getFullYear();
-
-        let fyStart = year;
-        if (month < 3) fyStart = year - 1;
-
-        const fyEnd = (fyStart + 1).toString().slice(-2);
-        return `FY ${fyStart}-${fyEnd}`;
-    };
-
+    // One row per financial year. Every column comes from the same FIFO lots, each
+    // booked in the FY of its own sale, so Short Term + Long Term = Total Realized.
     const reportData = useMemo(() => {
-        if (!portfolio?.holdings) return [];
-
-        const fyMap = {};
-
-        portfolio.holdings.forEach(item => {
-            // Consider only items with realized P&L or sold history
-            if (item.realized_pnl !== 0 || item.total_units_sold > 0) {
-                const fy = getFinancialYear(item.last_sell_date || item.purchase_date); // Fallback to purchase if distinct sell date missing? rare. items with realized pnl should have sell date.
-
-                if (!fyMap[fy]) {
-                    fyMap[fy] = {
-                        fy,
-                        shortTerm: 0,
-                        longTerm: 0,
-                        total: 0,
-                        invested: 0,
-                        exited: 0
-                    };
-                }
-
-                const pnl = item.realized_pnl || 0;
-                const exitValue = item.realized_value || 0;
-                // Cost of Sold = Exit Value - P&L
-                const investedValue = exitValue - pnl;
-
-                fyMap[fy].total += pnl;
-                fyMap[fy].exited += exitValue;
-                fyMap[fy].invested += investedValue;
-
-                if (item.tax_status === 'Long Term') {
-                    fyMap[fy].longTerm += pnl;
-                } else {
-                    // Default to Short Term if not explicitly Long Term
-                    fyMap[fy].shortTerm += pnl;
-                }
-            }
-        });
-
-        // Convert to array and sort by FY descending (approx string sort works for FY YYYY)
-        return Object.values(fyMap).sort((a, b) => b.fy.localeCompare(a.fy));
-    }, [portfolio]);
+        if (!report?.financial_years) return [];
+        return report.financial_years.map(year => ({
+            fy: year.financial_year,
+            shortTerm: year.stcg,
+            longTerm: year.ltcg,
+            total: year.total_gain,
+            invested: year.cost,
+            exited: year.proceeds
+        }));
+    }, [report]);
+
+    const toggleYear = (fy) => {
+        setSelectedYears(prev => prev.includes(fy) ? prev.filter(y => y !== fy) : [...prev, fy]);
+    };
 
     const grandTotals = useMemo(() => {
-        return reportData.reduce((acc, curr) => ({
-            shortTerm: acc.shortTerm + curr.shortTerm,
-            longTerm: acc.longTerm + curr.longTerm,
-            total: acc.total + curr.total,
-            invested: acc.invested + curr.invested,
-            exited: acc.exited + curr.exited
-        }), { shortTerm: 0, longTerm: 0, total: 0, invested: 0, exited: 0 });
-    }, [reportData]);
+        if (!report) return { shortTerm: 0, longTerm: 0, total: 0, invested: 0, exited: 0 };
+        return {
+            shortTerm: report.stcg,
+            longTerm: report.ltcg,
+            total: report.total_gain,
+            invested: report.cost,
+            exited: report.proceeds
+        };
+    }, [report]);
 
     if (loading) {
         return (
@@ -107,18 +84,46 @@ const Reports = () => {
                         Capital Gains Report
                     </h1>
                     <p className="text-slate-400 text-sm mt-1">
-                        Realized Profit & Loss aggregated by Financial Year
+                        Realized gains by Financial Year, on the FIFO lots used for tax (each sale in its own year)
                     </p>
                 </div>
+                <select
+                    value={filterAccount}
+                    onChange={(e) => setFilterAccount(e.target.value)}
+                    className="bg-slate-800 border border-slate-700 text-slate-200 text-sm rounded-lg px-3 py-2 focus:outline-none focus:border-blue-500"
+                >
+                    <option value="" className="bg-slate-800">All Accounts</option>
+                    {accounts.map(acc => {
+                        const val = typeof acc === 'object' ? acc.name : acc;
+                        return <option key={val} value={val} className="bg-slate-800">{val}</option>;
+                    })}
+                </select>
             </div>
 
+            {/* Financial year filter (none selected = all years) */}
+            {availableYears.length > 1 && (
+                <div className="flex flex-wrap gap-2">
+                    {availableYears.map(fy => (
+                        <button
+                            key={fy}
+                            onClick={() => toggleYear(fy)}
+                            className={`px-3 py-1 rounded-full text-xs font-medium border transition-colors ${selectedYears.includes(fy)
+                                ? 'bg-blue-600/20 border-blue-500 text-blue-300'
+                                : 'bg-slate-800 border-slate-700 text-slate-400 hover:text-slate-200'}`}
+                        >
+                            {fy}
+                        </button>
+                    ))}
+                </div>
+            )}
+
             {/* Table */}
             <div className="bg-slate-900 border border-slate-800 rounded-xl overflow-hidden shadow-sm">
                 <table className="w-full text-sm text-left">
                     <thead className="bg-slate-950 text-slate-400 font-medium border-b border-slate-800">
                         <tr>
                             <th className="px-6 py-4">Financial Year</th>
-                            <th className="px-6 py-4 text-right">Total Invested</th>
+                            <th className="px-6 py-4 text-right">Cost of Units Sold</th>
                             <th className="px-6 py-4 text-right">Total Exited</th>
                             <th className="px-6 py-4 text-right">Short Term P&L</th>
                             <th className="px-6 py-4 text-right">Long Term P&L</th>
@@ -197,6 +202,7 @@ const Reports = () => {
 
             <div className="text-xs text-slate-500 italic mt-4">
                 * Based on data currently available in the system. Ensure all NAVs and transactions are synced.
+                Cost and gains use FIFO lots, so they can differ from the average-cost P&L on the Holdings page.
             </div>
         </div>
     );
@@ -24,22 +24,36 @@ const api = axios.create({
 });
 
 export const getPortfolio = (type) => api.get('/portfolio', { params: { type } });
+// fy is a list; repeat the key (fy=FY2024-25&fy=FY2025-26) as FastAPI expects instead of axios' fy[]=
+export const getRealizedReport = (params) => api.get('/reports/realized', { params, paramsSerializer: { indexes: null } });
+export const getPortfolioInsights = (type) => api.get('/portfolio/insights', { params: { type } });
+export const getPortfolioRisk = (params) => api.get('/portfolio/risk', { params });
 export const getInvestments = (type, activeOnly = false) => api.get('/investments', { params: { type, active_only: activeOnly } });
+export const getInvestmentsPage = (params) => api.get('/investments', { params });
 export const addInvestment = (data) => api.post('/investments', data);
 export const deleteInvestment = (id) => api.delete(`/investments/${id}`);
 export const updateInvestment = (id, data) => api.put(`/investments/${id}`, data);
 export const getWatchlist = () => api.get('/watchlist');
 export const addToWatchlist = (data) => api.post('/watchlist', data);
+export const getAlerts = (unreadOnly = false) => api.get('/alerts', { params: { unread_only: unreadOnly } });
+export const markAlertsRead = (alertIds) => api.post('/alerts/read', { alert_ids: alertIds });
 export const getWatchlistGroups = () => api.get('/watchlist/groups');
 export const createWatchlistGroup = (name) => api.post('/watchlist/groups', { name });
 export const updateWatchlistGroup = (id, name) => api.put(`/watchlist/groups/${id}`, { name });
 export const deleteWatchlistGroup = (id) => api.delete(`/watchlist/groups/${id}`);
 export const syncNav = () => api.post('/sync-nav');
 export const searchSchemes = (query) => api.get('/schemes/search', { params: { query, limit: 50 } });
+export const fuzzySearchSchemes = (query, directGrowth = false) => api.get('/schemes/fuzzy', { params: { query, limit: 20, direct_growth: directGrowth } });
 export const getAMCs = () => api.get('/schemes/amc');
 export const getSchemesByAMC = (amc) => api.get('/schemes', { params: { amc } });
+export const getSchemeCategories = () => api.get('/schemes/categories');
 export const getSyncStatus = () => api.get('/sync-status');
 export const getSchemeByCode = (code) => api.get(`/schemes/code/${code}`);
+export const getSchemesByCodes = (codes, fields) => api.post('/schemes/batch', { codes, fields });
+export const getSchemeHistory = (code, params) => api.get(`/schemes/${code}/history`, { params });
+export const getSchemeReturns = (codes) => api.get('/schemes/returns', { params: { codes: codes.join(',') } });
+export const getSchemeRisk = (codes, params) => api.get('/schemes/risk', { params: { ...params, codes: codes.join(',') } });
+export const lookupNavs = (items) => api.post('/nav/lookup', { items });
 // Account Management
 export const getAccounts = () => api.get('/accounts');
 export const addAccount = (name) => api.post('/accounts', { name });
@@ -49,6 +63,7 @@ export const deleteAccount = (id) => api.delete(`/accounts/${id}`);
 export const deleteWatchlistItem = (id) => api.delete(`/watchlist/item/${id}`);
 export const markWatchlistItemSold = (id, data) => api.post(`/watchlist/item/${id}/sell`, data);
 export const updateWatchlistDate = (id, date) => api.patch(`/watchlist/item/${id}/date`, { date });
+export const importInvestments = (csvText, accountName, dryRun = false) => api.post('/investments/import', csvText, { params: { account_name: accountName, dry_run: dryRun }, headers: { 'Content-Type': 'text/csv' } });
 export const redeemInvestment = (data) => api.post('/redeem', data);
 export const deleteScheme = (schemeCode) => api.delete(`/portfolio/scheme/${schemeCode}`);
 
@@ -57,6 +72,7 @@ export const getSipMandates = (activeOnly = true) => api.get('/sips/mandates', {
 export const createSipMandate = (data) => api.post('/sips/mandates', data);
 export const updateSipMandate = (id, data) => api.put(`/sips/mandates/${id}`, data);
 export const deleteSipMandate = (id) => api.delete(`/sips/mandates/${id}`);
+export const materializeSipInstallments = (dryRun = false) => api.post('/sips/materialize', null, { params: { dry_run: dryRun } });
 export const convertSipToLumpsum = (id, data) => api.post(`/sips/mandates/${id}/convert`, data);
 
 // System